@@ -6,13 +6,25 @@
 #   - For each professor, fetch their latest 5 reviews including ratings, comments, course info, and tags.
 #   - Output fields are renamed and formatted per user request.
 
+import os
 import re
+import sys
 import json
+import base64
 import time
 import csv
-from typing import Dict, Any, List, Tuple, Set
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Set, Optional, Iterable, Iterator
 import requests
 
+from rmp_retry import RetryPolicy, RetryError, RetryableError
+from rmp_transport import GqlRequest, cached_request, make_session, DEFAULT_TIMEOUT
+
+DE_ANZA_SCHOOL_ID = 1967
 SEARCH_URL = "https://www.ratemyprofessors.com/search/professors/1967?q=*"
 GQL_URL = "https://www.ratemyprofessors.com/graphql"
 
@@ -32,14 +44,106 @@ HEADERS = {
 # Base64 identifiers visible in the page / network:
 SCHOOL_ID_B64 = "U2Nob29sLTE5Njc="     # "De Anza College"
 
+OUTPUT_PREFIX = "rmp_deanza_all_professors"
+
+# Multi-school runs (--schools) write one shard per school plus an index into this directory
+SHARD_DIR = "schools"
+
+# Review-fetch concurrency defaults (overridable from the command line).
+# The token bucket caps the request rate no matter how many workers are running.
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 5.0      # requests per second
+DEFAULT_BURST = 5
+DEFAULT_BATCH_SIZE = 50  # teachers per aliased ratings query
+DEFAULT_RESUME_MAX_AGE = 12.0  # hours; --resume starts over from an older journal
+
+# Pagination page size: starts at the site's own value and adapts (see AdaptivePageSize)
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+
 
 # ---------------------------- Utility helpers ----------------------------
 
-def balanced_json_after(marker: str, text: str) -> str:
+class TokenBucket:
     """
-    Find a JSON object literal that immediately follows `marker` inside `text`.
-    This handles nested braces and quoted strings to return the exact {...} slice.
+    Thread-safe token bucket rate limiter.
+    Refills `rate` tokens per second up to `burst`; acquire() blocks until one token is taken.
+    A non-positive rate disables limiting.
     """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.capacity = float(max(1, int(burst)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    TokenBucket whose state lives in shared memory, so a single rate limit covers every
+    process of a multi-school run. Pass it to worker processes at start-up (initargs).
+    """
+
+    def __init__(self, rate: float, burst: int = 1, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.rate = float(rate)
+        self.capacity = float(max(1, int(burst)))
+        self.state = ctx.Array("d", [self.capacity, time.monotonic()])
+        self.lock = self.state.get_lock()
+
+    @property
+    def tokens(self) -> float:
+        return self.state[0]
+
+    @tokens.setter
+    def tokens(self, value: float) -> None:
+        self.state[0] = value
+
+    @property
+    def updated(self) -> float:
+        return self.state[1]
+
+    @updated.setter
+    def updated(self, value: float) -> None:
+        self.state[1] = value
+
+
+def school_search_url(school: int) -> str:
+    return f"https://www.ratemyprofessors.com/search/professors/{school}?q=*"
+
+
+def school_id_b64(school: int) -> str:
+    """GraphQL node id of a school, e.g. 1967 -> "U2Nob29sLTE5Njc=" ("School-1967")."""
+    return base64.b64encode(f"School-{school}".encode("ascii")).decode("ascii")
+
+
+RELAY_MARKER = "window.__RELAY_STORE__ = "
+
+# Everything the brace matcher has to look at: whole string literals (so braces inside
+# strings are skipped in one step) and the braces themselves. The string pattern is the
+# "unrolled" form, so an unterminated string (a truncated page) fails in linear time
+# instead of backtracking over every way to split its characters.
+_JSON_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]', re.S)
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _json_start_after(marker: str, text: str) -> int:
+    """Index of the '{' that follows `marker` (skipping whitespace and an optional '=')."""
     start = text.find(marker)
     if start == -1:
         raise ValueError("marker not found")
@@ -50,32 +154,65 @@ def balanced_json_after(marker: str, text: str) -> str:
         i += 1
     if i >= len(text) or text[i] != '{':
         raise ValueError("JSON does not start with '{' after marker")
+    return i
 
+
+def balanced_json_after(marker: str, text: str) -> str:
+    """
+    Find a JSON object literal that immediately follows `marker` inside `text`.
+    This handles nested braces and quoted strings to return the exact {...} slice.
+    """
+    i = _json_start_after(marker, text)
     depth = 0
-    j = i
-    in_str = False
-    esc = False
-    while j < len(text):
-        ch = text[j]
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-        else:
-            if ch == '"':
-                in_str = True
-            elif ch == '{':
-                depth += 1
-            elif ch == '}':
-                depth -= 1
-                if depth == 0:
-                    j += 1  # include closing brace
-                    break
-        j += 1
-    return text[i:j]
+    for m in _JSON_TOKEN_RE.finditer(text, i):
+        tok = m.group()
+        if tok == '{':
+            depth += 1
+        elif tok == '}':
+            depth -= 1
+            if depth == 0:
+                return text[i:m.end()]
+    return text[i:]
+
+
+def relay_store_after(marker: str, text: str) -> Dict[str, Any]:
+    """
+    Decode the JSON object that follows `marker` straight from `text`, without first
+    slicing it out: the decoder starts at the opening brace and stops at its match.
+    Falls back to balanced_json_after + json.loads if the raw decode fails.
+    """
+    i = _json_start_after(marker, text)
+    try:
+        obj, _ = _JSON_DECODER.raw_decode(text, i)
+        return obj
+    except ValueError:
+        return json.loads(balanced_json_after(marker, text))
+
+
+def collect_relay_nodes(store: Dict[str, Any], typenames: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group the Relay store's records by __typename in a single pass (only `typenames` are kept)."""
+    found: Dict[str, List[Dict[str, Any]]] = {t: [] for t in typenames}
+    for obj in store.values():
+        if isinstance(obj, dict):
+            bucket = found.get(obj.get("__typename"))
+            if bucket is not None:
+                bucket.append(obj)
+    return found
+
+
+def teacher_row(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Relay / GraphQL `Teacher` node to the internal raw row."""
+    return {
+        "id": node.get("id"),                      # used only for de-duplication
+        "legacyId": node.get("legacyId"),          # not exported
+        "firstName": node.get("firstName"),
+        "lastName": node.get("lastName"),
+        "department": node.get("department"),
+        "avgRating": node.get("avgRating"),
+        "numRatings": node.get("numRatings"),
+        "avgDifficulty": node.get("avgDifficulty"),
+        "wouldTakeAgainPercent": node.get("wouldTakeAgainPercent"),
+    }
 
 
 def extract_first_page_teachers_from_html(html: str) -> Tuple[List[Dict[str, Any]], str, bool]:
@@ -85,43 +222,51 @@ def extract_first_page_teachers_from_html(html: str) -> Tuple[List[Dict[str, Any
         (teachers, end_cursor, has_next_page)
     `teachers` includes ALL teachers for De Anza College (no department filter).
     """
-    marker = "window.__RELAY_STORE__ = "
-    blob = balanced_json_after(marker, html)
-    store = json.loads(blob)
-
-    teachers = []
-    for _, obj in store.items():
-        if isinstance(obj, dict) and obj.get("__typename") == "Teacher":
-            teachers.append({
-                "id": obj.get("id"),                      # used only for de-duplication
-                "legacyId": obj.get("legacyId"),          # not exported
-                "firstName": obj.get("firstName"),
-                "lastName": obj.get("lastName"),
-                "department": obj.get("department"),
-                "avgRating": obj.get("avgRating"),
-                "numRatings": obj.get("numRatings"),
-                "avgDifficulty": obj.get("avgDifficulty"),
-                "wouldTakeAgainPercent": obj.get("wouldTakeAgainPercent"),
-            })
+    store = relay_store_after(RELAY_MARKER, html)
+    nodes = collect_relay_nodes(store, ("Teacher", "PageInfo"))
+
+    teachers = [teacher_row(obj) for obj in nodes["Teacher"]]
 
     # Extract the pageInfo for subsequent GraphQL pagination
     end_cursor = None
     has_next = None
-    for _, obj in store.items():
-        if isinstance(obj, dict) and obj.get("__typename") == "PageInfo":
-            end_cursor = obj.get("endCursor")
-            has_next = obj.get("hasNextPage")
-            break
+    if nodes["PageInfo"]:
+        end_cursor = nodes["PageInfo"][0].get("endCursor")
+        has_next = nodes["PageInfo"][0].get("hasNextPage")
 
     return teachers, end_cursor, bool(has_next)
 
 
-def gql_req(session: requests.Session, variables: Dict[str, Any], query_str: str = None) -> Dict[str, Any]:
+def _send(retry: Optional[RetryPolicy], endpoint: str, limiter: Optional[TokenBucket], fn, *args):
     """
-    Submit a GraphQL request compatible with the site's pagination query.
+    Run one HTTP request function under the retry policy, taking a rate-limit token before
+    every attempt. Without a policy the request is tried once (failures still raise RetryError).
     """
-    if query_str is None:
-        query_str = """
+    def attempt():
+        if limiter:
+            limiter.acquire()
+        return fn(*args)
+    return (retry or RetryPolicy(max_attempts=1)).call(endpoint, attempt)
+
+
+def _headers(session) -> Optional[Dict[str, str]]:
+    """Per-request headers: none for transport sessions, which carry HEADERS already."""
+    return None if getattr(session, "preset_headers", False) else HEADERS
+
+
+def _post_gql(session: requests.Session, request: GqlRequest, variables: Dict[str, Any]) -> Dict[str, Any]:
+    r = session.post(GQL_URL, headers=_headers(session), data=request.encode(variables))
+    r.raise_for_status()
+    return r.json()
+
+
+def _get_text(session: requests.Session, url: str) -> str:
+    r = session.get(url, headers=_headers(session))
+    r.raise_for_status()
+    return r.text
+
+
+SEARCH_QUERY = """
 query TeacherSearchPaginationQuery($query: TeacherSearchQuery!, $first: Int!, $after: String) {
   newSearch {
     teachers(query: $query, first: $first, after: $after) {
@@ -149,26 +294,19 @@ query TeacherSearchPaginationQuery($query: TeacherSearchQuery!, $first: Int!, $a
   }
 }
 """
-    payload = {
-        "operationName": "TeacherSearchPaginationQuery",
-        "variables": variables,
-        "query": query_str,
-    }
-    r = session.post(GQL_URL, headers=HEADERS, data=json.dumps(payload))
-    r.raise_for_status()
-    return r.json()
+SEARCH_REQUEST = GqlRequest("TeacherSearchPaginationQuery", SEARCH_QUERY)
 
 
-def fetch_teacher_reviews(session: requests.Session, teacher_id: str, legacy_id: str = None, count: int = 5) -> List[Dict[str, Any]]:
+def gql_req(session: requests.Session, variables: Dict[str, Any], query_str: str = None) -> Dict[str, Any]:
     """
-    Fetch the latest reviews for a specific teacher.
-    First tries GraphQL, then falls back to parsing HTML if needed.
-    Returns a list of review dictionaries.
+    Submit a GraphQL request compatible with the site's pagination query.
     """
-    # Try GraphQL first
-    query_str = """
-query TeacherRatingsPageQuery($id: ID!) {
-  node(id: $id) {
+    request = SEARCH_REQUEST if query_str is None else cached_request("TeacherSearchPaginationQuery", query_str)
+    return _post_gql(session, request, variables)
+
+
+# Selection shared by the single-teacher and the batched (aliased) ratings queries.
+RATINGS_SELECTION = """
     ... on Teacher {
       id
       ratings(first: 5) {
@@ -191,193 +329,642 @@ query TeacherRatingsPageQuery($id: ID!) {
         }
       }
     }
-  }
-}
 """
+
+
+RATINGS_REQUEST = GqlRequest("TeacherRatingsPageQuery", """
+query TeacherRatingsPageQuery($id: ID!) {
+  node(id: $id) {""" + RATINGS_SELECTION + """  }
+}
+""")
+
+
+@lru_cache(maxsize=None)
+def batch_ratings_request(size: int) -> GqlRequest:
+    """The aliased ratings document for `size` teachers (built and encoded once per size)."""
+    var_defs = ", ".join(f"$id{i}: ID!" for i in range(size))
+    selections = "".join(
+        f"  t{i}: node(id: $id{i}) {{{RATINGS_SELECTION}  }}\n" for i in range(size)
+    )
+    return GqlRequest("TeacherRatingsBatchQuery",
+                      f"query TeacherRatingsBatchQuery({var_defs}) {{\n{selections}}}\n")
+
+
+def review_from_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a GraphQL / Relay `Rating` node to the internal review dict."""
+    return {
+        "comment": node.get("comment", ""),
+        "date": node.get("date", ""),
+        "qualityRating": node.get("clarityRating"),
+        "difficultyRating": node.get("difficultyRating"),
+        "isOnlineClass": node.get("isForOnlineClass", False),
+        "isForCredit": node.get("isForCredit"),
+        "wouldTakeAgain": node.get("wouldTakeAgain"),
+        "grade": node.get("grade", ""),
+        "textbookUse": node.get("textbookUse"),
+        "attendanceMandatory": node.get("attendanceMandatory"),
+        "class": node.get("class", ""),
+    }
+
+
+def reviews_from_teacher_node(teacher_node: Dict[str, Any], count: int = 5) -> List[Dict[str, Any]]:
+    """Extract up to `count` reviews from a Teacher node returned by a ratings query."""
+    ratings = teacher_node.get("ratings", {}) or {}
+    edges = ratings.get("edges", []) or []
+    reviews = []
+    for edge in edges[:count]:
+        node = (edge or {}).get("node", {})
+        if node:
+            reviews.append(review_from_node(node))
+    return reviews
+
+
+def fetch_teacher_reviews(session: requests.Session, teacher_id: str, legacy_id: str = None, count: int = 5,
+                          limiter: Optional[TokenBucket] = None,
+                          retry: Optional[RetryPolicy] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch the latest reviews for a specific teacher.
+    First tries GraphQL, then falls back to parsing HTML if GraphQL answered without reviews
+    or rejected the query. Transient failures are retried by `retry`; if they persist a
+    RetryError is raised instead of hitting the (equally throttled) HTML page.
+    If `limiter` is given, a token is taken from it before every HTTP request.
+    Returns a list of review dictionaries.
+    """
+    # Try GraphQL first
     variables = {"id": teacher_id}
-    
     try:
-        payload = {
-            "operationName": "TeacherRatingsPageQuery",
-            "variables": variables,
-            "query": query_str,
-        }
-        r = session.post(GQL_URL, headers=HEADERS, data=json.dumps(payload))
-        r.raise_for_status()
-        data = r.json()
-        
-        if data and "errors" not in data:
-            teacher_node = data.get("data", {}).get("node", {})
-            if teacher_node:
-                ratings = teacher_node.get("ratings", {})
-                edges = ratings.get("edges", []) or []
-                
-                reviews = []
-                for edge in edges[:count]:
-                    node = edge.get("node", {})
-                    if node:
-                        review = {
-                            "comment": node.get("comment", ""),
-                            "date": node.get("date", ""),
-                            "qualityRating": node.get("clarityRating"),
-                            "difficultyRating": node.get("difficultyRating"),
-                            "isOnlineClass": node.get("isForOnlineClass", False),
-                            "isForCredit": node.get("isForCredit"),
-                            "wouldTakeAgain": node.get("wouldTakeAgain"),
-                            "grade": node.get("grade", ""),
-                            "textbookUse": node.get("textbookUse"),
-                            "attendanceMandatory": node.get("attendanceMandatory"),
-                            "class": node.get("class", ""),
-                        }
-                        reviews.append(review)
-                
-                if reviews:
-                    return reviews
-    except Exception:
-        pass  # Fall through to try HTML parsing
+        data = _send(retry, "graphql:ratings", limiter, _post_gql, session, RATINGS_REQUEST, variables)
+    except RetryError as e:
+        if not e.fatal:
+            raise
+        data = None  # Query rejected - try HTML parsing
+
+    if data and "errors" not in data:
+        teacher_node = (data.get("data") or {}).get("node") or {}
+        reviews = reviews_from_teacher_node(teacher_node, count)
+        if reviews:
+            return reviews
     
     # Fallback: Try parsing from HTML if we have legacy_id
     if legacy_id:
+        prof_url = f"https://www.ratemyprofessors.com/ShowRatings.jsp?tid={legacy_id}"
         try:
-            prof_url = f"https://www.ratemyprofessors.com/ShowRatings.jsp?tid={legacy_id}"
-            html = session.get(prof_url, headers=HEADERS).text
-            
-            # Try to extract from Relay store
-            marker = "window.__RELAY_STORE__ = "
-            if marker in html:
-                blob = balanced_json_after(marker, html)
-                store = json.loads(blob)
-                
-                reviews = []
-                for _, obj in store.items():
-                    if isinstance(obj, dict) and obj.get("__typename") == "Rating":
-                        if len(reviews) >= count:
-                            break
-                        review = {
-                            "comment": obj.get("comment", ""),
-                            "date": obj.get("date", ""),
-                            "qualityRating": obj.get("clarityRating"),
-                            "difficultyRating": obj.get("difficultyRating"),
-                            "isOnlineClass": obj.get("isForOnlineClass", False),
-                            "isForCredit": obj.get("isForCredit"),
-                            "wouldTakeAgain": obj.get("wouldTakeAgain"),
-                            "grade": obj.get("grade", ""),
-                            "textbookUse": obj.get("textbookUse"),
-                            "attendanceMandatory": obj.get("attendanceMandatory"),
-                            "class": obj.get("class", ""),
-                        }
-                        reviews.append(review)
-                
-                if reviews:
-                    return reviews
-        except Exception:
-            pass
+            html = _send(retry, "html:ratings", limiter, _get_text, session, prof_url)
+        except RetryError as e:
+            if not e.fatal:
+                raise
+            return []  # e.g. 404 for a removed profile
+
+        # Try to extract from Relay store
+        if RELAY_MARKER in html:
+            try:
+                store = relay_store_after(RELAY_MARKER, html)
+            except ValueError:
+                return []
+            ratings = collect_relay_nodes(store, ("Rating",))["Rating"]
+            return [review_from_node(obj) for obj in ratings[:count]]
     
     return []
 
 
-def fetch_all(session: requests.Session, fetch_reviews: bool = True) -> List[Dict[str, Any]]:
+def fetch_teacher_reviews_batch(session: requests.Session, teachers: List[Dict[str, Any]], count: int = 5,
+                                limiter: Optional[TokenBucket] = None,
+                                retry: Optional[RetryPolicy] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Fetch the latest reviews for several teachers with ONE GraphQL request.
+    The document holds one aliased `tN: node(id: $idN)` selection per teacher.
+    Teachers whose alias comes back with an error or without a node (or all of them, if the
+    server rejects the whole document) are retried one by one through fetch_teacher_reviews.
+    Transient failures that outlast `retry` raise RetryError.
+    Returns one review list per teacher, in the same order as `teachers`.
+    """
+    request = batch_ratings_request(len(teachers))
+    variables = {f"id{i}": t["id"] for i, t in enumerate(teachers)}
+
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * len(teachers)
+    try:
+        data = _send(retry, "graphql:ratings-batch", limiter, _post_gql, session, request, variables) or {}
+    except RetryError as e:
+        if not e.fatal:
+            raise
+        data = {}  # Every teacher falls back to a single request below
+
+    # GraphQL reports per-field failures in `errors` with the alias as the first path element.
+    failed = set()
+    for err in data.get("errors") or []:
+        path = (err or {}).get("path") or []
+        if path:
+            failed.add(path[0])
+        else:
+            failed.update(f"t{i}" for i in range(len(teachers)))
+
+    nodes = data.get("data") or {}
+    for i in range(len(teachers)):
+        alias = f"t{i}"
+        teacher_node = nodes.get(alias)
+        if alias not in failed and teacher_node:
+            results[i] = reviews_from_teacher_node(teacher_node, count)
+
+    for i, teacher in enumerate(teachers):
+        if results[i] is None:
+            results[i] = fetch_teacher_reviews(session, teacher["id"], legacy_id=teacher.get("legacyId"),
+                                               count=count, limiter=limiter, retry=retry)
+    return results
+
+
+class AdaptivePageSize:
+    """
+    Chooses `first` for the pagination query from how the previous pages went.
+    - a fast page that came back full doubles the size (up to `maximum`)
+    - an error or a slow page halves it (down to `minimum`)
+    - a short page while more pages remain means the server caps the page size;
+      that count becomes the new maximum
+    """
+
+    def __init__(self, initial: int = DEFAULT_PAGE_SIZE, minimum: int = 5, maximum: int = MAX_PAGE_SIZE,
+                 fast_seconds: float = 1.0, slow_seconds: float = 3.0):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.fast_seconds = fast_seconds
+        self.slow_seconds = slow_seconds
+
+    def success(self, requested: int, received: int, has_next: bool, latency: float) -> None:
+        if has_next and 0 < received < requested:
+            self.maximum = max(self.minimum, received)
+            self.size = self.maximum
+        elif latency > self.slow_seconds:
+            self.size = max(self.minimum, self.size // 2)
+        elif latency < self.fast_seconds and received >= requested:
+            self.size = min(self.maximum, self.size * 2)
+
+    def failure(self) -> None:
+        self.size = max(self.minimum, self.size // 2)
+
+
+def cursor_offset(cursor: Optional[str]) -> Optional[int]:
+    """Decode a Relay `arrayconnection:<n>` cursor to its offset, or None for any other cursor."""
+    try:
+        kind, _, offset = base64.b64decode(cursor).decode("ascii").partition(":")
+        return int(offset) if kind == "arrayconnection" else None
+    except Exception:
+        return None
+
+
+def offset_cursor(offset: int) -> str:
+    return base64.b64encode(f"arrayconnection:{offset}".encode("ascii")).decode("ascii")
+
+
+def _search_page(session: requests.Session, variables: Dict[str, Any]) -> Dict[str, Any]:
+    data = gql_req(session, variables)
+    if data.get("errors") and not data.get("data"):
+        raise RetryableError(f"GraphQL errors: {data['errors']}")
+    return data
+
+
+def fetch_teacher_page(session: requests.Session, query: Dict[str, Any], after: Optional[str], first: int,
+                       limiter: Optional[TokenBucket] = None,
+                       retry: Optional[RetryPolicy] = None) -> Dict[str, Any]:
+    """
+    Fetch one page of the school's teacher search.
+    Returns {"rows", "edges", "after", "has_next", "result_count", "latency"};
+    the latency includes any retries.
+    """
+    started = time.monotonic()
+    data = _send(retry, "graphql:search", limiter, _search_page,
+                 session, {"query": query, "first": first, "after": after})
+    latency = time.monotonic() - started
+    teachers_root = (
+        data.get("data", {})
+            .get("newSearch", {})
+            .get("teachers", {})
+    )
+    edges = teachers_root.get("edges", []) or []
+    rows = []
+    for e in edges:
+        node = (e or {}).get("node", {})
+        if node.get("__typename") == "Teacher":
+            rows.append(teacher_row(node))
+    page_info = teachers_root.get("pageInfo", {}) or {}
+    return {
+        "rows": rows,
+        "edges": len(edges),
+        "after": page_info.get("endCursor"),
+        "has_next": bool(page_info.get("hasNextPage")),
+        "result_count": teachers_root.get("resultCount"),
+        "latency": latency,
+    }
+
+
+class Journal:
+    """
+    Append-only JSON Lines checkpoint of a fetch_all run (`<prefix>.journal.jsonl`).
+    Each line is one record, flushed and fsync'ed as soon as it is written:
+      {"type": "start", "started": <unix time the run began>}   (the first line)
+      {"type": "page", "rows": [...], "after": <endCursor>, "has_next": <bool>}
+      {"type": "reviews", "id": <teacher id>, "reviews": [...]}
+    replay() folds the records back into the collected rows, the cursor to continue from
+    and the reviews already fetched, so a killed run can pick up where it stopped.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        torn = resume and self._ends_mid_line(path)
+        self.f = open(path, "a" if resume else "w", encoding="utf-8")
+        if torn:
+            self.f.write("\n")  # end the torn line, or the first resumed record would be lost with it
+        if not resume:
+            self.append({"type": "start", "started": time.time()})
+
+    @staticmethod
+    def _ends_mid_line(path: str) -> bool:
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return False
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.f.write(line)
+            self.f.flush()
+            os.fsync(self.f.fileno())
+
+    def page(self, rows: List[Dict[str, Any]], after: Optional[str], has_next: bool) -> None:
+        self.append({"type": "page", "rows": rows, "after": after, "has_next": has_next})
+
+    def reviews(self, teacher: Dict[str, Any]) -> None:
+        self.append({"type": "reviews", "id": teacher.get("id"), "reviews": teacher.get("reviews", [])})
+
+    def close(self) -> None:
+        self.f.close()
+
+    def discard(self) -> None:
+        """Close and delete the journal once the run's output has been saved."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def replay(path: str) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild the state of an interrupted run from its journal.
+        Returns None if there is no journal or it holds no pages yet.
+        A torn last line (the process died mid-write) is ignored.
+        """
+        if not os.path.exists(path):
+            return None
+        rows: List[Dict[str, Any]] = []
+        reviews: Dict[str, List[Dict[str, Any]]] = {}
+        after, has_next, pages, started = None, True, 0, None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("type") == "page":
+                    rows.extend(rec.get("rows", []))
+                    after = rec.get("after")
+                    has_next = bool(rec.get("has_next"))
+                    pages += 1
+                elif rec.get("type") == "reviews" and rec.get("id"):
+                    reviews[rec["id"]] = rec.get("reviews", [])
+                elif rec.get("type") == "start":
+                    started = rec.get("started")
+        if not pages:
+            return None
+        return {"rows": rows, "after": after, "has_next": has_next, "pages": pages, "reviews": reviews,
+                "started": started}
+
+
+def journal_path(prefix: str = OUTPUT_PREFIX) -> str:
+    return f"{prefix}.journal.jsonl"
+
+
+def resume_from(path: str, max_age: float = DEFAULT_RESUME_MAX_AGE) -> Optional[Dict[str, Any]]:
+    """
+    The state to continue from for --resume (Journal.replay), or None to start a fresh run: when
+    there is no journal, or its run began more than `max_age` hours ago (0 = any age). Resuming an
+    old journal would mix its pages and reviews into today's data. A journal without a start record
+    counts as too old.
+    """
+    state = Journal.replay(path)
+    if state is None:
+        print(f"No journal in {path}; starting a fresh run.")
+        return None
+    age = time.time() - state["started"] if state["started"] is not None else None
+    if max_age > 0 and (age is None or age > max_age * 3600):
+        when = f"{age / 3600:.1f} h ago" if age is not None else "at an unknown time"
+        print(f"Journal {path} was started {when} (--resume-max-age {max_age:g} h); starting a fresh run.")
+        return None
+    return state
+
+
+def fetch_all(session: requests.Session, fetch_reviews: bool = True, workers: int = 1,
+              rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+              batch_size: int = 1,
+              previous: Optional[Dict[str, Dict[str, Any]]] = None,
+              journal: Optional[Journal] = None,
+              resume: Optional[Dict[str, Any]] = None,
+              retry: Optional[RetryPolicy] = None,
+              school: int = DE_ANZA_SCHOOL_ID,
+              limiter: Optional[TokenBucket] = None) -> List[Dict[str, Any]]:
     """
     Full flow:
       1) Load the first page HTML and parse Relay store for the initial Teacher nodes.
       2) Continue with GraphQL pagination using pageInfo until all data is fetched.
       3) Optionally fetch the latest 5 reviews for each professor.
+         With workers > 1 reviews are fetched concurrently under a token-bucket rate limit;
+         batch_size > 1 packs that many teachers into each ratings request.
+         workers == 1 and batch_size == 1 keep the original one-at-a-time loop, which takes its
+         tokens from the same limiter (or, with no rate limit, pauses 0.5 s between teachers).
+         If `previous` (see load_state) is given, only new or changed teachers are fetched.
+    Every page and every teacher's reviews are checkpointed to `journal` when one is given;
+    `resume` (from Journal.replay) skips the pages and reviews an earlier run already recorded.
+    `school` selects the RateMyProfessors school id (De Anza College by default); `limiter`
+    lets several runs share one rate limit (by default one is built from `rate` / `burst`).
+    All requests go through `retry`. A listing page that keeps failing raises RetryError;
+    a professor whose reviews keep failing is left without a "reviews" key (and is fetched
+    again by the next --resume or --incremental run).
     Returns a list of raw teacher dicts (internal field names) with reviews if requested.
     """
     out: List[Dict[str, Any]] = []
     seen: Set[str] = set()
+    retry = retry or RetryPolicy()
+    limiter = limiter or TokenBucket(rate, burst)
 
-    # Step 1: first-page (SSR) data
-    print("Fetching initial page...")
-    html = session.get(SEARCH_URL, headers=HEADERS).text
-    first_batch, end_cursor, has_next = extract_first_page_teachers_from_html(html)
+    if resume:
+        # Continue an interrupted run: rows and cursor come from the journal
+        for row in resume["rows"]:
+            if row["id"] and row["id"] not in seen:
+                out.append(row)
+                seen.add(row["id"])
+        end_cursor, has_next = resume["after"], resume["has_next"]
+        print(f"Resuming from journal: {len(out)} professors over {resume['pages']} pages, "
+              f"{len(resume['reviews'])} with reviews")
+    else:
+        # Step 1: first-page (SSR) data
+        print("Fetching initial page...")
+        html = _send(retry, "html:search", limiter, _get_text, session, school_search_url(school))
+        first_batch, end_cursor, has_next = extract_first_page_teachers_from_html(html)
 
-    for row in first_batch:
-        if row["id"] and row["id"] not in seen:
-            out.append(row)
-            seen.add(row["id"])
-    
-    print(f"Initial batch: {len(first_batch)} professors")
+        for row in first_batch:
+            if row["id"] and row["id"] not in seen:
+                out.append(row)
+                seen.add(row["id"])
+        if journal:
+            journal.page(first_batch, end_cursor, has_next)
+
+        print(f"Initial batch: {len(first_batch)} professors")
 
     # Step 2: GraphQL pagination from the endCursor of first page
     # Note: No departmentID filter, only schoolID
-    variables = {
-        "query": {
-            "text": "",
-            "schoolID": SCHOOL_ID_B64,
-            "fallback": True
-        },
-        "first": 20,
-        "after": end_cursor
+    # The page size adapts to how fast the server answers. When the cursors are plain
+    # `arrayconnection:<offset>` cursors, up to `workers` pages are requested at once from
+    # computed cursors; each page is only accepted if its cursor matches the endCursor of
+    # the page before it, otherwise the rest of the window is dropped and re-requested.
+    query = {
+        "text": "",
+        "schoolID": school_id_b64(school),
+        "fallback": True
     }
+    pager = AdaptivePageSize()
+    page_count = resume["pages"] if resume else 1
+    result_count = None
+    latencies = []
+    listing_started = time.monotonic()
 
-    page_count = 1
-    while has_next:
-        try:
-            data = gql_req(session, variables)
-            teachers_root = (
-                data.get("data", {})
-                    .get("newSearch", {})
-                    .get("teachers", {})
-            )
-            edges = teachers_root.get("edges", []) or []
-            
-            new_count = 0
-            for e in edges:
-                node = (e or {}).get("node", {})
-                if node.get("__typename") == "Teacher":
-                    tid = node.get("id")
-                    if tid and tid not in seen:
-                        out.append({
-                            "id": tid,
-                            "legacyId": node.get("legacyId"),
-                            "firstName": node.get("firstName"),
-                            "lastName": node.get("lastName"),
-                            "department": node.get("department"),
-                            "avgRating": node.get("avgRating"),
-                            "numRatings": node.get("numRatings"),
-                            "avgDifficulty": node.get("avgDifficulty"),
-                            "wouldTakeAgainPercent": node.get("wouldTakeAgainPercent"),
-                        })
-                        seen.add(tid)
-                        new_count += 1
-
-            page_info = teachers_root.get("pageInfo", {}) or {}
-            has_next = bool(page_info.get("hasNextPage"))
-            variables["after"] = page_info.get("endCursor")
-            
-            page_count += 1
-            print(f"Page {page_count}: +{new_count} professors (Total: {len(out)})")
-            
-            time.sleep(0.4)  # light pacing
-            
-        except Exception as e:
-            print(f"Error on page {page_count}: {e}")
-            time.sleep(2)  # longer wait on error
-            continue
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while has_next:
+            size = pager.size
+            base = cursor_offset(end_cursor)
+            window = 1
+            if workers > 1 and base is not None:
+                window = workers
+                if result_count:
+                    window = max(1, min(window, -(-(result_count - base - 1) // size)))
+            cursors = [end_cursor] + [offset_cursor(base + k * size) for k in range(1, window)]
+            futures = [pool.submit(fetch_teacher_page, session, query, c, size, limiter, retry) for c in cursors]
+
+            for cursor, fut in zip(cursors, futures):
+                if cursor != end_cursor:
+                    break  # the previous page did not end where this one was assumed to start
+                try:
+                    page = fut.result()
+                except RetryError as e:
+                    # The policy already retried transient errors; a smaller page may still succeed
+                    # (e.g. when the server rejects a large `first`). At the minimum size, give up.
+                    if pager.size <= pager.minimum:
+                        raise
+                    pager.failure()
+                    print(f"Error on page {page_count + 1}: {e}; retrying with first={pager.size}")
+                    break
+
+                new_rows = []
+                for row in page["rows"]:
+                    if row["id"] and row["id"] not in seen:
+                        new_rows.append(row)
+                        seen.add(row["id"])
+                out.extend(new_rows)
+                end_cursor, has_next = page["after"], page["has_next"]
+                result_count = page["result_count"] or result_count
+                if journal:
+                    journal.page(new_rows, end_cursor, has_next)
+
+                pager.success(size, page["edges"], has_next, page["latency"])
+                latencies.append(page["latency"])
+                page_count += 1
+                print(f"Page {page_count}: +{len(new_rows)} professors (Total: {len(out)}) "
+                      f"[first={size}, {page['edges']} items, {page['latency'] * 1000:.0f} ms]")
+                if not has_next:
+                    break
+
+            for fut in futures:
+                fut.cancel()
+
+    if latencies:
+        elapsed = time.monotonic() - listing_started
+        print(f"Listing: {len(latencies)} pages in {elapsed:.1f}s, "
+              f"avg {sum(latencies) / len(latencies) * 1000:.0f} ms/page, "
+              f"max {max(latencies) * 1000:.0f} ms, final page size {pager.size}")
 
     # Step 3: Fetch reviews for each professor
     if fetch_reviews:
         print("\n" + "=" * 60)
         print("Fetching reviews for each professor...")
         print("=" * 60)
-        total = len(out)
-        for idx, teacher in enumerate(out, 1):
-            teacher_id = teacher.get("id")
-            legacy_id = teacher.get("legacyId")
-            if teacher_id:
-                name = f"{teacher.get('firstName', '')} {teacher.get('lastName', '')}".strip()
-                print(f"[{idx}/{total}] Fetching reviews for {name}...", end=" ", flush=True)
-                reviews = fetch_teacher_reviews(session, teacher_id, legacy_id=legacy_id, count=5)
-                teacher["reviews"] = reviews
-                print(f"[OK] {len(reviews)} reviews")
-                time.sleep(0.5)  # Rate limiting between requests
-            else:
-                teacher["reviews"] = []
+        if resume:
+            for teacher in out:
+                if teacher.get("id") in resume["reviews"]:
+                    teacher["reviews"] = resume["reviews"][teacher["id"]]
+        if previous is not None:
+            to_fetch = reuse_previous_reviews(out, previous)
+        else:
+            to_fetch = [t for t in out if "reviews" not in t]
+        if workers > 1 or batch_size > 1:
+            fetch_reviews_concurrent(session, to_fetch, workers=workers, rate=rate, burst=burst,
+                                     batch_size=batch_size, journal=journal, retry=retry, limiter=limiter)
+        else:
+            total = len(to_fetch)
+            for idx, teacher in enumerate(to_fetch, 1):
+                teacher_id = teacher.get("id")
+                legacy_id = teacher.get("legacyId")
+                if teacher_id:
+                    name = f"{teacher.get('firstName', '')} {teacher.get('lastName', '')}".strip()
+                    print(f"[{idx}/{total}] Fetching reviews for {name}...", end=" ", flush=True)
+                    try:
+                        reviews = fetch_teacher_reviews(session, teacher_id, legacy_id=legacy_id, count=5,
+                                                        limiter=limiter, retry=retry)
+                    except RetryError as e:
+                        print(f"[FAILED] {e}")
+                        continue
+                    teacher["reviews"] = reviews
+                    if journal:
+                        journal.reviews(teacher)
+                    print(f"[OK] {len(reviews)} reviews")
+                    if limiter.rate <= 0:
+                        time.sleep(0.5)  # No rate limit configured: keep a fixed gap between teachers
+                else:
+                    teacher["reviews"] = []
 
     return out
 
 
+def fetch_reviews_concurrent(session: requests.Session, teachers: List[Dict[str, Any]],
+                             workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE,
+                             burst: int = DEFAULT_BURST, batch_size: int = 1,
+                             journal: Optional[Journal] = None,
+                             retry: Optional[RetryPolicy] = None,
+                             limiter: Optional[TokenBucket] = None) -> None:
+    """
+    Fill teacher["reviews"] for every teacher using a bounded thread pool.
+    At most `workers` requests are in flight and a shared token bucket keeps the overall
+    request rate at `rate` per second (or `limiter`, when shared with other work). With batch_size > 1 each request asks for the ratings
+    of up to `batch_size` teachers at once (see fetch_teacher_reviews_batch).
+    Results are written back onto each teacher dict, so the order and content of `teachers`
+    match the sequential path. Teachers of a request that finally fails keep no "reviews" key.
+    """
+    limiter = limiter or TokenBucket(rate, burst)
+    started = time.monotonic()
+
+    def work(batch: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        if len(batch) == 1:
+            teacher = batch[0]
+            return [fetch_teacher_reviews(session, teacher["id"], legacy_id=teacher.get("legacyId"),
+                                          count=5, limiter=limiter, retry=retry)]
+        return fetch_teacher_reviews_batch(session, batch, count=5, limiter=limiter, retry=retry)
+
+    pending = []
+    for teacher in teachers:
+        if teacher.get("id"):
+            pending.append(teacher)
+        else:
+            teacher["reviews"] = []
+    size = max(1, batch_size)
+    batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(work, batch): batch for batch in batches}
+        total = len(pending)
+        done = failed = 0
+        for fut in as_completed(futures):
+            try:
+                results = fut.result()
+            except RetryError as e:
+                failed += len(futures[fut])
+                print(f"[FAILED] {len(futures[fut])} professors: {e}")
+                continue
+            for teacher, reviews in zip(futures[fut], results):
+                teacher["reviews"] = reviews
+                if journal:
+                    journal.reviews(teacher)
+                done += 1
+                name = f"{teacher.get('firstName', '')} {teacher.get('lastName', '')}".strip()
+                print(f"[{done}/{total}] {name}: [OK] {len(reviews)} reviews")
+
+    elapsed = time.monotonic() - started
+    print(f"Fetched reviews for {done} professors with {len(batches)} requests in {elapsed:.1f}s "
+          f"({workers} workers, {rate:g} req/s, batch size {size})"
+          + (f"; {failed} failed" if failed else ""))
+
+
+# ---------------------------- Incremental state ----------------------------
+#
+# save() writes a sidecar `<prefix>.state.json` keyed by teacher id with the values the
+# pagination pass reports (numRatings, avgRating) and the raw reviews. The next run with
+# --incremental only re-fetches reviews for teachers whose numbers changed or who are new;
+# teachers missing from the new pagination pass are simply not carried over.
+
+def state_path(prefix: str = OUTPUT_PREFIX) -> str:
+    return f"{prefix}.state.json"
+
+
+def load_state(prefix: str = OUTPUT_PREFIX) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Load the previous run's state (teacher id -> numbers + reviews), or None if there is none."""
+    path = state_path(prefix)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("teachers", {})
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Warning: could not read {path} ({e}); doing a full refresh.")
+        return None
+
+
+def save_state(raw_rows: List[Dict[str, Any]], prefix: str = OUTPUT_PREFIX):
+    """Write the sidecar state used by the next --incremental run (streamed, atomically replaced)."""
+    path = state_path(prefix)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write('{"version":1,"saved_at":%s,"teachers":{' % json.dumps(time.strftime("%Y-%m-%d %H:%M:%S")))
+        first = True
+        for r in raw_rows:
+            if r.get("id") and "reviews" in r:
+                entry = {
+                    "numRatings": r.get("numRatings"),
+                    "avgRating": r.get("avgRating"),
+                    "reviews": r.get("reviews", []),
+                }
+                f.write("" if first else ",")
+                f.write(json.dumps(r["id"]) + ":" + json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+                first = False
+        f.write("}}")
+    os.replace(tmp, path)
+
+
+def reuse_previous_reviews(out: List[Dict[str, Any]],
+                           previous: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Copy reviews from `previous` onto teachers whose numRatings and avgRating are unchanged.
+    Teachers that already carry reviews (e.g. restored from a journal) are left alone.
+    Returns the teachers that still need their reviews fetched (changed or new).
+    """
+    to_fetch = []
+    unchanged = changed = new = 0
+    for teacher in out:
+        if "reviews" in teacher:
+            continue
+        prev = previous.get(teacher.get("id"))
+        if prev is None:
+            new += 1
+            to_fetch.append(teacher)
+        elif (prev.get("numRatings") == teacher.get("numRatings")
+              and prev.get("avgRating") == teacher.get("avgRating")):
+            unchanged += 1
+            teacher["reviews"] = prev.get("reviews", [])
+        else:
+            changed += 1
+            to_fetch.append(teacher)
+    current = {t.get("id") for t in out}
+    removed = sum(1 for tid in previous if tid not in current)
+    print(f"Incremental: {unchanged} unchanged, {changed} changed, {new} new, {removed} removed")
+    return to_fetch
+
+
 # ---------------------------- Export shaping ----------------------------
 
 def fmt2(x):
@@ -390,16 +977,15 @@ def fmt2(x):
         return ""
 
 
-def to_export_rows(raw_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def iter_export_rows(raw_rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
     """
-    Transform raw rows to the final schema:
+    Transform raw rows to the final schema, one row at a time:
       - Drop `id` and `legacyId`
       - Merge firstName + lastName -> Full_Name
       - Rename fields to Capitalized_Snake_Case
       - Format numeric values to two decimals as strings
       - Include latest 5 reviews
     """
-    export = []
     for r in raw_rows:
         full = f"{(r.get('firstName') or '').strip()} {(r.get('lastName') or '').strip()}".strip()
         
@@ -421,7 +1007,7 @@ def to_export_rows(raw_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             }
             formatted_reviews.append(formatted_review)
         
-        export.append({
+        yield {
             "Full_Name": full,
             "Department": r.get("department"),
             "Average_Rating": fmt2(r.get("avgRating")),
@@ -429,63 +1015,274 @@ def to_export_rows(raw_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             "Average_Difficulty": fmt2(r.get("avgDifficulty")),
             "Would_Take_Again_Percent": fmt2(r.get("wouldTakeAgainPercent")),
             "Latest_Reviews": formatted_reviews,
-        })
-    return export
-
-
-def save(out_rows: List[Dict[str, Any]], prefix: str = "rmp_deanza_all_professors"):
-    """Write both JSON and CSV with the required field names and formatting."""
-    export_rows = to_export_rows(out_rows)
-
-    # JSON - includes full review objects
-    print(f"\nSaving {len(export_rows)} professors to {prefix}.json...")
-    with open(f"{prefix}.json", "w", encoding="utf-8") as f:
-        json.dump(export_rows, f, ensure_ascii=False, indent=2)
-
-    # CSV - reviews stored as JSON strings for each review
-    fields = [
-        "Full_Name",
-        "Department",
-        "Average_Rating",
-        "Num_Ratings",
-        "Average_Difficulty",
-        "Would_Take_Again_Percent",
-        "Latest_Reviews",
-    ]
-    print(f"Saving {len(export_rows)} professors to {prefix}.csv...")
-    with open(f"{prefix}.csv", "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=fields)
-        w.writeheader()
-        for row in export_rows:
-            csv_row = {k: row.get(k, "") for k in fields}
-            # Convert reviews list to JSON string for CSV
-            if "Latest_Reviews" in csv_row and isinstance(csv_row["Latest_Reviews"], list):
-                csv_row["Latest_Reviews"] = json.dumps(csv_row["Latest_Reviews"], ensure_ascii=False)
-            w.writerow(csv_row)
-
-
-def main():
-    print("=" * 60)
-    print("De Anza College - ALL Professors Scraper")
-    print("(Including latest 5 reviews for each professor)")
-    print("=" * 60)
-    
-    with requests.Session() as s:
-        raw = fetch_all(s, fetch_reviews=True)
+        }
+
+
+def to_export_rows(raw_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """List form of iter_export_rows (the whole export in memory)."""
+    return list(iter_export_rows(raw_rows))
+
+
+EXPORT_FIELDS = [
+    "Full_Name",
+    "Department",
+    "Average_Rating",
+    "Num_Ratings",
+    "Average_Difficulty",
+    "Would_Take_Again_Percent",
+    "Latest_Reviews",
+]
+
+
+class ExportWriter:
+    """
+    Streams export rows to `<prefix>.json` (compact JSON array), `<prefix>.jsonl` (JSON Lines)
+    and `<prefix>.csv` in a single pass. Each row is serialized once and written to all three,
+    so memory stays flat regardless of the number of rows.
+    Files are written as `*.tmp` and renamed into place only when the writer closes cleanly;
+    on error the temporary files are removed and the previous outputs stay untouched.
+    """
+
+    def __init__(self, prefix: str = OUTPUT_PREFIX):
+        self.paths = [f"{prefix}.json", f"{prefix}.jsonl", f"{prefix}.csv"]
+        self.json_f = open(self.paths[0] + ".tmp", "w", encoding="utf-8")
+        self.jsonl_f = open(self.paths[1] + ".tmp", "w", encoding="utf-8")
+        self.csv_f = open(self.paths[2] + ".tmp", "w", encoding="utf-8", newline="")
+        self.csv_w = csv.DictWriter(self.csv_f, fieldnames=EXPORT_FIELDS)
+        self.csv_w.writeheader()
+        self.json_f.write("[")
+        self.count = 0
+
+    def write(self, row: Dict[str, Any]) -> None:
+        line = json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+        self.json_f.write(("," if self.count else "") + "\n" + line)
+        self.jsonl_f.write(line + "\n")
+
+        # CSV - reviews stored as JSON strings for each review
+        csv_row = {k: row.get(k, "") for k in EXPORT_FIELDS}
+        if isinstance(csv_row["Latest_Reviews"], list):
+            csv_row["Latest_Reviews"] = json.dumps(csv_row["Latest_Reviews"], ensure_ascii=False)
+        self.csv_w.writerow(csv_row)
+        self.count += 1
+
+    def close(self) -> None:
+        self.json_f.write("\n]\n")
+        for f in (self.json_f, self.jsonl_f, self.csv_f):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        for path in self.paths:
+            os.replace(path + ".tmp", path)
+
+    def abort(self) -> None:
+        for f in (self.json_f, self.jsonl_f, self.csv_f):
+            f.close()
+        for path in self.paths:
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+
+    def __enter__(self) -> "ExportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def save(out_rows: List[Dict[str, Any]], prefix: str = OUTPUT_PREFIX):
+    """
+    Write JSON, JSON Lines and CSV with the required field names and formatting, plus the
+    incremental state. Rows are shaped and written one at a time (see ExportWriter); the binary
+    snapshot is built by the API when it next loads the JSON file (see professor_snapshot.py).
+    """
+    print(f"\nSaving {len(out_rows)} professors to {prefix}.json / {prefix}.jsonl / {prefix}.csv...")
+    with ExportWriter(prefix) as w:
+        for row in iter_export_rows(out_rows):
+            w.write(row)
+
+    save_state(out_rows, prefix)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape all De Anza College professors from RateMyProfessors.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent requests (1 = original sequential loop)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="Maximum requests per second across all workers (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST,
+                        help="Token bucket size, i.e. how many requests may start back to back")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Teachers per batched GraphQL ratings request (1 = one request per teacher)")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Only re-fetch reviews for professors that changed since the last run "
+                             f"(uses {state_path()})")
+    parser.add_argument("--max-attempts", type=int, default=5,
+                        help="Attempts per request before it is given up")
+    parser.add_argument("--retry-budget", type=int, default=500,
+                        help="Maximum number of retries for the whole run")
+    parser.add_argument("--connect-timeout", type=float, default=DEFAULT_TIMEOUT[0],
+                        help="Seconds to wait for a connection")
+    parser.add_argument("--read-timeout", type=float, default=DEFAULT_TIMEOUT[1],
+                        help="Seconds to wait for a response")
+    parser.add_argument("--http2", action="store_true",
+                        help="Use HTTP/2 (requires `pip install httpx[http2]`)")
+    parser.add_argument("--schools", default=None,
+                        help="Comma-separated school ids to scrape in parallel instead of De Anza only")
+    parser.add_argument("--processes", type=int, default=4,
+                        help="Schools scraped at the same time with --schools (one process each)")
+    parser.add_argument("--shard-dir", default=SHARD_DIR,
+                        help="Output directory for --schools shards and index.json")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue an interrupted run from {journal_path()} instead of starting over")
+    parser.add_argument("--resume-max-age", type=float, default=DEFAULT_RESUME_MAX_AGE,
+                        help="With --resume, start over instead if the journal's run began more than "
+                             "this many hours ago (0 = resume at any age)")
+    return parser.parse_args(argv)
+
+
+def run_school(args: argparse.Namespace, school: int = DE_ANZA_SCHOOL_ID, prefix: str = OUTPUT_PREFIX,
+               limiter: Optional[TokenBucket] = None) -> Dict[str, Any]:
+    """
+    Scrape one school and save `<prefix>.*` (honouring --incremental / --resume per prefix).
+    Returns a summary dict; status is "failed" (with the journal kept) if the listing gave up.
+    """
+    started = time.monotonic()
+    summary = {"school": school, "prefix": prefix, "status": "ok", "professors": 0, "reviews": 0}
+
+    previous = load_state(prefix) if args.incremental else None
+    if args.incremental and previous is None:
+        print(f"No previous state in {state_path(prefix)}; fetching all reviews.")
+
+    resume = resume_from(journal_path(prefix), args.resume_max_age) if args.resume else None
+    journal = Journal(journal_path(prefix), resume=resume is not None)
+
+    retry = RetryPolicy(max_attempts=args.max_attempts, budget=args.retry_budget)
+    headers = {**HEADERS, "referer": school_search_url(school)}
+
+    try:
+        with make_session(headers, pool_size=max(1, args.workers),
+                          timeout=(args.connect_timeout, args.read_timeout), http2=args.http2) as s:
+            raw = fetch_all(s, fetch_reviews=True, workers=args.workers, rate=args.rate, burst=args.burst,
+                            batch_size=args.batch_size, previous=previous, journal=journal, resume=resume,
+                            retry=retry, school=school, limiter=limiter)
+    except RetryError as e:
+        journal.close()
+        print(f"\n[ERROR] {e}")
+        print("[RETRY] " + retry.report().replace("\n", "\n[RETRY] "))
+        print(f"[HTTP] {s.stats.report()}")
+        print(f"[INFO] Progress is kept in {journal_path(prefix)}; rerun with --resume to continue.")
+        summary.update(status="failed", error=str(e), seconds=round(time.monotonic() - started, 1))
+        return summary
     
     print("\n" + "=" * 60)
     print(f"[RESULT] Total professors collected: {len(raw)}")
     total_reviews = sum(len(prof.get("reviews", [])) for prof in raw)
     print(f"[RESULT] Total reviews collected: {total_reviews}")
+    missing = sum(1 for prof in raw if "reviews" not in prof)
+    if missing:
+        print(f"[RESULT] Professors whose reviews could not be fetched: {missing}")
+    print("[RETRY] " + retry.report().replace("\n", "\n[RETRY] "))
+    print(f"[HTTP] {s.stats.report()}")
     print("=" * 60)
     
-    save(raw)
-    
+    save(raw, prefix)
+    journal.discard()
+
+    summary.update(professors=len(raw), reviews=total_reviews, missing_reviews=missing,
+                   seconds=round(time.monotonic() - started, 1))
+    return summary
+
+
+# ---------------------------- Multi-school runs ----------------------------
+
+_shared_limiter: Optional[TokenBucket] = None
+
+
+def _init_school_worker(limiter: TokenBucket) -> None:
+    global _shared_limiter
+    _shared_limiter = limiter
+
+
+def _school_worker(args: argparse.Namespace, school: int, prefix: str) -> Dict[str, Any]:
+    return run_school(args, school, prefix, limiter=_shared_limiter)
+
+
+def run_schools(args: argparse.Namespace, schools: List[int], shard_dir: str = SHARD_DIR) -> Dict[str, Any]:
+    """
+    Scrape several schools in parallel, one process per school (at most --processes at a time),
+    all drawing from one SharedTokenBucket so --rate is a global limit.
+    Each school is written to `<shard_dir>/rmp_school_<id>.*`; `<shard_dir>/index.json`
+    lists every shard with its files and counts.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    limiter = SharedTokenBucket(args.rate, args.burst)
+    started = time.monotonic()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.processes, len(schools))),
+                             initializer=_init_school_worker, initargs=(limiter,)) as pool:
+        futures = {
+            pool.submit(_school_worker, args, school, os.path.join(shard_dir, f"rmp_school_{school}")): school
+            for school in schools
+        }
+        for fut in as_completed(futures):
+            try:
+                summary = fut.result()
+            except Exception as e:  # a crashed worker must not take the other shards down
+                summary = {"school": futures[fut], "status": "failed", "error": repr(e)}
+            print(f"[SCHOOL {summary['school']}] {summary['status']}: "
+                  f"{summary.get('professors', 0)} professors, {summary.get('reviews', 0)} reviews")
+            summaries.append(summary)
+
+    shards = []
+    for summary in sorted(summaries, key=lambda x: schools.index(x["school"])):
+        prefix = summary.get("prefix")
+        if prefix and summary["status"] == "ok":
+            summary["files"] = {ext: os.path.basename(f"{prefix}.{ext}") for ext in ("json", "jsonl", "csv")}
+        shards.append(summary)
+    index = {
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "seconds": round(time.monotonic() - started, 1),
+        "rate_limit": args.rate,
+        "total_professors": sum(x.get("professors", 0) for x in shards),
+        "total_reviews": sum(x.get("reviews", 0) for x in shards),
+        "shards": shards,
+    }
+    index_path = os.path.join(shard_dir, "index.json")
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+    print(f"\n[INDEX] {len(shards)} shards, {index['total_professors']} professors -> {index_path}")
+    return index
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    if args.schools:
+        schools = [int(x) for x in args.schools.split(",") if x.strip()]
+        print("=" * 60)
+        print(f"RateMyProfessors - {len(schools)} schools, {args.processes} processes, {args.rate:g} req/s total")
+        print("=" * 60)
+        index = run_schools(args, schools, args.shard_dir)
+        if any(x["status"] != "ok" for x in index["shards"]):
+            sys.exit(1)
+        return
+
+    print("=" * 60)
+    print("De Anza College - ALL Professors Scraper")
+    print("(Including latest 5 reviews for each professor)")
+    print("=" * 60)
+
+    summary = run_school(args)
+    if summary["status"] != "ok":
+        sys.exit(1)
+
     print("\n[SUCCESS] Data collection complete!")
-    print(f"[INFO] Total: {len(raw)} professors")
-    print(f"[INFO] Total reviews: {total_reviews}")
+    print(f"[INFO] Total: {summary['professors']} professors")
+    print(f"[INFO] Total reviews: {summary['reviews']}")
 
 
 if __name__ == "__main__":
     main()
-
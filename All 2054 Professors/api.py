@@ -3,15 +3,27 @@ De Anza College Professors API
 RESTful API for querying professor data from RateMyProfessors
 """
 
-from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from typing import Any, Hashable, Iterator, List, Optional, Tuple, Union
+import csv
+import io
 import json
 import os
+import threading
 import time
 
+from compression import MIN_SIZE, choose_encoding, compress, gzip_stream
+from fuzzy_names import MAX_DISTANCE
+from metrics import CONTENT_TYPE, Counter, Gauge, Histogram, MetricsMiddleware, Registry, route_label
+from professor_snapshot import SNAPSHOT_SUFFIX, load_snapshot, write_snapshot
+from professor_store import PROFESSOR_FIELDS, ProfessorStore, SORT_OPTIONS, decode_cursor, filters_digest
+from response_cache import ResponseCache, etag_matches
+from sqlite_store import DB_SUFFIX, SQLiteStore, import_export
+from static_assets import StaticAssets
+
 app = FastAPI(
     title="De Anza College Professors API",
     description="API for querying professor ratings and reviews from De Anza College",
@@ -27,24 +39,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+# The web interface, read and precompressed once at startup (see static_assets.py)
+static_assets = StaticAssets("static")
 
 # Load data on startup
 DATA_FILE = "rmp_deanza_all_professors.json"
-professors_data = []
+# Binary snapshot of DATA_FILE, much faster to load (see professor_snapshot.py). Written on a
+# background thread after each load of DATA_FILE, dated like DATA_FILE so a newer export still wins
+SNAPSHOT_FILE = os.path.splitext(DATA_FILE)[0] + SNAPSHOT_SUFFIX
+WRITE_SNAPSHOT = True
+# JSON Lines copy of the export, streamed into the database by the SQLite backend
+JSONL_FILE = os.path.splitext(DATA_FILE)[0] + ".jsonl"
+
+# Storage backend: "memory" (default) holds the dataset in a ProfessorStore; "sqlite" imports the
+# export into DB_FILE (see sqlite_store.py) and queries it per request, for datasets too large for RAM
+BACKEND = os.environ.get("PROFESSOR_BACKEND", "memory").lower()
+DB_FILE = os.environ.get("PROFESSOR_DB", os.path.splitext(DATA_FILE)[0] + DB_SUFFIX)
+
+Store = Union[ProfessorStore, SQLiteStore]
+
+# The current dataset with its indexes. load_data() builds a complete new store and publishes it
+# with a single assignment; handlers read `store` once and use that snapshot for the whole request.
+store: Store = ProfessorStore([])
+reload_lock = threading.Lock()  # one reload at a time
+snapshot_lock = threading.Lock()  # one snapshot write at a time
+snapshot_writer: Optional[threading.Thread] = None  # the latest snapshot write, if any
+
+# Serialized JSON responses of the read endpoints, keyed on ((path, params, dataset version), encoding);
+# encoding None holds the plain body, "gzip" / "br" the compressed copies of bodies of MIN_SIZE or more
+RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
+response_cache = ResponseCache(RESPONSE_CACHE_BYTES)
+
+# Professors serialized per write by the /export.* endpoints
+EXPORT_CHUNK = 500
+
+# Prometheus metrics served at /metrics (see metrics.py)
+metrics_registry = Registry()
+requests_total = metrics_registry.register(Counter(
+    "professors_api_requests_total", "HTTP requests by method, route and status",
+    ("method", "route", "status")))
+request_seconds = metrics_registry.register(Histogram(
+    "professors_api_request_duration_seconds", "HTTP request latency by method, route and status",
+    ("method", "route", "status")))
+phase_seconds = metrics_registry.register(Histogram(
+    "professors_api_phase_duration_seconds",
+    "Time spent in each phase of a handler: filter, search, pagination, serialization, compression",
+    ("route", "phase")))
+metrics_registry.register(Gauge(
+    "professors_api_dataset_professors", "Professors in the loaded dataset", fn=lambda: len(store)))
+load_seconds = metrics_registry.register(Histogram(
+    "professors_api_dataset_load_duration_seconds",
+    "Time to load the dataset at startup or on /reload, by outcome (loaded, missing, error)", ("outcome",)))
+loaded_at = metrics_registry.register(Gauge(
+    "professors_api_dataset_loaded_timestamp_seconds", "Unix time the current dataset was loaded"))
+metrics_registry.register(Counter(
+    "professors_api_response_cache_hits_total", "Read requests answered from the response cache",
+    fn=lambda: response_cache.hits))
+metrics_registry.register(Counter(
+    "professors_api_response_cache_misses_total", "Read requests not found in the response cache",
+    fn=lambda: response_cache.misses))
+metrics_registry.register(Gauge(
+    "professors_api_response_cache_hit_ratio", "Response cache hits / lookups since the API started",
+    fn=lambda: response_cache.hits / max(response_cache.hits + response_cache.misses, 1)))
+metrics_registry.register(Gauge(
+    "professors_api_response_cache_entries", "Bodies held in the response cache",
+    fn=lambda: len(response_cache.entries)))
+metrics_registry.register(Gauge(
+    "professors_api_response_cache_bytes", "Approximate size of the response cache", fn=lambda: response_cache.size))
+app.add_middleware(MetricsMiddleware, requests=requests_total, latency=request_seconds)
 
 
-def load_data():
-    """Load professor data from JSON file"""
-    global professors_data
+def _read_sqlite_store() -> Tuple[Optional[SQLiteStore], Optional[str]]:
+    """(store, file it came from): DB_FILE, (re)imported first if the export is newer."""
+    source = JSONL_FILE if os.path.exists(JSONL_FILE) else DATA_FILE
+    if os.path.exists(source) and (not os.path.exists(DB_FILE)
+                                   or os.path.getmtime(DB_FILE) < os.path.getmtime(source)):
+        print(f"Importing {source} into {DB_FILE}...")
+        import_export(source, DB_FILE)
+    if not os.path.exists(DB_FILE):
+        return None, None
+    try:
+        return SQLiteStore(DB_FILE), DB_FILE
+    except ValueError as e:  # e.g. written by an older version
+        if not os.path.exists(source):
+            raise
+        print(f"Warning: could not open {DB_FILE} ({e}); importing {source} again.")
+        import_export(source, DB_FILE)
+        return SQLiteStore(DB_FILE), DB_FILE
+
+
+def _read_store() -> Tuple[Optional[Store], Optional[str]]:
+    """(store, file it came from): the snapshot if it is at least as new as the JSON file, else the JSON file."""
+    if BACKEND == "sqlite":
+        return _read_sqlite_store()
+    if os.path.exists(SNAPSHOT_FILE) and (not os.path.exists(DATA_FILE)
+                                          or os.path.getmtime(SNAPSHOT_FILE) >= os.path.getmtime(DATA_FILE)):
+        try:
+            return load_snapshot(SNAPSHOT_FILE), SNAPSHOT_FILE
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not load {SNAPSHOT_FILE} ({e}); reading {DATA_FILE} instead.")
     if os.path.exists(DATA_FILE):
         with open(DATA_FILE, "r", encoding="utf-8") as f:
-            professors_data = json.load(f)
-        print(f"Loaded {len(professors_data)} professors from {DATA_FILE}")
-    else:
+            professors = json.load(f)
+        return ProfessorStore(professors), DATA_FILE
+    return None, None
+
+
+def write_data_snapshot(snapshot: ProfessorStore, mtime: float) -> None:
+    """Write SNAPSHOT_FILE from a store loaded from DATA_FILE, dated `mtime` (DATA_FILE's when it was read)."""
+    with snapshot_lock:
+        try:
+            write_snapshot(snapshot, SNAPSHOT_FILE, mtime)
+        except (OSError, ValueError) as e:
+            # Later starts read the JSON file again, so a missing snapshot only slows them down
+            print(f"Warning: could not write {SNAPSHOT_FILE}: {e}")
+
+
+def load_data() -> float:
+    """
+    Load professor data (snapshot or JSON file) and swap it in. Returns the load time in seconds.
+    After loading the JSON file, the snapshot is written on a background thread.
+    """
+    global store, snapshot_writer
+    with reload_lock:
+        started = time.perf_counter()
+        # Taken before reading, so an export replaced during the load is newer than its snapshot
+        data_mtime = os.path.getmtime(DATA_FILE) if os.path.exists(DATA_FILE) else None
+        try:
+            new_store, source = _read_store()
+        except Exception:
+            load_seconds.observe(time.perf_counter() - started, "error")
+            raise
+        if new_store is not None:
+            store = new_store
+            response_cache.clear()  # entries of the old dataset can never be hit again
+            elapsed = time.perf_counter() - started
+            load_seconds.observe(elapsed, "loaded")
+            loaded_at.set(time.time())
+            print(f"Loaded {len(new_store)} professors from {source} in {elapsed:.2f}s")
+            if source == DATA_FILE and WRITE_SNAPSHOT and data_mtime is not None:
+                snapshot_writer = threading.Thread(target=write_data_snapshot, args=(new_store, data_mtime),
+                                                   name="snapshot-writer", daemon=True)
+                snapshot_writer.start()
+            return elapsed
         print(f"Warning: {DATA_FILE} not found. API will return empty results.")
+        elapsed = time.perf_counter() - started
+        load_seconds.observe(elapsed, "missing")
+        return elapsed
 
 
 @app.on_event("startup")
@@ -56,21 +197,107 @@ async def startup_event():
 async def reload_data():
     """Reload professor data from JSON file (for updates)"""
     try:
-        load_data()
+        # Parse and index on a worker thread; requests keep using the old store until the swap
+        elapsed = await run_in_threadpool(load_data)
         return {
             "status": "success",
-            "message": f"Data reloaded successfully. {len(professors_data)} professors loaded.",
+            "message": f"Data reloaded successfully. {len(store)} professors loaded.",
+            "reload_seconds": round(elapsed, 3),
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reloading data: {str(e)}")
 
 
+def _projection(fields: Optional[str], summary: bool) -> Optional[Tuple[str, ...]]:
+    """Fields to include in each professor (None: all of them), from the fields= and summary= parameters."""
+    if fields is None and not summary:
+        return None
+    chosen = set(PROFESSOR_FIELDS)
+    if fields is not None:
+        names = {f.lower(): f for f in PROFESSOR_FIELDS}
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f.lower() not in names]
+        if unknown or not requested:
+            problem = f"Unknown field(s): {', '.join(unknown)}" if unknown else "No fields given"
+            raise HTTPException(status_code=400, detail=f"{problem}. Available: {', '.join(PROFESSOR_FIELDS)}")
+        chosen = {names[f.lower()] for f in requested}
+    if summary:
+        chosen.discard("Latest_Reviews")
+    return tuple(f for f in PROFESSOR_FIELDS if f in chosen)
+
+
+def _cache_key(request: Request, snapshot: Store, *params: Hashable) -> tuple:
+    """Cache key of a read endpoint: path, its parsed query parameters and the dataset version."""
+    return (request.url.path, params, snapshot.version)
+
+
+def _phase(request: Request, phase: str):
+    """Context manager timing a phase of the current handler (see phase_seconds)."""
+    return phase_seconds.time(route_label(request.scope), phase)
+
+
+def _cached_response(request: Request, key: tuple) -> Optional[Response]:
+    """The cached response for key (304 if the client already has it), or None on a miss."""
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    keys = ((key, encoding), (key, None)) if encoding is not None else ((key, None),)
+    found = response_cache.get_first(*keys)
+    if found is None:
+        return None
+    (_, cached_encoding), entry = found
+    if cached_encoding is not None:
+        return _etag_response(request, *entry, encoding)
+    return _encoded_response(request, key, *entry, encoding)
+
+
+def _store_response(request: Request, key: tuple, content: Any) -> Response:
+    """Serialize content the way JSONResponse does, cache it and return it."""
+    with _phase(request, "serialization"):
+        body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":")).encode("utf-8")
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    return _encoded_response(request, key, *response_cache.put((key, None), body), encoding)
+
+
+def _encoded_response(request: Request, key: tuple, etag: str, body: bytes, encoding: Optional[str]) -> Response:
+    """The plain body as the client accepts it: compressed (and cached) once it reaches MIN_SIZE."""
+    if encoding is None or len(body) < MIN_SIZE:
+        return _etag_response(request, etag, body, None)
+    with _phase(request, "compression"):
+        compressed = compress(body, encoding)
+    return _etag_response(request, *response_cache.put((key, encoding), compressed), encoding)
+
+
+def _etag_response(request: Request, etag: str, body: bytes, encoding: Optional[str]) -> Response:
+    # Each encoding is a different representation, so it has its own ETag (the hash of its bytes)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _stream_response(request: Request, chunks: Iterator[bytes], media_type: str, filename: str) -> StreamingResponse:
+    """A streamed export, gzipped on the fly when the client accepts it."""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if choose_encoding(request.headers.get("accept-encoding"), ("gzip",)):
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(request: Request, path: str):
+    """Files of the web interface, precompressed, with ETag and Cache-Control"""
+    return static_assets.response(request, path)
+
+
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serve the web interface"""
-    if os.path.exists("static/index.html"):
-        return FileResponse("static/index.html")
+    if "index.html" in static_assets:
+        return static_assets.response(request, "index.html")
     return {
         "message": "De Anza College Professors API",
         "version": "1.0.0",
@@ -80,19 +307,28 @@ async def root():
             "professors": "/professors",
             "professor_by_name": "/professors/name/{name}",
             "professor_by_department": "/professors/department/{department}",
+            "professor_reviews": "/professors/reviews?name={name}",
             "search": "/search",
-            "stats": "/stats"
+            "stats": "/stats",
+            "export_ndjson": "/export.ndjson",
+            "export_csv": "/export.csv",
+            "metrics": "/metrics"
         }
     }
 
 
 @app.get("/professors")
 async def get_professors(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     limit: int = Query(20, ge=1, le=100, description="Number of results per page"),
     department: Optional[str] = Query(None, description="Filter by department"),
     min_rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum average rating"),
     max_difficulty: Optional[float] = Query(None, ge=0, le=5, description="Maximum average difficulty"),
+    sort: Optional[str] = Query(None, description="Sort order: rating, num_ratings, difficulty (prefix '-' for descending) or name"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (replaces page)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. Full_Name,Average_Rating"),
+    summary: bool = Query(False, description="Leave out Latest_Reviews (see /professors/reviews)"),
     format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")
 ):
     """
@@ -103,78 +339,164 @@ async def get_professors(
     - **department**: Filter by department name
     - **min_rating**: Minimum average rating (0-5)
     - **max_difficulty**: Maximum average difficulty (0-5)
+    - **sort**: rating, -rating, num_ratings, -num_ratings, difficulty, -difficulty or name
+    - **cursor**: Continue after the previous page (keyset pagination; requires sort)
+    - **fields**: Only return these fields of each professor
+    - **summary**: Leave out Latest_Reviews
     """
     # Return HTML if format is not explicitly 'json'
-    if format != "json" and os.path.exists("static/professors.html"):
-        return FileResponse("static/professors.html")
-    filtered = professors_data.copy()
-    
-    # Apply filters
-    if department:
-        filtered = [p for p in filtered if p.get("Department", "").lower() == department.lower()]
-    
-    if min_rating is not None:
-        filtered = [
-            p for p in filtered
-            if (rating := _get_float(p.get("Average_Rating"))) is not None
-            and rating >= min_rating
-        ]
+    if format != "json" and "professors.html" in static_assets:
+        return static_assets.response(request, "professors.html")
+    snapshot = store
+    projection = _projection(fields, summary)
+    key = _cache_key(request, snapshot, page, limit, department, min_rating, max_difficulty, sort, cursor,
+                     projection)
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
+    if sort is None and cursor is None:
+        # Filter and paginate from the precomputed indexes
+        start = (page - 1) * limit
+        end = start + limit
+        with _phase(request, "filter"):
+            total, positions = snapshot.query(department, min_rating, max_difficulty, start, end)
+        with _phase(request, "serialization"):
+            paginated = snapshot.rows(positions, projection)
+        
+        return _store_response(request, key, {
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "total_pages": (total + limit - 1) // limit,
+            "data": paginated
+        })
     
-    if max_difficulty is not None:
-        filtered = [
-            p for p in filtered
-            if (difficulty := _get_float(p.get("Average_Difficulty"))) is not None
-            and difficulty <= max_difficulty
-        ]
+    # Sorted: walk the presorted ordering, from the cursor's key if one was given
+    after = None
+    filters = filters_digest(department, min_rating, max_difficulty)
+    if cursor is not None:
+        try:
+            cursor_sort, after, cursor_filters = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if sort is not None and sort != cursor_sort:
+            raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+        if cursor_filters != filters:
+            raise HTTPException(status_code=400, detail="Cursor was issued for different filters")
+        sort = cursor_sort
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort '{sort}'. Use one of: {', '.join(SORT_OPTIONS)}")
+    start = 0 if after is not None else (page - 1) * limit
+    with _phase(request, "pagination"):
+        total, positions, more = snapshot.sorted_page(sort, limit, start, after, department, min_rating,
+                                                      max_difficulty)
+        next_cursor = snapshot.cursor_after(sort, positions[-1], filters) if more else None
+    with _phase(request, "serialization"):
+        paginated = snapshot.rows(positions, projection)
     
-    # Pagination
-    total = len(filtered)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated = filtered[start:end]
-    
-    return {
+    return _store_response(request, key, {
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": (total + limit - 1) // limit,
+        "sort": sort,
+        "next_cursor": next_cursor,
         "data": paginated
-    }
+    })
+
+
+@app.get("/professors/reviews")
+async def get_professor_reviews(
+    request: Request,
+    name: str = Query(..., description="Professor's full name (case-insensitive exact match)"),
+    department: Optional[str] = Query(None, description="Department, to tell apart professors with the same name")
+):
+    """
+    Get the latest reviews of a professor (for list views fetched with summary=true)
+    
+    - **name**: Full_Name as returned by the list endpoints
+    - **department**: Optional department filter
+    """
+    snapshot = store
+    key = _cache_key(request, snapshot, name, department)
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
+    with _phase(request, "search"):
+        matches = snapshot.find_by_name(name, department)
+    
+    if not matches:
+        raise HTTPException(status_code=404, detail=f"Professor '{name}' not found")
+    
+    with _phase(request, "serialization"):
+        data = snapshot.rows(matches, ("Full_Name", "Department", "Latest_Reviews"))
+    return _store_response(request, key, {
+        "name": name,
+        "count": len(matches),
+        "data": data
+    })
 
 
 @app.get("/professors/name/{name}")
 async def get_professor_by_name(
+    request: Request,
     name: str,
+    fuzzy: bool = Query(False, description="Also match names with typos, closest first"),
+    max_distance: int = Query(MAX_DISTANCE, ge=0, le=MAX_DISTANCE, description="Edits tolerated per word with fuzzy=true"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. Full_Name,Average_Rating"),
+    summary: bool = Query(False, description="Leave out Latest_Reviews (see /professors/reviews)"),
     format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")
 ):
     """
     Get professor(s) by name (case-insensitive partial match)
     
     - **name**: Professor's name (can be partial match)
+    - **fuzzy**: Also return names within a small edit distance ("Smtih" finds "Smith"), ranked by distance
+    - **max_distance**: Largest edit distance per word for fuzzy matches (0-2; short words allow fewer)
+    - **fields**: Only return these fields of each professor
+    - **summary**: Leave out Latest_Reviews
     """
     # Return HTML if format is not explicitly 'json'
-    if format != "json" and os.path.exists("static/professors.html"):
-        return FileResponse("static/professors.html")
-    name_lower = name.lower()
-    matches = [
-        p for p in professors_data
-        if name_lower in p.get("Full_Name", "").lower()
-    ]
+    if format != "json" and "professors.html" in static_assets:
+        return static_assets.response(request, "professors.html")
+    snapshot = store
+    projection = _projection(fields, summary)
+    key = _cache_key(request, snapshot, fuzzy, max_distance, projection)
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
+    with _phase(request, "search"):
+        if fuzzy:
+            ranked = snapshot.fuzzy_search_names(name, max_distance)
+            positions = [i for i, _ in ranked]
+        else:
+            positions = snapshot.search_names(name)
+    with _phase(request, "serialization"):
+        matches = snapshot.rows(positions, projection)
     
     if not matches:
         raise HTTPException(status_code=404, detail=f"Professor(s) with name '{name}' not found")
     
-    return {
+    if fuzzy:
+        return _store_response(request, key, {
+            "count": len(matches),
+            "distances": [distance for _, distance in ranked],
+            "data": matches
+        })
+    return _store_response(request, key, {
         "count": len(matches),
         "data": matches
-    }
+    })
 
 
 @app.get("/professors/department/{department}")
 async def get_professors_by_department(
+    request: Request,
     department: str,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. Full_Name,Average_Rating"),
+    summary: bool = Query(False, description="Leave out Latest_Reviews (see /professors/reviews)"),
     format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")
 ):
     """
@@ -183,162 +505,210 @@ async def get_professors_by_department(
     - **department**: Department name
     - **page**: Page number
     - **limit**: Results per page
+    - **fields**: Only return these fields of each professor
+    - **summary**: Leave out Latest_Reviews
     """
     # Return HTML if format is not explicitly 'json'
-    if format != "json" and os.path.exists("static/professors.html"):
-        return FileResponse("static/professors.html")
-    matches = [
-        p for p in professors_data
-        if department.lower() == p.get("Department", "").lower()
-    ]
-    
-    if not matches:
-        raise HTTPException(status_code=404, detail=f"No professors found in department '{department}'")
-    
+    if format != "json" and "professors.html" in static_assets:
+        return static_assets.response(request, "professors.html")
+    snapshot = store
+    projection = _projection(fields, summary)
+    key = _cache_key(request, snapshot, page, limit, projection)
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
     # Pagination
-    total = len(matches)
     start = (page - 1) * limit
     end = start + limit
-    paginated = matches[start:end]
+    with _phase(request, "filter"):
+        total, positions = snapshot.department_page(department, start, end)
     
-    return {
+    if not total:
+        raise HTTPException(status_code=404, detail=f"No professors found in department '{department}'")
+    
+    with _phase(request, "serialization"):
+        paginated = snapshot.rows(positions, projection)
+    
+    return _store_response(request, key, {
         "department": department,
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": (total + limit - 1) // limit,
         "data": paginated
-    }
+    })
 
 
 @app.get("/search")
 async def search_professors(
+    request: Request,
     q: str = Query(..., description="Search query (searches in name and department)"),
+    reviews: bool = Query(False, description="Also search the text of review comments"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. Full_Name,Average_Rating"),
+    summary: bool = Query(False, description="Leave out Latest_Reviews (see /professors/reviews)"),
     format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")
 ):
     """
     Search professors by name or department
     
     - **q**: Search query
+    - **reviews**: Also match review comments (not indexed: a scan of every comment)
     - **page**: Page number
     - **limit**: Results per page
+    - **fields**: Only return these fields of each professor
+    - **summary**: Leave out Latest_Reviews
     """
     # Return HTML if format is not explicitly 'json'
-    if format != "json" and os.path.exists("static/professors.html"):
-        return FileResponse("static/professors.html")
-    query_lower = q.lower()
-    matches = [
-        p for p in professors_data
-        if query_lower in p.get("Full_Name", "").lower()
-        or query_lower in p.get("Department", "").lower()
-    ]
+    if format != "json" and "professors.html" in static_assets:
+        return static_assets.response(request, "professors.html")
+    snapshot = store
+    projection = _projection(fields, summary)
+    key = _cache_key(request, snapshot, q, reviews, page, limit, projection)
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
     
     # Pagination
-    total = len(matches)
     start = (page - 1) * limit
     end = start + limit
-    paginated = matches[start:end]
+    with _phase(request, "search"):
+        if reviews:  # a scan of every review comment: keep it off the event loop
+            total, positions = await run_in_threadpool(snapshot.search_page, q, start, end, reviews)
+        else:
+            total, positions = snapshot.search_page(q, start, end, reviews)
+    with _phase(request, "serialization"):
+        paginated = snapshot.rows(positions, projection)
     
-    return {
+    return _store_response(request, key, {
         "query": q,
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": (total + limit - 1) // limit,
         "data": paginated
-    }
+    })
 
 
 @app.get("/stats")
-async def get_stats(format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")):
+async def get_stats(
+    request: Request,
+    format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")
+):
     """Get statistics about the professor database"""
     # Return HTML if format is not explicitly 'json'
-    if format != "json" and os.path.exists("static/stats.html"):
-        return FileResponse("static/stats.html")
-    
-    if not professors_data:
-        return {"message": "No data available"}
-    
-    departments = {}
-    total_reviews = 0
-    ratings = []
-    difficulties = []
+    if format != "json" and "stats.html" in static_assets:
+        return static_assets.response(request, "stats.html")
     
-    for prof in professors_data:
-        # Department stats (only count non-empty departments)
-        dept = prof.get("Department")
-        if dept:  # Only count non-empty departments
-            departments[dept] = departments.get(dept, 0) + 1
-        
-        # Reviews count
-        num_ratings = prof.get("Num_Ratings", 0)
-        if isinstance(num_ratings, (int, float)):
-            total_reviews += num_ratings
-        
-        # Rating stats
-        rating = _get_float(prof.get("Average_Rating"))
-        if rating is not None:
-            ratings.append(rating)
-        
-        # Difficulty stats
-        difficulty = _get_float(prof.get("Average_Difficulty"))
-        if difficulty is not None:
-            difficulties.append(difficulty)
-    
-    return {
-        "total_professors": len(professors_data),
-        "total_reviews": total_reviews,
-        "departments": {
-            "count": len(departments),
-            "list": sorted(departments.keys())
-        },
-        "ratings": {
-            "average": sum(ratings) / len(ratings) if ratings else 0,
-            "min": min(ratings) if ratings else 0,
-            "max": max(ratings) if ratings else 0
-        },
-        "difficulty": {
-            "average": sum(difficulties) / len(difficulties) if difficulties else 0,
-            "min": min(difficulties) if difficulties else 0,
-            "max": max(difficulties) if difficulties else 0
-        },
-        "top_departments": sorted(
-            departments.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]
-    }
+    snapshot = store
+    key = _cache_key(request, snapshot)
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
+    if snapshot.stats is None:
+        return _store_response(request, key, {"message": "No data available"})
+    return _store_response(request, key, snapshot.stats)
 
 
 @app.get("/departments")
-async def get_departments(format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")):
+async def get_departments(
+    request: Request,
+    format: Optional[str] = Query(None, description="Response format: 'json' or 'html'")
+):
     """Get list of all departments"""
     # Return HTML if format is not explicitly 'json'
-    if format != "json" and os.path.exists("static/departments.html"):
-        return FileResponse("static/departments.html")
+    if format != "json" and "departments.html" in static_assets:
+        return static_assets.response(request, "departments.html")
     
-    departments = set()
-    for prof in professors_data:
-        dept = prof.get("Department")
-        if dept:
-            departments.add(dept)
+    snapshot = store
+    key = _cache_key(request, snapshot)
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
+    return _store_response(request, key, snapshot.departments)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request counts and latencies, handler phases, dataset and response cache"""
+    return Response(metrics_registry.render(), media_type=CONTENT_TYPE)
+
+
+def _export_chunks(snapshot: Store, projection: Optional[Tuple[str, ...]], department: Optional[str],
+                   min_rating: Optional[float], max_difficulty: Optional[float]) -> Iterator[List[dict]]:
+    """The filtered professors of one dataset snapshot, EXPORT_CHUNK rows at a time."""
+    for positions in snapshot.export_positions(department, min_rating, max_difficulty, EXPORT_CHUNK):
+        yield snapshot.rows(positions, projection)
+
+
+def _ndjson_stream(chunks: Iterator[List[dict]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield "".join(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+                      for row in rows).encode("utf-8")
+
+
+def _csv_stream(chunks: Iterator[List[dict]], fieldnames: Tuple[str, ...]) -> Iterator[bytes]:
+    """Same layout as the scraper's CSV export: reviews as a JSON string, missing fields empty."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fieldnames)
+    writer.writeheader()
+    for rows in chunks:
+        for row in rows:
+            csv_row = {k: row.get(k, "") for k in fieldnames}
+            if isinstance(csv_row.get("Latest_Reviews"), list):
+                csv_row["Latest_Reviews"] = json.dumps(csv_row["Latest_Reviews"], ensure_ascii=False)
+            writer.writerow(csv_row)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():  # header only: no professors matched
+        yield buf.getvalue().encode("utf-8")
+
+
+@app.get("/export.ndjson")
+async def export_ndjson(
+    request: Request,
+    department: Optional[str] = Query(None, description="Filter by department"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum average rating"),
+    max_difficulty: Optional[float] = Query(None, ge=0, le=5, description="Maximum average difficulty"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. Full_Name,Average_Rating"),
+    summary: bool = Query(False, description="Leave out Latest_Reviews")
+):
+    """
+    Stream every professor matching the filters as JSON Lines (one professor per line)
     
-    return {
-        "count": len(departments),
-        "departments": sorted(list(departments))
-    }
+    - **department**, **min_rating**, **max_difficulty**: Same filters as /professors
+    - **fields**: Only return these fields of each professor
+    - **summary**: Leave out Latest_Reviews
+    """
+    snapshot = store  # the whole export comes from one dataset, even if a reload happens meanwhile
+    projection = _projection(fields, summary)
+    chunks = _export_chunks(snapshot, projection, department, min_rating, max_difficulty)
+    return _stream_response(request, _ndjson_stream(chunks), "application/x-ndjson", "professors.ndjson")
 
 
-def _get_float(value):
-    """Convert value to float, return None if conversion fails"""
-    if value is None or value == "":
-        return None
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return None
+@app.get("/export.csv")
+async def export_csv(
+    request: Request,
+    department: Optional[str] = Query(None, description="Filter by department"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum average rating"),
+    max_difficulty: Optional[float] = Query(None, ge=0, le=5, description="Maximum average difficulty"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. Full_Name,Average_Rating"),
+    summary: bool = Query(False, description="Leave out Latest_Reviews")
+):
+    """
+    Stream every professor matching the filters as CSV (the scraper's CSV layout)
+    
+    - **department**, **min_rating**, **max_difficulty**: Same filters as /professors
+    - **fields**: Only return these columns
+    - **summary**: Leave out Latest_Reviews
+    """
+    snapshot = store
+    projection = _projection(fields, summary)
+    chunks = _export_chunks(snapshot, projection, department, min_rating, max_difficulty)
+    return _stream_response(request, _csv_stream(chunks, projection or PROFESSOR_FIELDS),
+                            "text/csv", "professors.csv")  # Starlette adds "; charset=utf-8"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+"""
+Micro-benchmark: Relay store extraction from server-rendered RateMyProfessors pages.
+
+Compares the original character-by-character `balanced_json_after` + json.loads
+(kept below as `legacy_extract`) with the current `balanced_json_after` and with
+`relay_store_after`, which decodes straight from the marker offset.
+
+Usage:
+    python benchmarks/bench_relay_extract.py [saved_page.html ...] [--repeat N]
+
+Without arguments a synthetic multi-megabyte page is generated.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DeAnza_AllProfessors import RELAY_MARKER, balanced_json_after, relay_store_after  # noqa: E402
+
+
+def legacy_balanced_json_after(marker: str, text: str) -> str:
+    """The original pure-Python scanner, kept verbatim for comparison."""
+    start = text.find(marker)
+    if start == -1:
+        raise ValueError("marker not found")
+
+    i = start + len(marker)
+    while i < len(text) and text[i] in " \t\r\n=":
+        i += 1
+    if i >= len(text) or text[i] != '{':
+        raise ValueError("JSON does not start with '{' after marker")
+
+    depth = 0
+    j = i
+    in_str = False
+    esc = False
+    while j < len(text):
+        ch = text[j]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        else:
+            if ch == '"':
+                in_str = True
+            elif ch == '{':
+                depth += 1
+            elif ch == '}':
+                depth -= 1
+                if depth == 0:
+                    j += 1
+                    break
+        j += 1
+    return text[i:j]
+
+
+def legacy_extract(html: str):
+    return json.loads(legacy_balanced_json_after(RELAY_MARKER, html))
+
+
+def current_balanced_extract(html: str):
+    return json.loads(balanced_json_after(RELAY_MARKER, html))
+
+
+def current_raw_decode(html: str):
+    return relay_store_after(RELAY_MARKER, html)
+
+
+def synthetic_page(num_teachers: int = 3000, ratings_per_teacher: int = 5, seed: int = 7) -> str:
+    """Build an HTML page shaped like the SSR search page, with a large Relay store."""
+    rnd = random.Random(seed)
+    words = ["great", "clear", "tough", "fair", "{braces}", "\"quoted\"", "back\\slash", "课程", "lectures"]
+    store = {}
+    for t in range(num_teachers):
+        tid = f"VGVhY2hlci0{t}"
+        store[tid] = {
+            "__id": tid, "__typename": "Teacher", "id": tid, "legacyId": 100000 + t,
+            "firstName": f"First{t}", "lastName": f"Last{t}", "department": rnd.choice(["Math", "English", "Physics"]),
+            "avgRating": round(rnd.uniform(1, 5), 1), "numRatings": rnd.randint(0, 200),
+            "avgDifficulty": round(rnd.uniform(1, 5), 1), "wouldTakeAgainPercent": rnd.uniform(0, 100),
+        }
+        for r in range(ratings_per_teacher):
+            rid = f"UmF0aW5nLT{t}-{r}"
+            store[rid] = {
+                "__id": rid, "__typename": "Rating", "comment": " ".join(rnd.choice(words) for _ in range(40)),
+                "date": "2024-01-01 00:00:00 +0000 UTC", "clarityRating": rnd.randint(1, 5),
+                "difficultyRating": rnd.randint(1, 5), "class": "MATH1A",
+            }
+    store["client:root:pageInfo"] = {"__typename": "PageInfo", "endCursor": "YXJyYXljb25uZWN0aW9uOjc=", "hasNextPage": True}
+    padding = "<div>" + "x" * 200_000 + "</div>"
+    return (
+        "<html><head><script>var a = {\"not\": \"this\"};</script></head><body>" + padding
+        + "<script>" + RELAY_MARKER + json.dumps(store, ensure_ascii=False) + ";\n"
+        + "window.appConfig = {};</script>" + padding + "</body></html>"
+    )
+
+
+def best_of(fn, html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(pages, repeat: int):
+    variants = [
+        ("legacy char loop + loads", legacy_extract),
+        ("regex scan + loads", current_balanced_extract),
+        ("raw_decode at offset", current_raw_decode),
+    ]
+    results = []
+    for name, html in pages:
+        expected = legacy_extract(html)
+        print(f"\n{name}: {len(html) / 1e6:.1f} MB")
+        base = None
+        for label, fn in variants:
+            assert fn(html) == expected, f"{label} disagrees with the legacy extractor"
+            t = best_of(fn, html, repeat)
+            base = base or t
+            print(f"  {label:<26} {t * 1000:9.1f} ms   x{base / t:5.1f}")
+            results.append({"page": name, "variant": label, "seconds": t})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="Saved HTML pages containing window.__RELAY_STORE__")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = []
+        for path in args.pages:
+            with open(path, "r", encoding="utf-8") as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [("synthetic", synthetic_page())]
+    run(pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Startup benchmark: loading the API dataset from the JSON export vs. from the binary snapshot.
+
+"json" is what api.py did before snapshots: json.load of rmp_deanza_all_professors.json and
+building the ProfessorStore indexes. "snapshot" is professor_snapshot.load_snapshot on the file
+the scraper now writes next to it. Both are timed (best of --repeat) and measured for peak
+Python memory (tracemalloc, separate pass).
+
+Usage:
+    python benchmarks/bench_startup.py [export.json] [--rows N] [--repeat N]
+
+Without a file, a synthetic export of --rows professors (see synthetic.py) is generated in a
+temporary directory.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from professor_snapshot import load_snapshot, write_snapshot  # noqa: E402
+from professor_store import ProfessorStore  # noqa: E402
+from synthetic import export_rows, write_export  # noqa: E402
+
+
+def load_json(path: str) -> ProfessorStore:
+    with open(path, "r", encoding="utf-8") as f:
+        return ProfessorStore(json.load(f))
+
+
+def best_of(fn, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def peak_memory(fn, path: str) -> int:
+    tracemalloc.start()
+    try:
+        store = fn(path)  # noqa: F841 - keep the result alive while measuring
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(json_path: str, snapshot_path: str, repeat: int):
+    started = time.perf_counter()
+    reference = load_json(json_path)
+    write_snapshot(reference, snapshot_path)
+    print(f"{len(reference)} professors; JSON {os.path.getsize(json_path) / 1e6:.1f} MB, "
+          f"snapshot {os.path.getsize(snapshot_path) / 1e6:.1f} MB (built in {time.perf_counter() - started:.1f}s)")
+    assert load_snapshot(snapshot_path).rows(range(len(reference))) == reference.rows(range(len(reference)))
+
+    results = []
+    base = None
+    for label, fn, path in [("json.load + indexes", load_json, json_path),
+                            ("snapshot", load_snapshot, snapshot_path)]:
+        t = best_of(fn, path, repeat)
+        peak = peak_memory(fn, path)
+        base = base or t
+        print(f"  {label:<20} {t * 1000:9.1f} ms   x{base / t:7.1f}   peak {peak / 1e6:7.1f} MB")
+        results.append({"variant": label, "seconds": t, "peak_bytes": peak})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("export", nargs="?", help="rmp_deanza_all_professors.json (default: synthetic)")
+    parser.add_argument("--rows", type=int, default=50_000, help="Synthetic professors to generate")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = args.export
+        if json_path is None:
+            json_path = os.path.join(tmp, "export.json")
+            write_export(export_rows(args.rows), json_path)
+        run(json_path, os.path.join(tmp, "export.snapshot"), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
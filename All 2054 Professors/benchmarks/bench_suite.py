@@ -0,0 +1,296 @@
+"""
+Benchmark suite: the API's load and query paths and the scraper's export path, on synthetic data.
+
+For each dataset size (2k, 50k, 500k professors; see synthetic.py) it times:
+  - to_export_rows and save() on the scraper's raw rows
+  - api.load_data() from the JSON export, writing the binary snapshot of the loaded store, and
+    api.load_data() from that snapshot
+  - the query path of every read endpoint handler, called directly (no HTTP) with the response
+    cache disabled, so each call filters, searches, pages and serializes (plus the fuzzy name
+    lookup on its own, which the name endpoint's serialization otherwise hides)
+  - balanced_json_after on a server-rendered search page with size / 10 teachers
+Each case keeps the best of --repeat runs (fast cases run in a loop, timed per call).
+
+Results can be written with --output and compared with a stored baseline: cases more than
+--threshold slower than benchmarks/baseline.json are reported and the exit status is 1.
+Refresh the baseline with --update-baseline after an intended change, on the machine the
+comparisons will run on; on a shared or different machine, --normalize compares each case
+against the run's median change instead of the absolute times.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 2k,50k] [--repeat 5] [--only REGEX]
+                                     [--baseline FILE] [--compare] [--normalize] [--update-baseline]
+                                     [--threshold 0.25] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import inspect
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Request  # noqa: E402
+
+import api  # noqa: E402
+from DeAnza_AllProfessors import RELAY_MARKER, balanced_json_after, save, to_export_rows  # noqa: E402
+from bench_relay_extract import synthetic_page  # noqa: E402
+from synthetic import SIZES, parse_size, raw_rows  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+MIN_SAMPLE_SECONDS = 0.05  # fast cases repeat in a loop until a sample takes this long
+MAX_CASE_SECONDS = 60.0    # slow cases stop repeating once they have used this much
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> float:
+    """
+    Best seconds per call of fn over `repeat` samples. As in timeit, the garbage collector is off
+    while timing: a full collection of the loaded dataset's objects would otherwise land in
+    random samples and dwarf the query being measured.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        fn()
+        once = time.perf_counter() - started
+        number = max(1, int(MIN_SAMPLE_SECONDS / once)) if once > 0 else 1000
+        best = once if number == 1 else float("inf")
+        spent = once
+        for _ in range(repeat - (number == 1)):
+            if spent > MAX_CASE_SECONDS:
+                break
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = time.perf_counter() - started
+            spent += elapsed
+            best = min(best, elapsed / number)
+    finally:
+        gc.enable()
+    return best
+
+
+def _handler_kwargs(handler: Callable, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """The handler's arguments as FastAPI would pass them: parameters that are not given take their Query defaults."""
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": [],
+             "app": api.app, "endpoint": handler}
+    kwargs = {}
+    for name, parameter in inspect.signature(handler).parameters.items():
+        if name == "request":
+            kwargs[name] = Request(scope)
+        elif name in params:
+            kwargs[name] = params[name]
+        else:
+            kwargs[name] = getattr(parameter.default, "default", parameter.default)
+    return kwargs
+
+
+def call_handler(handler: Callable, path: str, **params: Any) -> Any:
+    """
+    Run an endpoint handler the way FastAPI would, without HTTP. Most read handlers never await,
+    so the coroutine completes in one step; see call_async_handler for those that do.
+    """
+    coro = handler(**_handler_kwargs(handler, path, params))
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    coro.close()
+    raise RuntimeError(f"{handler.__name__} awaited; benchmark it with call_async_handler")
+
+
+def call_async_handler(handler: Callable, path: str, **params: Any) -> Any:
+    """call_handler for a handler that awaits (e.g. run_in_threadpool), run on an event loop."""
+    return asyncio.run(handler(**_handler_kwargs(handler, path, params)))
+
+
+def handler_cases() -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, fn) for the query path of each read endpoint, with parameters chosen to match data."""
+    department = "Mathematics"
+    first = json.loads(call_handler(api.get_professors, "/professors", format="json", limit=1).body)["data"][0]
+    name = first["Full_Name"]
+    last = name.split()[-1]
+    typo = last[:1] + last[2:3] + last[1:2] + last[3:] if len(last) > 3 else last
+    cursor = json.loads(call_handler(api.get_professors, "/professors", format="json", sort="-rating",
+                                     page=5).body)["next_cursor"]
+    return [
+        ("professors", lambda: call_handler(api.get_professors, "/professors", format="json", page=3)),
+        ("professors[filtered]", lambda: call_handler(
+            api.get_professors, "/professors", format="json", department=department, min_rating=3.5, max_difficulty=3)),
+        ("professors[broad]", lambda: call_handler(
+            api.get_professors, "/professors", format="json", min_rating=1, max_difficulty=5, page=3)),
+        ("professors[sorted]", lambda: call_handler(
+            api.get_professors, "/professors", format="json", sort="-rating", page=5)),
+        ("professors[cursor]", lambda: call_handler(
+            api.get_professors, "/professors", format="json", cursor=cursor)),
+        ("professors[summary]", lambda: call_handler(
+            api.get_professors, "/professors", format="json", page=3, limit=100, summary=True)),
+        ("professors/reviews", lambda: call_handler(api.get_professor_reviews, "/professors/reviews", name=name)),
+        ("professors/name", lambda: call_handler(
+            api.get_professor_by_name, "/professors/name/{name}", name=last, format="json")),
+        ("professors/name[fuzzy]", lambda: call_handler(
+            api.get_professor_by_name, "/professors/name/{name}", name=typo, fuzzy=True, format="json")),
+        ("fuzzy_search_names", lambda: api.store.fuzzy_search_names(typo)),  # the lookup without the response
+        ("professors/department", lambda: call_handler(
+            api.get_professors_by_department, "/professors/department/{department}", department=department,
+            page=2, format="json")),
+        ("search", lambda: call_handler(api.search_professors, "/search", q="math", format="json")),
+        ("search[short]", lambda: call_handler(api.search_professors, "/search", q="s", format="json")),
+        ("search[reviews]", lambda: call_async_handler(
+            api.search_professors, "/search", q="office hours", reviews=True, format="json")),
+        ("stats", lambda: call_handler(api.get_stats, "/stats", format="json")),
+        ("departments", lambda: call_handler(api.get_departments, "/departments", format="json")),
+    ]
+
+
+def run_size(label: str, num_professors: int, repeat: int, only: Optional[re.Pattern], workdir: str) -> Dict[str, float]:
+    """Seconds per case for one dataset size."""
+    results: Dict[str, float] = {}
+
+    def bench(case: str, fn: Callable[[], Any]) -> None:
+        if only is not None and not only.search(case):
+            return
+        with contextlib.redirect_stdout(io.StringIO()):  # save() and load_data() report progress
+            results[case] = measure(fn, repeat)
+        print(f"  {case:<28} {results[case] * 1000:12.3f} ms")
+
+    print(f"\n{label}: {num_professors} professors")
+    prefix = os.path.join(workdir, os.path.splitext(api.DATA_FILE)[0])
+    raw = list(raw_rows(num_professors))
+    bench("to_export_rows", lambda rows=raw: to_export_rows(rows))
+    with contextlib.redirect_stdout(io.StringIO()):
+        save(raw, prefix)  # the files load_data reads, even if save itself is filtered out
+    bench("save", lambda rows=raw: save(rows, prefix))
+    del raw  # the lambdas hold their own reference only while they are being timed
+
+    os.chdir(workdir)  # api's data paths are relative to the working directory
+    snapshot_file = api.SNAPSHOT_FILE
+    api.SNAPSHOT_FILE = snapshot_file + ".none"
+    api.WRITE_SNAPSHOT = False  # timed on its own below
+    bench("load_data[json]", api.load_data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if "load_data[json]" not in results:
+            api.load_data()  # the store the snapshot is written from
+    api.SNAPSHOT_FILE = snapshot_file
+    api.WRITE_SNAPSHOT = True
+    data_mtime = os.path.getmtime(api.DATA_FILE)
+    with contextlib.redirect_stdout(io.StringIO()):
+        api.write_data_snapshot(api.store, data_mtime)  # the file load_data[snapshot] reads
+    bench("write_snapshot", lambda: api.write_data_snapshot(api.store, data_mtime))
+    with contextlib.redirect_stdout(io.StringIO()):
+        api.load_data()  # handlers run on the store the API would serve: the snapshot
+    bench("load_data[snapshot]", api.load_data)
+
+    api.response_cache.max_bytes = 0  # nothing is cached: every call takes the full query path
+    for case, fn in handler_cases():
+        bench(case, fn)
+
+    page = synthetic_page(max(num_professors // 10, 1))
+    bench("balanced_json_after", lambda: balanced_json_after(RELAY_MARKER, page))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float,
+            normalize: bool = False) -> int:
+    """
+    Print current vs. baseline per case; returns the number of regressions. With normalize, each
+    ratio is divided by the median ratio of the run, so a machine that is uniformly slower (or
+    faster) than the one that recorded the baseline only shows the cases that changed relative
+    to the others.
+    """
+    ratios = [seconds / baseline[size][case] for size, cases in results.items()
+              for case, seconds in cases.items() if case in baseline.get(size, {})]
+    scale = statistics.median(ratios) if normalize and ratios else 1.0
+    if normalize:
+        print(f"\nMedian ratio to the baseline: {scale:.2f} (ratios below are divided by it)")
+    regressions = 0
+    print(f"\n{'size':<6} {'case':<28} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for size, cases in results.items():
+        for case, seconds in cases.items():
+            base = baseline.get(size, {}).get(case)
+            if base is None:
+                print(f"{size:<6} {case:<28} {'-':>12} {seconds * 1000:12.3f}       new")
+                continue
+            ratio = seconds / base / scale
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif ratio < 1 / (1 + threshold):
+                flag = "  faster"
+            print(f"{size:<6} {case:<28} {base * 1000:12.3f} {seconds * 1000:12.3f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="2k,50k", help=f"Comma-separated dataset sizes ({', '.join(SIZES)} or a number)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="Only run cases whose name matches this regular expression")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline results file")
+    parser.add_argument("--compare", action="store_true", help="Compare with the baseline; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown reported as a regression (0.25 = 25%%)")
+    parser.add_argument("--normalize", action="store_true",
+                        help="Compare each case relative to the run's median change (for noisy or different machines)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    only = re.compile(args.only) if args.only else None
+    cwd = os.getcwd()
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        for size in args.sizes.split(","):
+            with tempfile.TemporaryDirectory() as tmp:
+                results[size.strip()] = run_size(size.strip(), parse_size(size), args.repeat, only, tmp)
+                os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%d"),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        baseline = {"results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        for size, cases in results.items():  # sizes and cases not run this time keep their values
+            baseline["results"].setdefault(size, {}).update(cases)
+        baseline.update({k: v for k, v in report.items() if k != "results"})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+    if args.compare:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold, args.normalize)
+        if regressions:
+            print(f"\n{regressions} case(s) more than {args.threshold:.0%} slower than {args.baseline}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Synthetic datasets for the benchmarks, in the scraper's own shapes.
+
+raw_rows() yields the teacher rows fetch_all collects (teacher_row fields plus the "reviews"
+review_from_node builds); export_rows() passes them through iter_export_rows, so its professors
+are exactly what to_export_rows / save() write and the API loads. Names are drawn from a few
+hundred first and last names (so they repeat, as real ones do) and reviews from a shared pool,
+which keeps the 500k dataset within a few GB of memory.
+"""
+
+import base64
+import json
+import os
+import random
+import sys
+from typing import Any, Dict, Iterable, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DeAnza_AllProfessors import iter_export_rows  # noqa: E402
+
+# Benchmark tiers
+SIZES = {"2k": 2_000, "50k": 50_000, "500k": 500_000}
+
+FIRST = ["Mary", "John", "Li", "Omar", "Ana", "Wei", "Sara", "David", "Minh", "Priya", "José", "Fatima",
+         "Kevin", "Linh", "Elena", "Hiroshi", "Grace", "Ahmed", "Olga", "Carlos", "Mei", "Daniel", "Nadia",
+         "Tom", "Chloé", "Ravi", "Laura", "Yusuf", "Ingrid", "Pedro"]
+_SYLLABLES = ["ng", "gar", "smi", "won", "bro", "lee", "pat", "kim", "lo", "chen", "ha", "mar", "tin",
+              "son", "vas", "quez", "ber", "ger", "o'", "mc", "dow", "ell", "ski", "ova", "rez"]
+DEPARTMENTS = ["Mathematics", "English", "Physics", "Computer Science", "History", "Biology", "Chemistry",
+               "Economics", "Art", "Music", "Psychology", "Accounting", "Business", "Philosophy",
+               "Sociology", "Political Science", "Nursing", "Spanish", "Chinese", "Film & TV",
+               "Physical Education", "Astronomy", "Geography", "Anthropology", "Communication Studies",
+               "Automotive Technology", "Design", "Environmental Studies", "Health", "Languages"]
+CLASSES = ["MATH", "ENGL", "PHYS", "CIS", "HIST", "BIOL", "CHEM", "ECON", "ART", "MUSI", "PSYC", "ACCT"]
+WORDS = ["great", "clear", "tough", "fair", "lectures", "homework", "exams", "helpful", "grading", "quizzes",
+         "caring", "boring", "participation", "textbook", "online", "labs", "课程", "essays", "office",
+         "hours", "recommend", "hard", "easy", "lots", "of", "the", "and", "but", "very", "class"]
+
+REVIEW_POOL = 5_000
+
+
+def last_names(rnd: random.Random) -> List[str]:
+    """A few hundred last names built from syllables, plus some with punctuation and accents."""
+    names = {"".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 3))).capitalize()
+             for _ in range(600)}
+    return sorted(names) + ["Smith-Jones", "Nguyen", "García", "O'Neil"]
+
+
+def review_pool(rnd: random.Random) -> List[Dict[str, Any]]:
+    """Reviews as review_from_node returns them; professors share these dicts."""
+    return [{
+        "comment": " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(5, 60))),
+        "date": f"20{rnd.randint(15, 24)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 00:00:00 +0000 UTC",
+        "qualityRating": rnd.randint(1, 5),
+        "difficultyRating": rnd.randint(1, 5),
+        "isOnlineClass": rnd.random() < 0.3,
+        "isForCredit": rnd.random() < 0.9,
+        "wouldTakeAgain": rnd.choice([True, False, None]),
+        "grade": rnd.choice(["A", "A-", "B+", "B", "C", "", "Not sure yet", "Rather not say"]),
+        "textbookUse": rnd.choice([None, 0, 3, 5]),
+        "attendanceMandatory": rnd.choice(["mandatory", "non mandatory", ""]),
+        "class": f"{rnd.choice(CLASSES)}{rnd.randint(1, 99)}{rnd.choice(['', 'A', 'B', 'H'])}",
+    } for _ in range(REVIEW_POOL)]
+
+
+def raw_rows(num_professors: int, seed: int = 7) -> Iterator[Dict[str, Any]]:
+    """Teacher rows as the scraper holds them before export (about 10% without ratings)."""
+    rnd = random.Random(seed)
+    lasts = last_names(rnd)
+    reviews = review_pool(rnd)
+    for i in range(num_professors):
+        has_ratings = rnd.random() > 0.1
+        num_ratings = min(int(rnd.paretovariate(1.2)), 2000) if has_ratings else 0
+        yield {
+            "id": base64.b64encode(f"Teacher-{1000000 + i}".encode()).decode(),
+            "legacyId": 1000000 + i,
+            "firstName": rnd.choice(FIRST),
+            "lastName": rnd.choice(lasts),
+            "department": rnd.choice(DEPARTMENTS) if rnd.random() > 0.02 else None,
+            "avgRating": round(rnd.uniform(1, 5), 1) if has_ratings else 0,
+            "numRatings": num_ratings,
+            "avgDifficulty": round(rnd.uniform(1, 5), 1) if has_ratings else 0,
+            "wouldTakeAgainPercent": rnd.uniform(0, 100) if has_ratings else -1,
+            "reviews": [rnd.choice(reviews) for _ in range(min(num_ratings, 5))],
+        }
+
+
+def export_rows(num_professors: int, seed: int = 7) -> Iterator[Dict[str, Any]]:
+    """Professors in the export schema (to_export_rows of raw_rows)."""
+    return iter_export_rows(raw_rows(num_professors, seed))
+
+
+def write_export(rows: Iterable[Dict[str, Any]], path: str) -> None:
+    """Same layout as the scraper's ExportWriter: a JSON array with one row per line."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for n, row in enumerate(rows):
+            f.write(("," if n else "") + "\n" + json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+        f.write("\n]\n")
+
+
+def parse_size(text: str) -> int:
+    """Number of professors for "2k", "50k", "500k" or a plain number."""
+    text = text.strip().lower()
+    if text in SIZES:
+        return SIZES[text]
+    if text.endswith("k"):
+        return int(float(text[:-1]) * 1000)
+    return int(text)
@@ -0,0 +1,75 @@
+"""
+Content-Encoding for API responses: gzip, plus brotli when the `brotli` / `brotlicffi` package
+is installed.
+
+api.py compresses a JSON body once, when it is cached (see response_cache.py), and the static
+pages once at startup (see static_assets.py); every later request is served the stored bytes.
+Bodies smaller than MIN_SIZE are sent as is: they would not get meaningfully smaller.
+"""
+
+import gzip
+import zlib
+from typing import Iterator, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+MIN_SIZE = 1024
+
+# Supported encodings in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Levels for bodies compressed per dataset (fast) and once at startup (smallest output)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+
+def choose_encoding(accept_encoding: Optional[str], supported: Sequence[str] = ENCODINGS) -> Optional[str]:
+    """The preferred of `supported` allowed by an Accept-Encoding header (q-values honoured), or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in supported:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """body compressed with `encoding` (deterministically, so equal bodies get equal ETags)."""
+    if encoding == "br":
+        return brotli.compress(body, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL if static else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Gzip a streamed body chunk by chunk, flushing after each so every chunk goes out immediately."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,173 @@
+"""
+Typo-tolerant name lookup: a symmetric-deletion index over the words of every Full_Name.
+
+Each name is split into lowercase, accent-free keys: its words with punctuation removed ("Smith-Jones" ->
+"smithjones") plus, for words with punctuation, their parts ("smith", "jones"). Every key is
+stored under each string obtained by deleting up to MAX_DISTANCE of its characters. Two words
+within edit distance d share such a deletion with at most d characters deleted on either side,
+so a query word only looks up its own deletions and checks the few candidates it finds with a
+bounded Damerau-Levenshtein distance, instead of comparing against every name.
+
+The index is four flat arrays, so professor_snapshot and sqlite_store can store it as is:
+  - keys: the distinct keys (JSON)
+  - offsets / postings: positions of the professors having each key
+  - deletes: sorted crc32(deletion) << 32 | key id
+"""
+
+import re
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+MAX_DISTANCE = 2  # largest edit distance the index answers
+
+_PARTS = re.compile(r"[^\W_]+")
+
+
+def allowed_distance(word: str) -> int:
+    """Edit distance tolerated for a query word: none up to 2 characters, 1 up to 5, else 2."""
+    return 0 if len(word) <= 2 else 1 if len(word) <= 5 else 2
+
+
+def _words(text: str) -> List[Tuple[str, List[str]]]:
+    """(word without punctuation, its parts) for each whitespace-separated word of `text`."""
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    words = []
+    for word in text.split():
+        parts = _PARTS.findall(word)
+        if parts:
+            words.append(("".join(parts), parts))
+    return words
+
+
+def name_keys(name: str) -> List[str]:
+    """Distinct index keys of a Full_Name."""
+    keys: Dict[str, None] = {}
+    for joined, parts in _words(name):
+        keys[joined] = None
+        if len(parts) > 1:
+            keys.update(dict.fromkeys(parts))
+    return list(keys)
+
+
+def deletions(word: str, n: int) -> set:
+    """`word` with every combination of up to n characters deleted."""
+    out = {word}
+    frontier = out
+    for _ in range(n):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance of a and b (adjacent transpositions count 1), or limit + 1 if greater."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8")) << 32
+
+
+class FuzzyIndex:
+    """Symmetric-deletion index of the names of a dataset (by position)."""
+
+    def __init__(self, keys: List[str], offsets: Sequence[int], postings: Sequence[int], deletes: Sequence[int]):
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+        self.deletes = deletes
+
+    @classmethod
+    def build(cls, names: Iterable[str]) -> "FuzzyIndex":
+        """Index names, the Full_Name of each position in order."""
+        key_ids: Dict[str, int] = {}
+        positions: List[List[int]] = []
+        for i, name in enumerate(names):
+            for key in name_keys(name):
+                kid = key_ids.get(key)
+                if kid is None:
+                    kid = key_ids[key] = len(positions)
+                    positions.append([])
+                positions[kid].append(i)
+        offsets = array("Q", [0])
+        postings = array("I")
+        for p in positions:
+            postings.extend(p)
+            offsets.append(len(postings))
+        deletes = [zlib.crc32(d.encode("utf-8")) << 32 | kid
+                   for key, kid in key_ids.items() for d in deletions(key, MAX_DISTANCE)]
+        deletes.sort()
+        return cls(list(key_ids), offsets, postings, array("Q", deletes))
+
+    def _word_matches(self, word: str, max_distance: int) -> Dict[int, int]:
+        """position -> smallest distance between `word` and one of the professor's keys, within the allowed distance."""
+        limit = min(max_distance, allowed_distance(word), MAX_DISTANCE)
+        distances: Dict[int, int] = {}
+        for d in deletions(word, limit):
+            h = _hash(d)
+            lo = bisect_left(self.deletes, h)
+            hi = bisect_left(self.deletes, h + (1 << 32), lo)
+            for entry in self.deletes[lo:hi]:
+                kid = entry & 0xFFFFFFFF
+                if kid not in distances:
+                    distances[kid] = edit_distance(word, self.keys[kid], limit)
+        matches: Dict[int, int] = {}
+        for kid, distance in distances.items():
+            if distance <= limit:
+                for i in self.postings[self.offsets[kid]:self.offsets[kid + 1]]:
+                    if distance < matches.get(i, limit + 1):
+                        matches[i] = distance
+        return matches
+
+    def search(self, text: str, max_distance: int = MAX_DISTANCE) -> List[Tuple[int, int]]:
+        """
+        (position, distance) of the professors matching every word of `text`, closest first
+        (ties in dataset order). A word matches a key within its allowed distance; a word with
+        punctuation may also match as its parts ("smith-jnoes" matches "Smith Jones").
+        The distance of a professor is the sum over the words.
+        """
+        result: Optional[Dict[int, int]] = None
+        for joined, parts in _words(text):
+            scores = self._word_matches(joined, max_distance)
+            if len(parts) > 1:
+                for i, distance in _all_of([self._word_matches(p, max_distance) for p in parts]).items():
+                    if distance < scores.get(i, distance + 1):
+                        scores[i] = distance
+            result = scores if result is None else _all_of([result, scores])
+            if not result:
+                return []
+        return sorted((result or {}).items(), key=lambda m: (m[1], m[0]))
+
+
+def _all_of(matches: List[Dict[int, int]]) -> Dict[int, int]:
+    """Positions present in every dict, with the distances summed."""
+    matches = sorted(matches, key=len)
+    result = matches[0]
+    for other in matches[1:]:
+        result = {i: d + other[i] for i, d in result.items() if i in other}
+    return result
+
+
+def rank(exact: Sequence[int], fuzzy: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Exact substring matches (distance 0, dataset order) followed by the other fuzzy matches."""
+    seen = set(exact)
+    return [(i, 0) for i in exact] + [m for m in fuzzy if m[0] not in seen]
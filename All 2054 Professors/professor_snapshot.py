@@ -0,0 +1,220 @@
+"""
+Binary snapshot of a ProfessorStore, written by the API next to the JSON export after it has
+loaded that file once, and loaded on later starts instead of parsing the JSON and rebuilding every
+index.
+
+Layout (little-endian):
+    b"RMPSNAP\\x01" | uint64 offset of the header | sections, each 8-byte aligned | header JSON
+The header lists every section as name -> [offset, length, typecode]. Typed sections
+(typecode "I", "q", "d", "Q") are used in place as memoryview casts of the mapped file:
+the columns, the sorted orderings and ranks, the range counts, the postings of the name and
+department indexes, the arrays of the fuzzy name index and the review text offsets. JSON
+sections ("j") hold the string lists and the precomputed /stats and /departments payloads.
+Reviews stay in the file as one JSON document per professor and are decoded only when a row is
+serialized; the lowercased review text that /search?reviews=true scans is searched in place.
+
+The file is memory-mapped where possible. On Windows it is read into memory instead, so it can
+still be replaced while the API is running.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fuzzy_names import FuzzyIndex
+from professor_store import ProfessorStore, SORT_OPTIONS
+
+MAGIC = b"RMPSNAP\x01"
+FORMAT_VERSION = 5
+SNAPSHOT_SUFFIX = ".snapshot"
+
+# Typed columns and indexes written as is: attribute -> typecode
+ARRAYS = {
+    "department_codes": "I",
+    "ratings": "d",
+    "difficulties": "d",
+    "take_again": "d",
+    "num_ratings": "q",
+    "rating_order": "I",
+    "rating_keys": "d",
+    "difficulty_order": "I",
+    "difficulty_keys": "d",
+    "range_counts": "I",
+    "review_text_offsets": "Q",
+}
+# Dicts of key -> positions (or per-department counts), written as keys + offsets + concatenated postings
+POSTINGS = ("name_grams", "name_gram_departments", "department_index", "department_positions")
+# Plain values written as JSON
+VALUES = ("names", "name_keys", "department_table", "department_folded", "stats", "departments")
+
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+
+class _Writer:
+    def __init__(self, f):
+        self.f = f
+        self.sections: Dict[str, List[Any]] = {}
+        self.offset = len(MAGIC) + 8
+        f.write(MAGIC + struct.pack("<Q", 0))
+
+    def add(self, name: str, data: bytes, typecode: str) -> None:
+        self.sections[name] = [self.offset, len(data), typecode]
+        self.f.write(data)
+        self.f.write(b"\0" * _pad(len(data)))
+        self.offset += len(data) + _pad(len(data))
+
+    def add_array(self, name: str, typecode: str, values: Sequence) -> None:
+        self.add(name, (values if isinstance(values, array) else array(typecode, values)).tobytes(), typecode)
+
+    def add_json(self, name: str, value: Any) -> None:
+        self.add(name, json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "j")
+
+
+def write_snapshot(store: ProfessorStore, path: str, mtime: Optional[float] = None) -> None:
+    """
+    Write `store` to `path` (via a temporary file that is renamed into place). With `mtime`, the
+    file is dated to it before the rename, e.g. to the modification time of the JSON file it came from.
+    """
+    if sys.byteorder != "little":
+        raise ValueError("snapshots are little-endian only")
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            w = _Writer(f)
+            for name, typecode in ARRAYS.items():
+                w.add_array(name, typecode, getattr(store, name))
+            for sort in SORT_OPTIONS:
+                w.add_array("order:" + sort, "I", store.orders[sort])
+                w.add_array("rank:" + sort, "I", store.ranks[sort])
+            for name in POSTINGS:
+                index = getattr(store, name)
+                offsets = array("Q", [0])
+                postings = array("I")
+                for positions in index.values():
+                    postings.extend(positions)
+                    offsets.append(len(postings))
+                w.add_json(name + ":keys", list(index))
+                w.add_array(name + ":offsets", "Q", offsets)
+                w.add_array(name + ":postings", "I", postings)
+            for name in VALUES:
+                w.add_json(name, getattr(store, name))
+            w.add_json("irregular", {str(i): row for i, row in store.irregular.items()})
+            w.add_json("fuzzy:keys", store.fuzzy.keys)
+            w.add_array("fuzzy:offsets", "Q", store.fuzzy.offsets)
+            w.add_array("fuzzy:postings", "I", store.fuzzy.postings)
+            w.add_array("fuzzy:deletes", "Q", store.fuzzy.deletes)
+
+            review_offsets = array("Q", [0])
+            reviews = bytearray()
+            for i in range(len(store)):
+                reviews += json.dumps(store._field_latest_reviews(i), ensure_ascii=False,
+                                      separators=(",", ":")).encode("utf-8")
+                review_offsets.append(len(reviews))
+            w.add_array("review_offsets", "Q", review_offsets)
+            w.add("reviews", bytes(reviews), "b")
+            w.add("review_text", store.review_text, "b")
+
+            f.write(json.dumps({"format": FORMAT_VERSION, "count": len(store), "sections": w.sections}).encode("utf-8"))
+            f.seek(len(MAGIC))
+            f.write(struct.pack("<Q", w.offset))
+            f.flush()
+            os.fsync(f.fileno())
+        if mtime is not None:
+            os.utime(tmp, (mtime, mtime))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class _Section:
+    """A bytes section of the snapshot with the find() of bytes, searched in place in the mapped file."""
+
+    def __init__(self, buf: memoryview, offset: int, length: int):
+        self.obj = buf.obj  # the mmap (or, on Windows, the bytes) that buf views
+        self.offset = offset
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def find(self, sub: bytes, start: int = 0, end: Optional[int] = None) -> int:
+        end = self.length if end is None else min(end, self.length)
+        at = self.obj.find(sub, self.offset + start, self.offset + end)
+        return at - self.offset if at != -1 else -1
+
+
+class _Reviews:
+    """Per-professor reviews decoded on access from the snapshot's reviews section."""
+
+    def __init__(self, data: memoryview, offsets: memoryview):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> List[Dict[str, Any]]:
+        return json.loads(bytes(self.data[self.offsets[i]:self.offsets[i + 1]]))
+
+
+def _open(path: str) -> memoryview:
+    with open(path, "rb") as f:
+        if os.name == "nt":  # a mapped file cannot be replaced on Windows
+            return memoryview(f.read())
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"{path} is empty")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def load_snapshot(path: str) -> ProfessorStore:
+    """Load a ProfessorStore from a snapshot written by write_snapshot. ValueError if it is not one."""
+    if sys.byteorder != "little":
+        raise ValueError("snapshots are little-endian only")
+    buf = _open(path)
+    if len(buf) < len(MAGIC) + 8 or bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a professor snapshot")
+    (header_offset,) = struct.unpack("<Q", buf[len(MAGIC):len(MAGIC) + 8])
+    if not len(MAGIC) + 8 <= header_offset < len(buf):
+        raise ValueError(f"{path} is incomplete")
+    header = json.loads(bytes(buf[header_offset:]))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot format {header.get('format')}")
+    sections: Dict[str, Tuple[int, int, str]] = header["sections"]
+
+    def raw(name: str) -> memoryview:
+        offset, length, _ = sections[name]
+        return buf[offset:offset + length]
+
+    def typed(name: str) -> memoryview:
+        return raw(name).cast(sections[name][2])
+
+    def value(name: str) -> Any:
+        return json.loads(bytes(raw(name)))
+
+    store = ProfessorStore.empty()
+    for name in ARRAYS:
+        setattr(store, name, typed(name))
+    store.orders = {sort: typed("order:" + sort) for sort in SORT_OPTIONS}
+    store.ranks = {sort: typed("rank:" + sort) for sort in SORT_OPTIONS}
+    for name in POSTINGS:
+        keys = value(name + ":keys")
+        offsets = typed(name + ":offsets")
+        postings = typed(name + ":postings")
+        setattr(store, name, {key: postings[offsets[k]:offsets[k + 1]] for k, key in enumerate(keys)})
+    for name in VALUES:
+        setattr(store, name, value(name))
+    store.irregular = {int(i): row for i, row in value("irregular").items()}
+    store.fuzzy = FuzzyIndex(value("fuzzy:keys"), typed("fuzzy:offsets"), typed("fuzzy:postings"),
+                             typed("fuzzy:deletes"))
+    store.reviews = _Reviews(raw("reviews"), typed("review_offsets"))
+    store.review_text = _Section(buf, *sections["review_text"][:2])
+    if len(store.names) != header["count"]:
+        raise ValueError(f"{path} is truncated")
+    return store
@@ -0,0 +1,770 @@
+"""
+In-memory professor dataset for the API, with query indexes built once per load.
+
+api.py's load_data() wraps the list of professor dicts in a ProfessorStore. The rows are kept
+as typed columns rather than dicts:
+  - names: Full_Name strings
+  - department_codes: index into department_table (interned department strings)
+  - ratings / difficulties / take_again: array('d') of floats, NaN where the export has ""
+  - num_ratings: array('q'), -1 where the export has ""
+  - reviews: per professor, a tuple of reviews, each a tuple of values in REVIEW_FIELDS order
+  - review_text / review_text_offsets: the lowercased review comments as one UTF-8 string, each
+    comment ended by a NUL, and where each professor's comments start; /search?reviews=true
+    scans it with bytes.find instead of visiting every review
+Response dicts are rebuilt by row()/rows() only when a row is serialized. A row whose values
+would not come back exactly as loaded (unexpected keys, numbers not in the "4.50" format, ...)
+is also kept verbatim in `irregular` and returned as is.
+
+The endpoints answer filters from indexes instead of scanning every professor per request:
+  - department_index: case-folded department -> positions (in dataset order)
+  - rating_order / rating_keys: positions sorted by Average_Rating, and the sorted ratings
+  - difficulty_order / difficulty_keys: the same for Average_Difficulty
+  - name_grams: every 1- to 3-character substring of the lowercased Full_Name -> positions;
+    a name search of up to three characters is a single lookup, and a longer one checks only
+    the candidates of its rarest trigram
+  - name_gram_departments: for the grams in at least 1/BROAD_FRACTION of the names, how many
+    of those names are in each department (by department code), so /search counts the union of
+    name and department matches without walking the postings
+  - fuzzy: symmetric-deletion index of the words of each Full_Name, for typo-tolerant lookups
+  - department_positions: lowercased department -> positions, for department substring search
+  - orders / ranks: positions in each sort= ordering, and each position's rank in it
+  - range_counts: how many professors fall in each block of the best-rated ranks and the
+    easiest-difficulty ranks, cumulated, so min_rating + max_difficulty is counted without a scan
+It also precomputes the /stats and /departments responses, so they are rebuilt only when the data is.
+"""
+
+import base64
+import hashlib
+import itertools
+import json
+import math
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from heapq import merge
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fuzzy_names import MAX_DISTANCE, FuzzyIndex, rank
+
+PROFESSOR_FIELDS = (
+    "Full_Name",
+    "Department",
+    "Average_Rating",
+    "Num_Ratings",
+    "Average_Difficulty",
+    "Would_Take_Again_Percent",
+    "Latest_Reviews",
+)
+
+REVIEW_FIELDS = (
+    "Comment",
+    "Date",
+    "Quality_Rating",
+    "Difficulty_Rating",
+    "Is_Online_Class",
+    "Is_For_Credit",
+    "Would_Take_Again",
+    "Grade",
+    "Textbook_Use",
+    "Class",
+)
+
+MISSING = math.nan  # float columns: the export's "" (no value)
+NO_COUNT = -1       # num_ratings: the export's ""
+
+_versions = itertools.count(1)
+
+
+def next_version() -> int:
+    """A new dataset version, distinguishing datasets e.g. in response cache keys."""
+    return next(_versions)
+
+
+# sort= values: field name ascending, "-field" descending (numeric fields only), name ascending
+SORTS = {"rating": "ratings", "num_ratings": "num_ratings", "difficulty": "difficulties"}
+SORT_OPTIONS = tuple(s for field in SORTS for s in (field, "-" + field)) + ("name",)
+
+
+def to_float(value) -> float:
+    """Convert value to float, return NaN if conversion fails"""
+    if value is None or value == "":
+        return MISSING
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return MISSING
+
+
+def fmt2(x: float) -> str:
+    """Inverse of the scraper's fmt2: "" for a missing value, else two decimals."""
+    return "" if x != x else f"{x:.2f}"
+
+
+def _is_fmt2(value) -> bool:
+    """True if `value` is reproduced exactly by fmt2(to_float(value))."""
+    return value == "" or (isinstance(value, str) and value == value.strip() and fmt2(to_float(value)) == value)
+
+
+def is_regular(p: Dict[str, Any]) -> bool:
+    """True if row p comes back exactly as loaded from its typed columns; other rows are kept verbatim."""
+    name = p.get("Full_Name")
+    dept = p.get("Department")
+    num_ratings = p.get("Num_Ratings", "")
+    return (
+        tuple(p) == PROFESSOR_FIELDS
+        and isinstance(name, str)
+        and (dept is None or isinstance(dept, str))
+        and all(_is_fmt2(p[k]) for k in ("Average_Rating", "Average_Difficulty", "Would_Take_Again_Percent"))
+        and (num_ratings == "" or (type(num_ratings) is int and 0 <= num_ratings < 2 ** 63))
+        and isinstance(p.get("Latest_Reviews"), list)
+    )
+
+
+def _sorted_index(values: Sequence[float]) -> Tuple[array, array]:
+    """Positions with a value, sorted by value (ties keep dataset order), plus the sorted values."""
+    order = array("I", sorted((i for i, v in enumerate(values) if v == v), key=values.__getitem__))
+    return order, array("d", (values[i] for i in order))
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _grams(text: str):
+    """Every 1-, 2- and 3-character substring of text."""
+    grams = set(text)
+    grams.update(map(str.__add__, text, text[1:]))
+    grams.update(_trigrams(text))
+    return grams
+
+
+def _review_comment(review: Any) -> Any:
+    return review[0] if isinstance(review, tuple) else review.get("Comment") if isinstance(review, dict) else None
+
+
+def _merged(lists: List[Sequence[int]]) -> Iterator[int]:
+    """Ascending position lists merged lazily, dropping duplicates."""
+    last = -1
+    for i in merge(*lists):
+        if i != last:
+            yield i
+            last = i
+
+
+def _union(lists: List[Sequence[int]]) -> Sequence[int]:
+    """Merge ascending position lists, dropping duplicates."""
+    lists = [positions for positions in lists if positions]
+    if len(lists) <= 1:
+        return lists[0] if lists else []
+    return list(_merged(lists))
+
+
+def summarize(total: int, department_counts: Iterable[Tuple[Optional[str], int]], total_reviews: Any,
+              ratings: Iterable[float], difficulties: Iterable[float]) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    The /stats and /departments payloads (stats is None for an empty dataset). Treat as read-only.
+    department_counts are (department, professors) in order of first appearance; ratings and
+    difficulties are the values present, in dataset order.
+    """
+    departments: Dict[str, int] = {}
+    for dept, count in department_counts:
+        if dept:  # Only count non-empty departments
+            departments[dept] = count
+
+    names = sorted(departments)
+    department_list = {"count": len(names), "departments": names}
+    if not total:
+        return None, department_list
+
+    ratings = array("d", ratings)
+    difficulties = array("d", difficulties)
+    stats = {
+        "total_professors": total,
+        "total_reviews": total_reviews,
+        "departments": {
+            "count": len(names),
+            "list": names
+        },
+        "ratings": {
+            "average": sum(ratings) / len(ratings) if ratings else 0,
+            "min": min(ratings) if ratings else 0,
+            "max": max(ratings) if ratings else 0
+        },
+        "difficulty": {
+            "average": sum(difficulties) / len(difficulties) if difficulties else 0,
+            "min": min(difficulties) if difficulties else 0,
+            "max": max(difficulties) if difficulties else 0
+        },
+        "top_departments": sorted(
+            departments.items(),
+            key=lambda x: x[1],
+            reverse=True
+        )[:10]
+    }
+    return stats, department_list
+
+
+def filters_digest(department: Optional[str], min_rating: Optional[float],
+                   max_difficulty: Optional[float]) -> str:
+    """Short digest of the /professors filters, kept in a cursor so it only continues the same query."""
+    raw = json.dumps([department.casefold() if department else None,
+                      None if min_rating is None else float(min_rating),
+                      None if max_difficulty is None else float(max_difficulty)])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def encode_cursor(sort: str, key: Sequence[Any], filters: str = "") -> str:
+    """Opaque cursor for the page that follows sort key `key` in ordering `sort`, under filters_digest `filters`."""
+    raw = json.dumps([sort, list(key), filters], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, tuple, str]:
+    """(sort, key, filters digest) from a cursor made by encode_cursor; ValueError if it is not one."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort, key, filters = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+    shape = (str, int) if sort == "name" else (int, (int, float), str, int)
+    if (sort not in SORT_OPTIONS or not isinstance(key, list) or len(key) != len(shape)
+            or not all(isinstance(v, t) for v, t in zip(key, shape)) or not isinstance(filters, str)):
+        raise ValueError("invalid cursor")
+    return sort, tuple(key), filters
+
+
+class ProfessorStore:
+    """Professors (as exported by the scraper) in typed columns, plus the indexes used to filter them."""
+
+    # Broad filters (matching at least 1/BROAD_FRACTION of the data) are answered by counting
+    # from the indexes and scanning in dataset order only as far as the requested page.
+    BROAD_FRACTION = 8
+    # range_counts has RANGE_CELLS blocks of ranks per side
+    RANGE_CELLS = 256
+    # search_reviews scans review_text this many bytes per find() call
+    REVIEW_SCAN_BYTES = 1 << 20
+
+    def __init__(self, professors: Iterable[Dict[str, Any]]):
+        self.version = next_version()
+        self.names: List[str] = []
+        self.department_table: List[Optional[str]] = []
+        self.department_codes = array("I")
+        self.ratings = array("d")
+        self.difficulties = array("d")
+        self.take_again = array("d")
+        self.num_ratings = array("q")
+        self.reviews: List[Tuple[Any, ...]] = []
+        self.review_text_offsets = array("Q", [0])
+        self.irregular: Dict[int, Dict[str, Any]] = {}
+        self._review_chunks: List[bytes] = []       # load-time only: review_text per professor
+        self._codes: Dict[Optional[str], int] = {}  # load-time only: department -> code
+        self._pool: Dict[str, str] = {}             # load-time only: shared review values
+        for p in professors:
+            self._append(p)
+        self.review_text = b"".join(self._review_chunks)
+        del self._codes, self._pool, self._review_chunks
+
+        # Department code -> case-folded / lowercased key
+        folded = [(d or "").casefold() for d in self.department_table]
+        lowered = [(d or "").lower() for d in self.department_table]
+        self.department_index: Dict[str, array] = {}
+        self.department_positions: Dict[str, array] = {}
+        for i, code in enumerate(self.department_codes):
+            if folded[code]:
+                self.department_index.setdefault(folded[code], array("I")).append(i)
+            self.department_positions.setdefault(lowered[code], array("I")).append(i)
+        self.department_folded = folded
+        self.rating_order, self.rating_keys = _sorted_index(self.ratings)
+        self.difficulty_order, self.difficulty_keys = _sorted_index(self.difficulties)
+
+        self.name_keys = [name.lower() for name in self.names]
+        name_grams: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.name_keys):
+            for gram in _grams(name):
+                name_grams.setdefault(gram, []).append(i)
+        self.name_grams = {gram: array("I", postings) for gram, postings in name_grams.items()}
+        self.name_gram_departments = {
+            gram: self._department_counts(postings) for gram, postings in self.name_grams.items()
+            if len(postings) * self.BROAD_FRACTION >= len(self.names)}
+        self.fuzzy = FuzzyIndex.build(self.names)
+
+        self._build_orders()
+        self.range_counts = self._build_range_counts()
+        self.stats, self.departments = self._summarize()
+
+    @classmethod
+    def empty(cls) -> "ProfessorStore":
+        """An instance with a fresh version and no attributes, for professor_snapshot to fill in."""
+        store = cls.__new__(cls)
+        store.version = next_version()
+        return store
+
+    # ---------------------------- Loading ----------------------------
+    def _append(self, p: Dict[str, Any]) -> None:
+        i = len(self.names)
+        name = p.get("Full_Name")
+        dept = p.get("Department")
+        num_ratings = p.get("Num_Ratings", "")
+        reviews = p.get("Latest_Reviews")
+        regular = is_regular(p)
+        if not regular:
+            self.irregular[i] = p
+
+        self.names.append(name if isinstance(name, str) else "")
+        self.department_codes.append(self._department_code(dept if isinstance(dept, str) else None))
+        self.ratings.append(to_float(p.get("Average_Rating")))
+        self.difficulties.append(to_float(p.get("Average_Difficulty")))
+        self.take_again.append(to_float(p.get("Would_Take_Again_Percent")))
+        self.num_ratings.append(num_ratings if regular and num_ratings != "" else NO_COUNT)
+        self.reviews.append(tuple(self._compact_review(r) for r in reviews) if regular else ())
+        text = "".join(c.lower() + "\0" for c in map(_review_comment, self.reviews[i]) if isinstance(c, str))
+        chunk = text.encode("utf-8")
+        self._review_chunks.append(chunk)
+        self.review_text_offsets.append(self.review_text_offsets[-1] + len(chunk))
+
+    def _department_code(self, dept: Optional[str]) -> int:
+        code = self._codes.get(dept)
+        if code is None:
+            code = self._codes[dept] = len(self.department_table)
+            self.department_table.append(sys.intern(dept) if dept else dept)
+        return code
+
+    def _compact_review(self, review: Any) -> Any:
+        """A review as a tuple of values in REVIEW_FIELDS order; anything else is kept as is."""
+        if not isinstance(review, dict) or tuple(review) != REVIEW_FIELDS:
+            return review
+        # Everything but the comment repeats a lot ("Yes"/"No", ratings, grades, class codes)
+        values = list(review.values())
+        try:
+            values[1:] = map(self._pool.setdefault, values[1:], values[1:])
+        except TypeError:  # an unhashable value
+            return review
+        return tuple(values)
+
+    def _department_counts(self, positions: Sequence[int]) -> array:
+        """Number of `positions` in each department, indexed by department code."""
+        counts = Counter(map(self.department_codes.__getitem__, positions))
+        return array("I", (counts[code] for code in range(len(self.department_table))))
+
+    # ---------------------------- Serialization ----------------------------
+    def row(self, i: int) -> Dict[str, Any]:
+        """Professor i as the exported dict."""
+        raw = self.irregular.get(i)
+        if raw is not None:
+            return raw
+        num_ratings = self.num_ratings[i]
+        return {
+            "Full_Name": self.names[i],
+            "Department": self.department_table[self.department_codes[i]],
+            "Average_Rating": fmt2(self.ratings[i]),
+            "Num_Ratings": num_ratings if num_ratings != NO_COUNT else "",
+            "Average_Difficulty": fmt2(self.difficulties[i]),
+            "Would_Take_Again_Percent": fmt2(self.take_again[i]),
+            "Latest_Reviews": self._field_latest_reviews(i),
+        }
+
+    def rows(self, positions: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Rows for positions; with `fields`, only those keys (in PROFESSOR_FIELDS order) are built."""
+        if fields is None:
+            return [self.row(i) for i in positions]
+        getters = [(f, getattr(self, "_field_" + f.lower())) for f in fields]
+        out = []
+        for i in positions:
+            raw = self.irregular.get(i)
+            if raw is not None:
+                out.append({f: raw[f] for f, _ in getters if f in raw})
+            else:
+                out.append({f: get(i) for f, get in getters})
+        return out
+
+    # One getter per exported field, for projected rows
+    def _field_full_name(self, i: int) -> str:
+        return self.names[i]
+
+    def _field_department(self, i: int) -> Optional[str]:
+        return self.department_table[self.department_codes[i]]
+
+    def _field_average_rating(self, i: int) -> str:
+        return fmt2(self.ratings[i])
+
+    def _field_num_ratings(self, i: int) -> Any:
+        num_ratings = self.num_ratings[i]
+        return num_ratings if num_ratings != NO_COUNT else ""
+
+    def _field_average_difficulty(self, i: int) -> str:
+        return fmt2(self.difficulties[i])
+
+    def _field_would_take_again_percent(self, i: int) -> str:
+        return fmt2(self.take_again[i])
+
+    def _field_latest_reviews(self, i: int) -> List[Any]:
+        return [dict(zip(REVIEW_FIELDS, r)) if isinstance(r, tuple) else r for r in self.reviews[i]]
+
+    def _summarize(self) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """The /stats and /departments payloads of this dataset (see summarize)."""
+        counts = [0] * len(self.department_table)
+        for code in self.department_codes:
+            counts[code] += 1
+        total_reviews = sum(n for n in self.num_ratings if n != NO_COUNT)
+        for raw in self.irregular.values():
+            num_ratings = raw.get("Num_Ratings", 0)
+            if isinstance(num_ratings, (int, float)):
+                total_reviews += num_ratings
+        return summarize(len(self.names), zip(self.department_table, counts), total_reviews,
+                         (r for r in self.ratings if r == r), (d for d in self.difficulties if d == d))
+
+    # ---------------------------- Queries ----------------------------
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def by_department(self, department: str) -> Sequence[int]:
+        """Positions of professors in `department` (case-insensitive exact match)."""
+        return self.department_index.get(department.casefold(), array("I"))
+
+    def search_names(self, text: str) -> Sequence[int]:
+        """Positions whose Full_Name contains `text` (case-insensitive), in dataset order."""
+        text = text.lower()
+        if not text:
+            return range(len(self.names))
+        if len(text) <= 3:  # indexed as is: the postings are exactly the matches
+            return self.name_grams.get(text, array("I"))
+        # Every trigram of the query occurs in a match; check only the rarest trigram's postings
+        candidates: Sequence[int] = ()
+        for gram in _trigrams(text):
+            postings = self.name_grams.get(gram)
+            if not postings:
+                return []
+            if not candidates or len(postings) < len(candidates):
+                candidates = postings
+        names = self.name_keys
+        return [i for i in candidates if text in names[i]]
+
+    def fuzzy_search_names(self, text: str, max_distance: int = MAX_DISTANCE) -> List[Tuple[int, int]]:
+        """
+        (position, edit distance) of the names containing `text`, or whose words are within a
+        small edit distance of its words (at most max_distance per word), closest first.
+        """
+        return rank(self.search_names(text), self.fuzzy.search(text, max_distance))
+
+    def find_by_name(self, name: str, department: Optional[str] = None) -> List[int]:
+        """Positions whose Full_Name equals `name` (case-insensitive), optionally within `department`."""
+        key = name.lower()
+        positions = [i for i in self.search_names(name) if self.name_keys[i] == key]
+        if department:
+            folded = department.casefold()
+            positions = [i for i in positions if self.department_folded[self.department_codes[i]] == folded]
+        return positions
+
+    def search(self, text: str) -> Sequence[int]:
+        """Positions whose Full_Name or Department contains `text` (case-insensitive), in dataset order."""
+        lowered = text.lower()
+        lists = [self.search_names(text)]
+        lists += [positions for dept, positions in self.department_positions.items() if lowered in dept]
+        return _union(lists)
+
+    def search_reviews(self, text: str) -> List[int]:
+        """
+        Positions with a review comment containing `text` (case-insensitive). Not indexed: a scan
+        of review_text, which takes tens of milliseconds per 100k professors for a rare `text`.
+        """
+        needle = text.lower().encode("utf-8")
+        offsets = self.review_text_offsets
+        if not needle:
+            return [i for i in range(len(self.names)) if offsets[i + 1] > offsets[i]]
+        if b"\0" in needle:  # the comment separator: no comment contains it
+            return []
+        # In steps of REVIEW_SCAN_BYTES, so a caller on a worker thread lets the others run between them
+        data, size, step = self.review_text, len(self.review_text), self.REVIEW_SCAN_BYTES
+        matches = []
+        start = 0
+        while start < size:
+            stop = start + step
+            at = data.find(needle, start, stop + len(needle) - 1)  # a match that starts before stop
+            if at == -1:
+                start = stop
+                continue
+            i = bisect_right(offsets, at) - 1
+            matches.append(i)
+            start = offsets[i + 1]  # one match per professor is enough
+        return matches
+
+    def search_page(self, text: str, start: int = 0, stop: Optional[int] = None,
+                    reviews: bool = False) -> Tuple[int, List[int]]:
+        """
+        /search: (total matches, positions[start:stop]) of the professors whose Full_Name or
+        Department - or, with `reviews`, a review comment - contains `text`, in dataset order.
+        """
+        if reviews:
+            matches = _union([self.search(text), self.search_reviews(text)])
+            return len(matches), list(matches[start:stop])
+        names = self.search_names(text)
+        lowered = text.lower()
+        departments = [dept for dept in self.department_positions if lowered in dept]
+        if not departments:
+            return len(names), list(names[start:stop])
+        # Total of the union without building it: the names plus the departments' professors,
+        # less the named professors already counted in a matching department
+        matching = set(departments)
+        in_matching = [(d or "").lower() in matching for d in self.department_table]
+        counts = self.name_gram_departments.get(lowered)
+        if counts is not None:
+            overlap = sum(count for count, hit in zip(counts, in_matching) if hit)
+        else:
+            overlap = sum(map(in_matching.__getitem__, map(self.department_codes.__getitem__, names)))
+        lists = [names] + [self.department_positions[dept] for dept in departments]
+        total = sum(map(len, lists)) - overlap
+        return total, list(itertools.islice(_merged(lists), start, stop))
+
+    def department_page(self, department: str, start: int = 0,
+                        stop: Optional[int] = None) -> Tuple[int, List[int]]:
+        """(professors in `department`, positions[start:stop]), in dataset order."""
+        matches = self.by_department(department)
+        return len(matches), list(matches[start:stop])
+
+    def _filters(self, department: Optional[str], min_rating: Optional[float],
+                 max_difficulty: Optional[float]) -> Tuple[list, List[Callable[[int], bool]]]:
+        """
+        The /professors filters: each active filter contributes a candidate source
+        (size, in dataset order?, positions) and a predicate. The rating sources are slices
+        of the sorted indexes, not in dataset order. Missing values are NaN, which fails
+        every comparison.
+        """
+        sources: List[Tuple[int, bool, Callable[[], Sequence[int]]]] = []
+        predicates: List[Callable[[int], bool]] = []
+        if department:
+            key = department.casefold()
+            dept = self.by_department(department)
+            sources.append((len(dept), True, lambda: dept))
+            folded, codes = self.department_folded, self.department_codes
+            predicates.append(lambda i: folded[codes[i]] == key)
+        if min_rating is not None:
+            lo = bisect_left(self.rating_keys, min_rating)
+            sources.append((len(self.rating_keys) - lo, False, lambda: self.rating_order[lo:]))
+            ratings = self.ratings
+            predicates.append(lambda i: ratings[i] >= min_rating)
+        if max_difficulty is not None:
+            hi = bisect_right(self.difficulty_keys, max_difficulty)
+            sources.append((hi, False, lambda: self.difficulty_order[:hi]))
+            difficulties = self.difficulties
+            predicates.append(lambda i: difficulties[i] <= max_difficulty)
+        return sources, predicates
+
+    @staticmethod
+    def _smallest(sources: list, predicates: List[Callable[[int], bool]]
+                  ) -> Tuple[bool, Callable[[], Sequence[int]], List[Callable[[int], bool]]]:
+        """(in dataset order?, positions, the other filters' predicates) of the smallest source."""
+        smallest = min(range(len(sources)), key=lambda k: sources[k][0])
+        _, in_order, positions = sources[smallest]
+        return in_order, positions, [p for k, p in enumerate(predicates) if k != smallest]
+
+    @staticmethod
+    def _matching(positions: Sequence[int], predicates: List[Callable[[int], bool]]) -> Sequence[int]:
+        """The positions passing every predicate, in their order (one pass per predicate: cheaper than all())."""
+        for pred in predicates:
+            positions = [i for i in positions if pred(i)]
+        return positions
+
+    def count(self, department: Optional[str] = None, min_rating: Optional[float] = None,
+              max_difficulty: Optional[float] = None) -> int:
+        """Number of professors matching the /professors filters, without listing them."""
+        sources, predicates = self._filters(department, min_rating, max_difficulty)
+        if not sources:
+            return len(self.names)
+        if len(sources) == 1:
+            return sources[0][0]
+        if not department:
+            return self._count_rating_difficulty(min_rating, max_difficulty)
+        # Check the other filters on the smallest candidate set; order does not matter for a count
+        _, positions, others = self._smallest(sources, predicates)
+        return len(self._matching(positions(), others))
+
+    def query(self, department: Optional[str] = None, min_rating: Optional[float] = None,
+              max_difficulty: Optional[float] = None, start: int = 0,
+              stop: Optional[int] = None) -> Tuple[int, List[int]]:
+        """
+        Apply the /professors filters. Returns (total matches, positions[start:stop]),
+        with positions in dataset order - the same result as filtering the list in order.
+        """
+        n = len(self.names)
+        stop = n if stop is None else stop
+        sources, predicates = self._filters(department, min_rating, max_difficulty)
+
+        if not sources:
+            return n, list(range(start, min(stop, n)))
+
+        total = self.count(department, min_rating, max_difficulty)
+        if start >= min(stop, total):
+            return total, []
+        in_order, positions, others = self._smallest(sources, predicates)
+        if not in_order and total * self.BROAD_FRACTION >= n:
+            # Broad result: about every BROAD_FRACTION-th professor matches, so walk the
+            # dataset with every filter only as far as the page instead of sorting the candidates
+            matches = (i for i in range(n) if all(p(i) for p in predicates))
+            return total, list(itertools.islice(matches, start, stop))
+        # Otherwise start from the smallest candidate set, in dataset order
+        candidates = positions() if in_order else sorted(positions())
+        return total, list(self._matching(candidates, others)[start:stop])
+
+    def export_positions(self, department: Optional[str] = None, min_rating: Optional[float] = None,
+                         max_difficulty: Optional[float] = None, chunk: int = 500) -> Iterator[List[int]]:
+        """
+        Positions matching the /professors filters in dataset order, in lists of up to `chunk`,
+        produced as they are consumed (for streaming exports).
+        """
+        sources, predicates = self._filters(department, min_rating, max_difficulty)
+        candidates: Iterable[int] = range(len(self.names))
+        # A department is already a list in dataset order; the rating indexes are not, so scan
+        for k, (_, in_order, positions) in enumerate(sources):
+            if in_order:
+                candidates = positions()
+                del predicates[k]
+                break
+        batch: List[int] = []
+        for i in candidates:
+            if all(p(i) for p in predicates):
+                batch.append(i)
+                if len(batch) >= chunk:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    # ---------------------------- Sorting ----------------------------
+    def cursor_after(self, sort: str, i: int, filters: str = "") -> str:
+        """Opaque cursor for the page that follows professor i in ordering `sort`, under `filters`."""
+        return encode_cursor(sort, self.sort_key(sort, i), filters)
+
+    def sort_key(self, sort: str, i: int) -> tuple:
+        """
+        Key of professor i in ordering `sort`. Numeric sorts put missing values last and break
+        ties by name, then position, so a key identifies a place in the ordering even after a reload.
+        """
+        if sort == "name":
+            return (self.name_keys[i], i)
+        column = getattr(self, SORTS[sort.lstrip("-")])
+        value = column[i]
+        if value != value or (column is self.num_ratings and value == NO_COUNT):
+            return (1, 0.0, self.name_keys[i], i)
+        # (-value or value): never -0.0, which SQLite (sqlite_store) reads back as 0.0
+        return (0, (-value or value) if sort.startswith("-") else value, self.name_keys[i], i)
+
+    def _build_orders(self) -> None:
+        """Every ordering in SORT_OPTIONS as positions in sorted order, plus each position's rank."""
+        self.orders: Dict[str, array] = {}
+        self.ranks: Dict[str, array] = {}
+        n = len(self.names)
+        # Stable sorts from the least to the most significant part of sort_key, each keyed on a
+        # plain list lookup; this matches sorting by sort_key itself at a fraction of the cost.
+        by_name = sorted(range(n), key=self.name_keys.__getitem__)
+        for sort in SORT_OPTIONS:
+            if sort == "name":
+                order = by_name
+            else:
+                column = getattr(self, SORTS[sort.lstrip("-")])
+                no_value = NO_COUNT if column is self.num_ratings else None
+                missing = [v != v or v == no_value for v in column]
+                values = [0.0 if m else v for v, m in zip(column, missing)]
+                if sort.startswith("-"):
+                    values = [-v for v in values]
+                order = sorted(by_name, key=values.__getitem__)
+                order.sort(key=missing.__getitem__)
+            order = array("I", order)
+            rank = array("I", bytes(4 * len(order)))
+            for r, i in enumerate(order):
+                rank[i] = r
+            self.orders[sort] = order
+            self.ranks[sort] = rank
+
+    def _range_step(self) -> int:
+        """Ranks per block of range_counts."""
+        return max(1, -(-len(self.names) // self.RANGE_CELLS))
+
+    def _build_range_counts(self) -> array:
+        """
+        range_counts[a * width + b]: professors among the a * step best rated (orders["-rating"])
+        that are also among the b * step easiest (orders["difficulty"]); width = n // step + 2.
+        """
+        step = self._range_step()
+        width = len(self.names) // step + 2
+        counts = [0] * (width * width)
+        by_rating, difficulty_rank = self.orders["-rating"], self.ranks["difficulty"]
+        rated, with_difficulty = len(self.rating_keys), len(self.difficulty_keys)
+        for r in range(rated):
+            d = difficulty_rank[by_rating[r]]
+            if d < with_difficulty:
+                counts[(r // step + 1) * width + d // step + 1] += 1
+        for a in range(1, width):  # cumulate: each cell adds its row so far and the cell above
+            row, above, run = a * width, (a - 1) * width, 0
+            for b in range(width):
+                run += counts[row + b]
+                counts[row + b] = counts[above + b] + run
+        return array("I", counts)
+
+    def _count_rating_difficulty(self, min_rating: float, max_difficulty: float) -> int:
+        """
+        Professors with Average_Rating >= min_rating and Average_Difficulty <= max_difficulty:
+        the matches form a prefix of orders["-rating"] and one of orders["difficulty"], so the
+        count is a range_counts cell plus the ranks of the at most two partial blocks.
+        """
+        step = self._range_step()
+        width = len(self.names) // step + 2
+        rated = len(self.rating_keys) - bisect_left(self.rating_keys, min_rating)
+        easy = bisect_right(self.difficulty_keys, max_difficulty)
+        a, b = rated // step, easy // step
+        rating_rank, difficulty_rank = self.ranks["-rating"], self.ranks["difficulty"]
+        total = self.range_counts[a * width + b]
+        total += sum(1 for i in self.orders["-rating"][a * step:rated] if difficulty_rank[i] < easy)
+        total += sum(1 for i in self.orders["difficulty"][b * step:easy] if rating_rank[i] < a * step)
+        return total
+
+    def _rank_after(self, sort: str, after: tuple) -> int:
+        """Index in orders[sort] of the first professor whose key is greater than `after`."""
+        order = self.orders[sort]
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.sort_key(sort, order[mid]) <= after:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def sorted_page(self, sort: str, limit: int, start: int = 0, after: Optional[tuple] = None,
+                    department: Optional[str] = None, min_rating: Optional[float] = None,
+                    max_difficulty: Optional[float] = None) -> Tuple[int, List[int], bool]:
+        """
+        One page of the filtered professors in ordering `sort`: skips `start` matches after
+        the key `after` (a sort_key from a previous page, or None for the beginning).
+        Returns (total matches, positions, whether more follow). The cost does not depend on
+        how deep the page is.
+        """
+        n = len(self.names)
+        order = self.orders[sort]
+        begin = 0 if after is None else self._rank_after(sort, after)
+        sources, predicates = self._filters(department, min_rating, max_difficulty)
+        wanted = start + limit + 1  # one extra match tells whether another page follows
+
+        if not sources:
+            total = n
+            chunk = list(order[begin + start:begin + wanted])
+        else:
+            total = self.count(department, min_rating, max_difficulty)
+            if total * self.BROAD_FRACTION >= n:
+                # Broad filter: walk the ordering; about every BROAD_FRACTION-th professor matches
+                chunk = []
+                for r in range(begin, n):
+                    i = order[r]
+                    if all(p(i) for p in predicates):
+                        chunk.append(i)
+                        if len(chunk) >= wanted:
+                            break
+                chunk = chunk[start:]
+            else:
+                # Narrow filter: sort the few matches by rank (their dataset order does not matter)
+                rank = self.ranks[sort]
+                _, positions, others = self._smallest(sources, predicates)
+                matches = self._matching([i for i in positions() if rank[i] >= begin], others)
+                matches.sort(key=rank.__getitem__)
+                chunk = matches[start:wanted]
+        return total, chunk[:limit], len(chunk) > limit
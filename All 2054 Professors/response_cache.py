@@ -0,0 +1,81 @@
+"""
+LRU cache of serialized API responses.
+
+The read endpoints are pure functions of their parameters and the loaded dataset, so api.py
+stores each JSON body as bytes under (path, normalized params, dataset version) together with
+an ETag. A hit skips filtering and JSON encoding; a client sending the ETag back in
+If-None-Match gets a 304 with no body. Entries are evicted least-recently-used once their total
+size exceeds max_bytes, and the cache is cleared when a reload swaps in a new dataset.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+ENTRY_OVERHEAD = 200  # rough per-entry cost of the key, tuple and OrderedDict node, in bytes
+
+
+def make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for this header)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Thread-safe, size-bounded LRU of key -> (etag, body)."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_first(self, *keys: Hashable) -> Optional[Tuple[Hashable, Tuple[str, bytes]]]:
+        """(key, entry) of the first of keys that is cached, or None; a single hit or miss either way."""
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return key, entry
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, body: bytes) -> Tuple[str, bytes]:
+        """Store body under key and return its (etag, body). Bodies larger than the cache are not kept."""
+        entry = (make_etag(body), body)
+        cost = len(body) + ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return entry
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1]) + ENTRY_OVERHEAD
+            self.entries[key] = entry
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted) + ENTRY_OVERHEAD
+        return entry
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
@@ -0,0 +1,223 @@
+"""
+Retry policy shared by every HTTP call the scraper makes.
+
+- classify(): decides whether a failure is worth retrying (connection problems, timeouts,
+  429 / 5xx, unparsable bodies) or fatal (other 4xx, programming errors)
+- exponential backoff with full jitter, overridden by the server's Retry-After when present
+- one CircuitBreaker per endpoint: after `failure_threshold` consecutive failures the endpoint
+  is paused for `reset_timeout` seconds and then probed by a single request
+- a retry budget shared by the whole run, so a throttled site cannot keep the scraper looping
+- per-endpoint counters, printed by report() at the end of a run
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+TRANSIENT_ERRORS: Tuple[type, ...] = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+try:  # the optional HTTP/2 transport raises httpx errors
+    import httpx
+    TRANSIENT_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+
+class RetryableError(Exception):
+    """A failure that is expected to go away if the request is repeated later."""
+
+
+class RetryError(Exception):
+    """Raised by RetryPolicy.call when a request finally fails (fatal, out of attempts or out of budget)."""
+
+    def __init__(self, endpoint: str, reason: str, last: Optional[BaseException] = None, fatal: bool = False):
+        super().__init__(f"{endpoint}: {reason}" + (f" ({last})" if last else ""))
+        self.endpoint = endpoint
+        self.reason = reason
+        self.last = last
+        self.fatal = fatal  # the server rejected the request itself; repeating it will not help
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _response_of(exc: BaseException):
+    return getattr(exc, "response", None)
+
+
+def classify(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Returns (retryable, retry_after_seconds) for an exception raised by a request.
+    """
+    response = _response_of(exc)
+    status = getattr(response, "status_code", None)
+    if status is not None:
+        headers = getattr(response, "headers", None) or {}
+        return status in RETRYABLE_STATUS, parse_retry_after(headers.get("Retry-After"))
+    if isinstance(exc, RetryableError):
+        return True, None
+    if isinstance(exc, TRANSIENT_ERRORS):
+        return True, None
+    if isinstance(exc, ValueError):
+        # Body was not JSON - typically an HTML error or challenge page served while throttled
+        return True, None
+    return False, None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one endpoint.
+    closed -> open after `failure_threshold` failures; open -> half-open after `reset_timeout`;
+    in half-open a single probe is let through and decides between closed and open again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """Seconds the caller must wait before sending; 0 means go ahead."""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self.probing:
+                return min(1.0, self.reset_timeout)
+            self.probing = True
+            return 0.0
+
+    def success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.trips += 1
+            self.probing = False
+
+
+class RetryPolicy:
+    """
+    Runs request callables with classification, backoff, Retry-After, circuit breaking
+    and a run-wide retry budget. Thread-safe; one instance is shared by the whole run.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 60.0,
+                 budget: int = 500, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self.lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self.stats[endpoint] = {"calls": 0, "retries": 0, "failed": 0, "waited": 0.0}
+            return self.breakers[endpoint]
+
+    def _count(self, endpoint: str, key: str, amount: float = 1) -> None:
+        with self.lock:
+            self.stats[endpoint][key] += amount
+
+    def _take_budget(self) -> bool:
+        with self.lock:
+            if self.budget <= 0:
+                return False
+            self.budget -= 1
+            return True
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number `attempt` (1-based): Retry-After if given, else full jitter."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn(*args, **kwargs), retrying retryable failures. Raises RetryError on final failure."""
+        breaker = self.breaker(endpoint)
+        self._count(endpoint, "calls")
+        attempt = 0
+        while True:
+            wait = breaker.wait_time()
+            while wait > 0:
+                self._count(endpoint, "waited", wait)
+                self.sleep(wait)
+                wait = breaker.wait_time()
+
+            attempt += 1
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                retryable, retry_after = classify(exc)
+                if not retryable:
+                    breaker.success()  # the server answered; the request itself is wrong
+                    self._count(endpoint, "failed")
+                    raise RetryError(endpoint, "fatal error", exc, fatal=True) from exc
+                breaker.failure()
+                if attempt >= self.max_attempts:
+                    self._count(endpoint, "failed")
+                    raise RetryError(endpoint, f"gave up after {attempt} attempts", exc) from exc
+                if not self._take_budget():
+                    self._count(endpoint, "failed")
+                    raise RetryError(endpoint, "retry budget exhausted", exc) from exc
+                delay = self.backoff(attempt, retry_after)
+                self._count(endpoint, "retries")
+                self._count(endpoint, "waited", delay)
+                self.sleep(delay)
+                continue
+            breaker.success()
+            return result
+
+    def report(self) -> str:
+        """One line per endpoint with calls, retries, final failures, breaker trips and time waited."""
+        with self.lock:
+            lines = []
+            for endpoint, st in sorted(self.stats.items()):
+                lines.append(
+                    f"{endpoint}: {st['calls']:.0f} calls, {st['retries']:.0f} retries, "
+                    f"{st['failed']:.0f} failed, {self.breakers[endpoint].trips} circuit trips, "
+                    f"{st['waited']:.1f}s waited"
+                )
+            lines.append(f"retry budget left: {self.budget}")
+            return "\n".join(lines)
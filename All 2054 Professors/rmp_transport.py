@@ -0,0 +1,174 @@
+"""
+HTTP transport for the scraper.
+
+- PooledSession: a requests.Session with a connection pool sized for the worker count, keep-alive
+  reuse, explicit (connect, read) timeouts on every request, gzip/deflate (and brotli, when the
+  `brotli` / `brotlicffi` package is installed) response decoding, and the static headers set once
+- Http2Session: the same interface on top of httpx with HTTP/2 (optional: needs `httpx[http2]`)
+- GqlRequest: a GraphQL operation whose operationName / query part of the JSON body is encoded
+  once, so each call only serializes its variables
+Both sessions count requests and bytes on the wire (compressed sizes) for the end-of-run report.
+"""
+
+import json
+import threading
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# urllib3 / httpx decode brotli automatically when one of these is installed
+HAVE_BROTLI = find_spec("brotli") is not None or find_spec("brotlicffi") is not None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+ACCEPT_ENCODING = "gzip, deflate, br" if HAVE_BROTLI else "gzip, deflate"
+DEFAULT_TIMEOUT = (5.0, 30.0)  # (connect, read) seconds
+
+
+class TransferStats:
+    """Thread-safe request / byte counters."""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+
+    def add(self, sent: int, received: int) -> None:
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def report(self) -> str:
+        return (f"{self.requests} requests, {self.bytes_sent / 1024:.0f} KB sent, "
+                f"{self.bytes_received / 1024:.0f} KB received")
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session tuned for many small requests to one host.
+    Callers may pass headers=None: the static headers are already on the session.
+    """
+
+    preset_headers = True
+
+    def __init__(self, headers: Dict[str, str], pool_size: int = 10,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, pool_size), max_retries=0,
+                              pool_block=True)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.headers.update(headers)
+        self.headers["accept-encoding"] = ACCEPT_ENCODING
+        self.headers["connection"] = "keep-alive"
+        self.timeout = timeout
+        self.stats = TransferStats()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        r = super().request(method, url, **kwargs)
+        body = r.request.body or b""
+        received = _wire_length(r)
+        self.stats.add(len(body), received)
+        return r
+
+
+def _wire_length(r: requests.Response) -> int:
+    """Bytes read from the socket for the body (before decompression), falling back to the decoded size."""
+    try:
+        return int(r.raw.tell()) or len(r.content)
+    except Exception:
+        return len(r.content)
+
+
+class Http2Session:
+    """
+    Minimal requests-like session backed by httpx with HTTP/2 multiplexing.
+    httpx responses provide the .text / .json() / .raise_for_status() / .status_code / .headers
+    the scraper uses.
+    """
+
+    preset_headers = True
+
+    def __init__(self, headers: Dict[str, str], pool_size: int = 10,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
+        connect, read = timeout
+        self.client = httpx.Client(
+            http2=True,
+            follow_redirects=True,  # as requests does, e.g. for the ShowRatings.jsp fallback
+            headers={**headers, "accept-encoding": ACCEPT_ENCODING},
+            limits=httpx.Limits(max_connections=max(1, pool_size), max_keepalive_connections=max(1, pool_size)),
+            timeout=httpx.Timeout(read, connect=connect),
+        )
+        self.stats = TransferStats()
+
+    def _send(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, data: Any = None):
+        r = self.client.request(method, url, headers=headers, content=data)
+        received = r.num_bytes_downloaded or len(r.content)
+        self.stats.add(len(data or b""), received)
+        return r
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **_):
+        return self._send("GET", url, headers=headers)
+
+    def post(self, url: str, headers: Optional[Dict[str, str]] = None, data: Any = None, **_):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return self._send("POST", url, headers=headers, data=data)
+
+    def close(self) -> None:
+        self.client.close()
+
+    def __enter__(self) -> "Http2Session":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def make_session(headers: Dict[str, str], pool_size: int = 10, timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 http2: bool = False):
+    """Build the scraper's session; HTTP/2 is used only if asked for and httpx[http2] is installed."""
+    if http2:
+        if httpx is None:
+            print("Warning: HTTP/2 needs `pip install httpx[http2]`; using HTTP/1.1.")
+        else:
+            try:
+                return Http2Session(headers, pool_size=pool_size, timeout=timeout)
+            except ImportError as e:  # httpx without the h2 extra
+                print(f"Warning: HTTP/2 unavailable ({e}); using HTTP/1.1.")
+    return PooledSession(headers, pool_size=pool_size, timeout=timeout)
+
+
+class GqlRequest:
+    """
+    A GraphQL operation with its static part pre-encoded:
+        {"operationName": ..., "query": ..., "variables": <encoded per call>}
+    """
+
+    def __init__(self, operation: str, query: str):
+        self.operation = operation
+        self.query = query
+        self.prefix = ('{"operationName":%s,"query":%s,"variables":'
+                       % (json.dumps(operation), json.dumps(query))).encode("utf-8")
+
+    def encode(self, variables: Dict[str, Any]) -> bytes:
+        return self.prefix + json.dumps(variables, separators=(",", ":")).encode("utf-8") + b"}"
+
+
+@lru_cache(maxsize=64)
+def cached_request(operation: str, query: str) -> GqlRequest:
+    """
+    GqlRequest per distinct (operation, query), for documents only known at run time (gql_req's
+    query_str). The fixed documents are module-level GqlRequests, and the aliased ratings batches
+    come from DeAnza_AllProfessors.batch_ratings_request, which caches one per batch size.
+    """
+    return GqlRequest(operation, query)
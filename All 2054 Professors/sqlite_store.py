@@ -0,0 +1,482 @@
+"""
+Optional SQLite backend for the API: the scraper's export imported into an indexed database
+file and queried per request, instead of being held in memory by a ProfessorStore.
+
+import_export() streams rmp_deanza_all_professors.jsonl (or .json) into a database with
+  - professors: one row per professor; rating / num_ratings / difficulty / take_again are NULL
+    where the export has "", reviews are kept as JSON, and a row that ProfessorStore would keep
+    verbatim (see professor_store.is_regular) is also stored as JSON in `raw`
+  - indexes for the /professors filters (department, rating, difficulty) and one per sort=
+    ordering, on columns holding ProfessorStore.sort_key, so a keyset page is an index range scan
+  - professors_fts: an FTS5 trigram index over names, departments and review comments
+    (substring search, case-insensitive); without FTS5 the searches scan the table instead
+  - meta: the precomputed /stats and /departments payloads
+  - fuzzy_index: the arrays of the fuzzy name index (fuzzy_names.FuzzyIndex), loaded on first use
+SQLiteStore answers the same calls as ProfessorStore, pushing filters, ordering and
+pagination into SQL, so a request reads only the rows of its page.
+
+Usage:
+    python sqlite_store.py rmp_deanza_all_professors.jsonl rmp_deanza_all_professors.db
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.request import pathname2url
+
+from fuzzy_names import MAX_DISTANCE, FuzzyIndex, rank
+from professor_store import (
+    PROFESSOR_FIELDS,
+    encode_cursor,
+    fmt2,
+    is_regular,
+    next_version,
+    summarize,
+    to_float,
+)
+
+SCHEMA_VERSION = 2
+DB_SUFFIX = ".db"
+
+# sort= field -> column
+SORT_COLUMNS = {"rating": "rating", "num_ratings": "num_ratings", "difficulty": "difficulty"}
+
+# Exported field -> column it is rebuilt from
+FIELD_COLUMNS = {
+    "Full_Name": "full_name",
+    "Department": "department",
+    "Average_Rating": "rating",
+    "Num_Ratings": "num_ratings",
+    "Average_Difficulty": "difficulty",
+    "Would_Take_Again_Percent": "take_again",
+    "Latest_Reviews": "reviews",
+}
+
+SCHEMA = """
+CREATE TABLE professors (
+    pos INTEGER PRIMARY KEY,  -- position in the export
+    full_name TEXT NOT NULL,
+    name_key TEXT NOT NULL,   -- lowercased full_name
+    department TEXT,
+    department_key TEXT,      -- case-folded department, NULL if empty
+    rating REAL,
+    num_ratings INTEGER,
+    difficulty REAL,
+    take_again REAL,
+    reviews TEXT NOT NULL,    -- Latest_Reviews as JSON
+    comments TEXT,            -- review comments, one per line (searched)
+    raw TEXT,                 -- the exported row as JSON, if it does not round-trip through the columns
+    -- sort keys: <field>_missing, then the value ascending (<field>_asc) or descending (<field>_desc)
+    rating_missing INTEGER NOT NULL,
+    rating_asc REAL NOT NULL,
+    rating_desc REAL NOT NULL,
+    num_ratings_missing INTEGER NOT NULL,
+    num_ratings_asc NOT NULL,
+    num_ratings_desc NOT NULL,
+    difficulty_missing INTEGER NOT NULL,
+    difficulty_asc REAL NOT NULL,
+    difficulty_desc REAL NOT NULL
+);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE fuzzy_index (
+    name TEXT PRIMARY KEY,    -- keys (JSON), offsets, postings, deletes (array bytes)
+    data BLOB NOT NULL
+);
+"""
+
+IN_CHUNK = 500  # positions per "pos IN (...)" query, well below SQLite's variable limit
+
+
+def _sort_terms(sort: str) -> List[str]:
+    """Columns of ProfessorStore.sort_key for ordering `sort`."""
+    if sort == "name":
+        return ["name_key", "pos"]
+    column = SORT_COLUMNS[sort.lstrip("-")]
+    return [column + "_missing", column + ("_desc" if sort.startswith("-") else "_asc"), "name_key", "pos"]
+
+
+def _sort_indexes() -> Iterator[str]:
+    for field in SORT_COLUMNS:
+        for sort in (field, "-" + field):
+            name = "professors_sort_" + sort.replace("-", "desc_")
+            yield f"CREATE INDEX {name} ON professors({', '.join(_sort_terms(sort))})"
+    yield f"CREATE INDEX professors_sort_name ON professors({', '.join(_sort_terms('name'))})"
+
+
+def _nullable(x: float) -> Optional[float]:
+    return None if x != x else x
+
+
+def _sort_values(value: Any) -> tuple:
+    """(missing, ascending, descending) sort key parts of a column value, as ProfessorStore.sort_key has them."""
+    if value is None:
+        return (1, 0.0, 0.0)
+    return (0, value, -value)
+
+
+def iter_export(path: str) -> Iterator[Dict[str, Any]]:
+    """Rows of an export: .jsonl is streamed line by line, anything else is parsed as one JSON array."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def _record(i: int, p: Dict[str, Any]) -> tuple:
+    """Column values of professor p at position i, read the same way as ProfessorStore._append."""
+    regular = is_regular(p)
+    name = p.get("Full_Name")
+    name = name if isinstance(name, str) else ""
+    dept = p.get("Department")
+    dept = dept if isinstance(dept, str) else None
+    num_ratings = p.get("Num_Ratings", "")
+    reviews = p["Latest_Reviews"] if regular else []
+    comments = [r.get("Comment") for r in reviews if isinstance(r, dict)]
+    rating = _nullable(to_float(p.get("Average_Rating")))
+    num_ratings = num_ratings if regular and num_ratings != "" else None
+    difficulty = _nullable(to_float(p.get("Average_Difficulty")))
+    return (
+        i,
+        name,
+        name.lower(),
+        dept,
+        dept.casefold() if dept else None,
+        rating,
+        num_ratings,
+        difficulty,
+        _nullable(to_float(p.get("Would_Take_Again_Percent"))),
+        json.dumps(reviews, ensure_ascii=False, separators=(",", ":")),
+        "\n".join(c for c in comments if isinstance(c, str)) or None,
+        None if regular else json.dumps(p, ensure_ascii=False, separators=(",", ":")),
+    ) + _sort_values(rating) + _sort_values(num_ratings) + _sort_values(difficulty)
+
+
+def _create_fts(conn: sqlite3.Connection) -> bool:
+    """Build the FTS5 trigram index over professors; False if this SQLite has no FTS5 / trigram tokenizer."""
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE professors_fts USING fts5(full_name, department, comments, "
+            "content='professors', content_rowid='pos', tokenize='trigram')"
+        )
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("INSERT INTO professors_fts(professors_fts) VALUES ('rebuild')")
+    return True
+
+
+def import_export(src: str, db_path: str) -> int:
+    """
+    Import the export at `src` into a new database at `db_path` (built in a temporary file and
+    renamed into place, so an open SQLiteStore keeps reading the old one). Returns the row count.
+    """
+    tmp = db_path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+
+            # Num_Ratings total as ProfessorStore._summarize adds it up: regular rows, then irregular ones
+            total_reviews = 0
+            irregular_reviews: List[Any] = []
+
+            def records() -> Iterator[tuple]:
+                nonlocal total_reviews
+                for i, p in enumerate(iter_export(src)):
+                    record = _record(i, p)
+                    if record[11] is None:
+                        total_reviews += record[6] or 0
+                    elif isinstance(p.get("Num_Ratings", 0), (int, float)):
+                        irregular_reviews.append(p.get("Num_Ratings", 0))
+                    yield record
+
+            conn.executemany(f"INSERT INTO professors VALUES ({', '.join('?' * 21)})", records())
+            for value in irregular_reviews:
+                total_reviews += value
+
+            conn.execute("CREATE INDEX professors_department ON professors(department_key)")
+            conn.execute("CREATE INDEX professors_rating ON professors(rating)")
+            conn.execute("CREATE INDEX professors_difficulty ON professors(difficulty)")
+            for statement in _sort_indexes():
+                conn.execute(statement)
+            fts = _create_fts(conn)
+            fuzzy = FuzzyIndex.build(name for (name,) in conn.execute("SELECT full_name FROM professors ORDER BY pos"))
+            conn.executemany("INSERT INTO fuzzy_index VALUES (?, ?)", [
+                ("keys", json.dumps(fuzzy.keys, ensure_ascii=False).encode("utf-8")),
+                ("offsets", fuzzy.offsets.tobytes()),
+                ("postings", fuzzy.postings.tobytes()),
+                ("deletes", fuzzy.deletes.tobytes()),
+            ])
+
+            count = conn.execute("SELECT COUNT(*) FROM professors").fetchone()[0]
+            stats, departments = summarize(
+                count,
+                conn.execute("SELECT department, COUNT(*) FROM professors GROUP BY department ORDER BY MIN(pos)"),
+                total_reviews,
+                (r for (r,) in conn.execute("SELECT rating FROM professors WHERE rating IS NOT NULL ORDER BY pos")),
+                (d for (d,) in conn.execute(
+                    "SELECT difficulty FROM professors WHERE difficulty IS NOT NULL ORDER BY pos")),
+            )
+            meta = {"schema": SCHEMA_VERSION, "fts": fts, "count": count, "stats": stats, "departments": departments}
+            conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                             [(k, json.dumps(v, ensure_ascii=False)) for k, v in meta.items()])
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp, db_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+class SQLiteStore:
+    """A database written by import_export, with the query interface of ProfessorStore."""
+
+    def __init__(self, db_path: str):
+        if not os.path.exists(db_path):
+            raise OSError(f"{db_path} not found")
+        self.version = next_version()
+        self.conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro",
+                                    uri=True, check_same_thread=False)
+        self.conn.create_function("py_lower", 1, _lower, deterministic=True)
+        self.lock = threading.Lock()  # handlers and the reload thread share the connection
+        try:
+            meta = {k: json.loads(v) for k, v in self.conn.execute("SELECT key, value FROM meta")}
+        except sqlite3.DatabaseError as e:
+            self.conn.close()
+            raise ValueError(f"{db_path} is not a professor database ({e})") from e
+        if meta.get("schema") != SCHEMA_VERSION:
+            self.conn.close()
+            raise ValueError(f"{db_path}: unsupported schema version {meta.get('schema')}")
+        self._fuzzy: Optional[FuzzyIndex] = None
+        self.fts = meta["fts"]
+        self.count = meta["count"]
+        self.stats = meta["stats"]
+        self.departments = meta["departments"]
+
+    def _all(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _page(self, where: List[str], params: List[Any], start: int,
+              stop: Optional[int]) -> Tuple[int, List[int]]:
+        """(rows matching every condition in `where`, their positions[start:stop] in dataset order)."""
+        if not where:  # positions are 0..count-1
+            return self.count, list(range(start, min(self.count if stop is None else stop, self.count)))
+        clause = " WHERE " + " AND ".join(where)
+        limit = -1 if stop is None else max(stop - start, 0)
+        total = self._all("SELECT COUNT(*) FROM professors" + clause, params)[0][0]
+        if start >= total or limit == 0:
+            return total, []
+        rows = self._all(f"SELECT pos FROM professors{clause} ORDER BY pos LIMIT ? OFFSET ?",
+                         params + [limit, start])
+        return total, [i for (i,) in rows]
+
+    # ---------------------------- Serialization ----------------------------
+    def rows(self, positions: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Rows for positions; with `fields`, only those keys (in PROFESSOR_FIELDS order) are built."""
+        wanted = PROFESSOR_FIELDS if fields is None else fields
+        columns = ", ".join(["pos", "raw"] + [FIELD_COLUMNS[f] for f in wanted])
+        found: Dict[int, tuple] = {}
+        positions = list(positions)
+        for k in range(0, len(positions), IN_CHUNK):
+            chunk = positions[k:k + IN_CHUNK]
+            for row in self._all(f"SELECT {columns} FROM professors WHERE pos IN ({', '.join('?' * len(chunk))})",
+                                 chunk):
+                found[row[0]] = row
+        out = []
+        for i in positions:
+            row = found[i]
+            if row[1] is not None:
+                raw = json.loads(row[1])
+                out.append(raw if fields is None else {f: raw[f] for f in fields if f in raw})
+            else:
+                out.append({f: _field(f, v) for f, v in zip(wanted, row[2:])})
+        return out
+
+    # ---------------------------- Queries ----------------------------
+    def __len__(self) -> int:
+        return self.count
+
+    def search_names(self, text: str) -> List[int]:
+        """Positions whose Full_Name contains `text` (case-insensitive), in dataset order."""
+        where, params = self._text_match(text, ("full_name",))
+        return [i for (i,) in self._all(f"SELECT pos FROM professors WHERE {where} ORDER BY pos", params)]
+
+    @property
+    def fuzzy(self) -> FuzzyIndex:
+        """The fuzzy name index, read from the database the first time it is needed."""
+        if self._fuzzy is None:
+            data = dict(self._all("SELECT name, data FROM fuzzy_index"))
+            arrays = {}
+            for name, typecode in (("offsets", "Q"), ("postings", "I"), ("deletes", "Q")):
+                arrays[name] = array(typecode)
+                arrays[name].frombytes(data[name])
+            self._fuzzy = FuzzyIndex(json.loads(data["keys"]), **arrays)
+        return self._fuzzy
+
+    def fuzzy_search_names(self, text: str, max_distance: int = MAX_DISTANCE) -> List[Tuple[int, int]]:
+        """
+        (position, edit distance) of the names containing `text`, or whose words are within a
+        small edit distance of its words (at most max_distance per word), closest first.
+        """
+        return rank(self.search_names(text), self.fuzzy.search(text, max_distance))
+
+    def find_by_name(self, name: str, department: Optional[str] = None) -> List[int]:
+        """Positions whose Full_Name equals `name` (case-insensitive), optionally within `department`."""
+        sql = "SELECT pos FROM professors WHERE name_key = ?"
+        params = [name.lower()]
+        if department:
+            sql += " AND department_key = ?"
+            params.append(department.casefold())
+        return [i for (i,) in self._all(sql + " ORDER BY pos", params)]
+
+    def _text_match(self, text: str, columns: Sequence[str]) -> Tuple[str, List[Any]]:
+        """Condition for "one of `columns` contains `text`" (case-insensitive substring)."""
+        lowered = text.lower()
+        if not lowered:
+            return "1", []
+        if self.fts and len(lowered) >= 3:  # the trigram index cannot match shorter text
+            phrase = '"%s"' % text.replace('"', '""')
+            return ("pos IN (SELECT rowid FROM professors_fts WHERE professors_fts MATCH ?)",
+                    ["{%s} : %s" % (" ".join(columns), phrase)])
+        conditions, params = [], []
+        if "full_name" in columns:
+            conditions.append("instr(name_key, ?) > 0")
+            params.append(lowered)
+        if "department" in columns:
+            # Few distinct departments: match them here and look the rows up by department
+            matching = [d for d in self.departments["departments"] if lowered in d.lower()]
+            if matching:
+                conditions.append(f"department IN ({', '.join('?' * len(matching))})")
+                params += matching
+        if "comments" in columns:
+            conditions.append("instr(py_lower(comments), ?) > 0")
+            params.append(lowered)
+        return "(" + " OR ".join(conditions) + ")", params
+
+    def search_page(self, text: str, start: int = 0, stop: Optional[int] = None,
+                    reviews: bool = False) -> Tuple[int, List[int]]:
+        """
+        /search: (total matches, positions[start:stop]) of the professors whose Full_Name or
+        Department - or, with `reviews`, a review comment - contains `text`, in dataset order.
+        """
+        columns = ("full_name", "department", "comments") if reviews else ("full_name", "department")
+        where, params = self._text_match(text, columns)
+        return self._page([where], params, start, stop)
+
+    def department_page(self, department: str, start: int = 0,
+                        stop: Optional[int] = None) -> Tuple[int, List[int]]:
+        """(professors in `department`, positions[start:stop]), in dataset order."""
+        return self._page(["department_key = ?"], [department.casefold()], start, stop)
+
+    def _filters(self, department: Optional[str], min_rating: Optional[float],
+                 max_difficulty: Optional[float]) -> Tuple[List[str], List[Any]]:
+        """The /professors filters as SQL conditions (NULL, a missing value, fails every comparison)."""
+        where: List[str] = []
+        params: List[Any] = []
+        if department:
+            where.append("department_key = ?")
+            params.append(department.casefold())
+        if min_rating is not None:
+            where.append("rating >= ?")
+            params.append(min_rating)
+        if max_difficulty is not None:
+            where.append("difficulty <= ?")
+            params.append(max_difficulty)
+        return where, params
+
+    def query(self, department: Optional[str] = None, min_rating: Optional[float] = None,
+              max_difficulty: Optional[float] = None, start: int = 0,
+              stop: Optional[int] = None) -> Tuple[int, List[int]]:
+        """Apply the /professors filters. Returns (total matches, positions[start:stop]) in dataset order."""
+        where, params = self._filters(department, min_rating, max_difficulty)
+        return self._page(where, params, start, stop)
+
+    def export_positions(self, department: Optional[str] = None, min_rating: Optional[float] = None,
+                         max_difficulty: Optional[float] = None, chunk: int = 500) -> Iterator[List[int]]:
+        """
+        Positions matching the /professors filters in dataset order, in lists of up to `chunk`.
+        Each list is one keyset query, so no cursor stays open between them.
+        """
+        where, params = self._filters(department, min_rating, max_difficulty)
+        clause = " AND ".join(where + ["pos > ?"])
+        after = -1
+        while True:
+            rows = self._all(f"SELECT pos FROM professors WHERE {clause} ORDER BY pos LIMIT ?", params + [after, chunk])
+            if not rows:
+                return
+            yield [i for (i,) in rows]
+            after = rows[-1][0]
+
+    # ---------------------------- Sorting ----------------------------
+    def cursor_after(self, sort: str, i: int, filters: str = "") -> str:
+        """Opaque cursor for the page that follows professor i in ordering `sort`, under `filters`."""
+        return encode_cursor(sort, self.sort_key(sort, i), filters)
+
+    def sort_key(self, sort: str, i: int) -> tuple:
+        """Key of professor i in ordering `sort`, as ProfessorStore.sort_key computes it."""
+        return tuple(self._all(f"SELECT {', '.join(_sort_terms(sort))} FROM professors WHERE pos = ?", [i])[0])
+
+    def sorted_page(self, sort: str, limit: int, start: int = 0, after: Optional[tuple] = None,
+                    department: Optional[str] = None, min_rating: Optional[float] = None,
+                    max_difficulty: Optional[float] = None) -> Tuple[int, List[int], bool]:
+        """
+        One page of the filtered professors in ordering `sort`: skips `start` matches after
+        the key `after`. Returns (total matches, positions, whether more follow).
+        """
+        where, params = self._filters(department, min_rating, max_difficulty)
+        total = self._page(where, params, 0, 0)[0]
+        terms = _sort_terms(sort)
+        if after is not None:
+            where = where + [f"({', '.join(terms)}) > ({', '.join('?' * len(terms))})"]
+            params = params + list(after)
+        clause = " WHERE " + " AND ".join(where) if where else ""
+        rows = self._all(f"SELECT pos FROM professors{clause} ORDER BY {', '.join(terms)} LIMIT ? OFFSET ?",
+                         params + [limit + 1, start])
+        positions = [i for (i,) in rows]
+        return total, positions[:limit], len(positions) > limit
+
+
+def _lower(text: Optional[str]) -> Optional[str]:
+    """SQL py_lower(): Python's str.lower (SQLite's lower() only folds ASCII)."""
+    return None if text is None else text.lower()
+
+
+def _field(field: str, value: Any) -> Any:
+    """The exported value of `field` from its column value."""
+    if field == "Latest_Reviews":
+        return json.loads(value)
+    if field in ("Average_Rating", "Average_Difficulty", "Would_Take_Again_Percent"):
+        return "" if value is None else fmt2(value)
+    if field == "Num_Ratings":
+        return "" if value is None else value
+    return value
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Usage: python sqlite_store.py <export.jsonl|export.json> <database.db>")
+        sys.exit(2)
+    count = import_export(argv[0], argv[1])
+    print(f"Imported {count} professors from {argv[0]} into {argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
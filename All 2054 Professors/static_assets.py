@@ -0,0 +1,67 @@
+"""
+The web interface's files (static/), read and precompressed once when the API starts.
+
+Each file is kept in memory with its ETag and its gzip (and brotli) encodings, and served with a
+Cache-Control max-age plus the ETag, so a browser reuses its copy and afterwards revalidates it
+with a 304 instead of downloading the page again.
+"""
+
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from compression import ENCODINGS, MIN_SIZE, choose_encoding, compress
+from response_cache import etag_matches, make_etag
+
+# The file names are not versioned, so "long-lived" is a day; after that a request costs a 304
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 24 * 60 * 60))
+
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+class StaticAssets:
+    """Files under `directory` by relative path ("index.html", "css/site.css", ...)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # path -> (media type, {encoding or None: (etag, body)})
+        self.files: Dict[str, Tuple[str, Dict[Optional[str], Tuple[str, bytes]]]] = {}
+        if not os.path.isdir(directory):
+            return
+        for root, _, names in os.walk(directory):
+            for name in names:
+                full = os.path.join(root, name)
+                with open(full, "rb") as f:
+                    body = f.read()
+                # Bare type: Starlette's Response appends "; charset=utf-8" to text/* itself
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                variants = {None: (make_etag(body), body)}
+                if len(body) >= MIN_SIZE and media_type.startswith(_COMPRESSIBLE):
+                    for encoding in ENCODINGS:
+                        data = compress(body, encoding, static=True)
+                        variants[encoding] = (make_etag(data), data)
+                path = os.path.relpath(full, directory).replace(os.sep, "/")
+                self.files[path] = (media_type, variants)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.files
+
+    def response(self, request: Request, path: str) -> Response:
+        """The file at path (404 if there is none), encoded as the client accepts, or a 304."""
+        entry = self.files.get(path)
+        if entry is None:
+            return Response(status_code=404)
+        media_type, variants = entry
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if encoding not in variants:
+            encoding = None
+        etag, body = variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={STATIC_MAX_AGE}", "Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type=media_type, headers=headers)
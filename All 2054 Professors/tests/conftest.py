@@ -0,0 +1,180 @@
+"""
+Shared fixtures for the test suite. The project's modules live next to this directory (not in a
+package), so it is put on sys.path here; run the tests from "All 2054 Professors" with `pytest`.
+
+FakeSite stands in for RateMyProfessors: it answers the scraper's requests (the server-rendered
+search page, the GraphQL search pagination and the single / aliased ratings queries) from a
+list of generated teachers, through a session object with the `get` / `post` interface of
+requests.Session, and records every request it served.
+
+professor_rows() is the API side's fixture dataset: a few hundred professors in the export
+schema (benchmarks/synthetic.py, so names repeat and some ratings and departments are missing)
+plus rows ProfessorStore keeps verbatim because they would not round-trip through its columns.
+"""
+
+import base64
+import json
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from DeAnza_AllProfessors import RELAY_MARKER, cursor_offset, offset_cursor  # noqa: E402
+from synthetic import export_rows  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 200, payload: Any = None, text: str = "",
+                 headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.text = text if payload is None else json.dumps(payload)
+        self.headers = headers or {}
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+
+def make_teacher(n: int) -> Dict[str, Any]:
+    """A Teacher node as the search query returns it."""
+    return {
+        "__typename": "Teacher",
+        "id": base64.b64encode(f"Teacher-{n}".encode()).decode(),
+        "legacyId": n,
+        "firstName": f"First{n}",
+        "lastName": f"Last{n}",
+        "department": ["Mathematics", "English", "Physics"][n % 3],
+        "avgRating": 1 + n % 5,
+        "numRatings": n % 7,
+        "avgDifficulty": 1 + n % 4,
+        "wouldTakeAgainPercent": 50,
+    }
+
+
+def make_rating(teacher_id: str, k: int) -> Dict[str, Any]:
+    """A Rating node as the ratings queries return it."""
+    return {"id": f"{teacher_id}-r{k}", "comment": f"review {k} of {teacher_id}", "date": "2024-01-01",
+            "clarityRating": 5, "difficultyRating": 3, "isForOnlineClass": False, "isForCredit": True,
+            "wouldTakeAgain": True, "grade": "A", "textbookUse": 0, "attendanceMandatory": "", "class": "M1"}
+
+
+class FakeSite:
+    """
+    `num_teachers` teachers, `first_page` of them on the server-rendered page. The search query
+    returns at most `max_first` teachers per page. `hook(kind, detail)` is called before each
+    request is answered and may raise (to simulate a crash) or return a FakeResponse to send instead.
+    """
+
+    def __init__(self, num_teachers: int = 50, first_page: int = 8, max_first: int = 1000,
+                 hook: Optional[Callable[[str, Any], Optional[FakeResponse]]] = None):
+        self.teachers = [make_teacher(n) for n in range(num_teachers)]
+        self.first_page = first_page
+        self.max_first = max_first
+        self.hook = hook
+        # Aliased ratings queries: teacher id -> error message, and ids whose node comes back null
+        self.batch_errors: Dict[str, str] = {}
+        self.batch_missing: Set[str] = set()
+        self.requests: List[tuple] = []
+        self.lock = threading.Lock()
+
+    def _record(self, kind: str, detail: Any) -> Optional[FakeResponse]:
+        with self.lock:
+            self.requests.append((kind, detail))
+        return self.hook(kind, detail) if self.hook else None
+
+    def count(self, kind: str) -> int:
+        return sum(1 for k, _ in self.requests if k == kind)
+
+    # ---------------------------- requests.Session interface ----------------------------
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **_) -> FakeResponse:
+        override = self._record("html", url)
+        if override is not None:
+            return override
+        store: Dict[str, Any] = {t["id"]: t for t in self.teachers[:self.first_page]}
+        store["client:root:pageInfo"] = {"__typename": "PageInfo", "endCursor": offset_cursor(self.first_page - 1),
+                                         "hasNextPage": len(self.teachers) > self.first_page}
+        return FakeResponse(text="<html><script>" + RELAY_MARKER + json.dumps(store) + ";</script></html>")
+
+    def post(self, url: str, headers: Optional[Dict[str, str]] = None, data: bytes = b"", **_) -> FakeResponse:
+        body = json.loads(data)
+        operation, variables = body["operationName"], body["variables"]
+        if operation == "TeacherSearchPaginationQuery":
+            override = self._record("search", (variables["after"], variables["first"]))
+            return override or self._search(variables["after"], variables["first"])
+        if operation == "TeacherRatingsPageQuery":
+            override = self._record("ratings", variables["id"])
+            return override or FakeResponse(payload={"data": {"node": self._ratings(variables["id"])}})
+        if operation == "TeacherRatingsBatchQuery":
+            override = self._record("batch", [variables[f"id{i}"] for i in range(len(variables))])
+            return override or self._batch(variables)
+        raise AssertionError(f"unexpected operation {operation}")
+
+    # ---------------------------- Answers ----------------------------
+    def _search(self, after: str, first: int) -> FakeResponse:
+        start = cursor_offset(after) + 1
+        page = self.teachers[start:start + min(first, self.max_first)]
+        end = start + len(page) - 1
+        return FakeResponse(payload={"data": {"newSearch": {"teachers": {
+            "edges": [{"node": t} for t in page],
+            "pageInfo": {"endCursor": offset_cursor(end), "hasNextPage": end + 1 < len(self.teachers)},
+            "resultCount": len(self.teachers),
+        }}}})
+
+    def _ratings(self, teacher_id: str) -> Dict[str, Any]:
+        return {"id": teacher_id, "ratings": {"edges": [{"node": make_rating(teacher_id, k)} for k in range(2)]}}
+
+    def _batch(self, variables: Dict[str, str]) -> FakeResponse:
+        data, errors = {}, []
+        for i in range(len(variables)):
+            teacher_id = variables[f"id{i}"]
+            if teacher_id in self.batch_errors:
+                data[f"t{i}"] = None
+                errors.append({"message": self.batch_errors[teacher_id], "path": [f"t{i}"]})
+            else:
+                data[f"t{i}"] = None if teacher_id in self.batch_missing else self._ratings(teacher_id)
+        return FakeResponse(payload={"data": data, **({"errors": errors} if errors else {})})
+
+
+def professor_rows(num_professors: int = 400) -> List[Dict[str, Any]]:
+    rows = list(export_rows(num_professors, seed=11))
+    regular = rows[0]
+    rows.append(dict(regular, Full_Name="Irregular Rating", Average_Rating="4.5"))  # not "4.50"
+    rows.append(dict(regular, Full_Name="Extra Key", Nickname="EK"))
+    rows.append(dict(regular, Full_Name="Odd Reviews", Latest_Reviews=[{"Comment": "Office Hours are great"}]))
+    return rows
+
+
+class FakeClock:
+    """
+    time.monotonic / time.sleep replacement: sleeping advances the clock instantly. As a real
+    sleep does, it always takes some time, so a wait shorter than the clock's resolution cannot stall.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept: List[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += max(seconds, 1e-9)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr("time.monotonic", fake.monotonic)
+    monkeypatch.setattr("time.sleep", fake.sleep)
+    return fake
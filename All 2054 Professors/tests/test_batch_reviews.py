@@ -0,0 +1,65 @@
+"""Aliased ratings batches and their fall back to single-teacher requests."""
+
+import pytest
+
+from DeAnza_AllProfessors import fetch_teacher_reviews_batch, teacher_row
+from rmp_retry import RetryError, RetryPolicy
+
+from conftest import FakeResponse, FakeSite
+
+
+def comments(reviews):
+    return [r["comment"] for r in reviews]
+
+
+@pytest.fixture
+def site():
+    return FakeSite(num_teachers=6)
+
+
+@pytest.fixture
+def teachers(site):
+    return [teacher_row(t) for t in site.teachers]
+
+
+def expected(teachers):
+    return [[f"review {k} of {t['id']}" for k in range(2)] for t in teachers]
+
+
+def test_batch_answers_all_teachers_with_one_request(site, teachers):
+    results = fetch_teacher_reviews_batch(site, teachers)
+    assert [comments(r) for r in results] == expected(teachers)
+    assert site.requests == [("batch", [t["id"] for t in teachers])]
+
+
+def test_failed_aliases_fall_back_to_single_requests(site, teachers):
+    site.batch_errors[teachers[1]["id"]] = "Internal error"
+    site.batch_missing.add(teachers[4]["id"])
+    results = fetch_teacher_reviews_batch(site, teachers)
+    assert [comments(r) for r in results] == expected(teachers)
+    assert site.requests[1:] == [("ratings", teachers[1]["id"]), ("ratings", teachers[4]["id"])]
+
+
+def test_error_without_path_fails_every_alias(site, teachers):
+    site.hook = lambda kind, detail: FakeResponse(payload={"data": None, "errors": [{"message": "boom"}]}) \
+        if kind == "batch" else None
+    results = fetch_teacher_reviews_batch(site, teachers)
+    assert [comments(r) for r in results] == expected(teachers)
+    assert site.requests[1:] == [("ratings", t["id"]) for t in teachers]
+
+
+def test_rejected_document_falls_back_to_single_requests(site, teachers):
+    site.hook = lambda kind, detail: FakeResponse(status_code=400, text="query too complex") \
+        if kind == "batch" else None
+    results = fetch_teacher_reviews_batch(site, teachers, retry=RetryPolicy(max_attempts=3, sleep=lambda s: None))
+    assert [comments(r) for r in results] == expected(teachers)
+    assert site.count("batch") == 1  # a 400 is not retried
+    assert site.requests[1:] == [("ratings", t["id"]) for t in teachers]
+
+
+def test_transient_batch_failure_is_raised_not_split(site, teachers):
+    site.hook = lambda kind, detail: FakeResponse(status_code=503) if kind == "batch" else None
+    with pytest.raises(RetryError) as info:
+        fetch_teacher_reviews_batch(site, teachers, retry=RetryPolicy(max_attempts=2, sleep=lambda s: None))
+    assert not info.value.fatal
+    assert site.count("batch") == 2 and site.count("ratings") == 0
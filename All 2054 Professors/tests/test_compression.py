@@ -0,0 +1,151 @@
+"""Content-Encoding negotiation, the size threshold, and the precompressed static pages with their 304s."""
+
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import compression
+from compression import MIN_SIZE, choose_encoding, compress
+from professor_store import ProfessorStore
+from response_cache import ResponseCache, make_etag
+from static_assets import STATIC_MAX_AGE, StaticAssets
+
+from conftest import professor_rows
+
+ROWS = professor_rows(60)
+BIG = "/professors?limit=20&format=json"  # well over MIN_SIZE
+SMALL = "/professors?limit=1&fields=Full_Name&format=json"  # well under it
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP", "gzip"),
+    ("deflate, gzip", "gzip"),
+    ("br, gzip", "br"),
+    ("gzip, br", "br"),  # server preference, not header order
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=bad", None),
+    ("*", "br"),
+    ("*;q=0.1, br;q=0", "gzip"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header, ("br", "gzip")) == expected
+
+
+def test_choose_encoding_only_offers_what_is_installed():
+    assert choose_encoding("br, gzip") == ("br" if compression.brotli is not None else "gzip")
+
+
+def test_compress_is_deterministic():
+    body = b'{"data": "professor"}' * 100
+    assert compress(body, "gzip") == compress(body, "gzip")  # equal bodies, equal ETags
+    assert gzip.decompress(compress(body, "gzip")) == body
+    assert gzip.decompress(compress(body, "gzip", static=True)) == body
+    with pytest.raises(ValueError):
+        compress(body, "deflate")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "store", ProfessorStore(ROWS))
+    monkeypatch.setattr(api, "response_cache", ResponseCache(api.RESPONSE_CACHE_BYTES))
+    return TestClient(api.app)
+
+
+def raw_get(client, path, **headers):
+    """(response, body bytes as sent, before any decoding)."""
+    with client.stream("GET", path, headers=headers) as r:
+        return r, b"".join(r.iter_raw())
+
+
+def test_large_json_is_gzipped_and_cached(client):
+    plain, plain_body = raw_get(client, BIG, **{"Accept-Encoding": "identity"})
+    assert len(plain_body) >= MIN_SIZE and "content-encoding" not in plain.headers
+
+    r, body = raw_get(client, BIG, **{"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == plain_body
+    assert len(body) < len(plain_body)
+    assert r.headers["etag"] == make_etag(body) != plain.headers["etag"]  # its own representation
+
+    hits = api.response_cache.hits
+    again, again_body = raw_get(client, BIG, **{"Accept-Encoding": "gzip"})
+    assert api.response_cache.hits == hits + 1 and again_body == body  # served from the cache, not recompressed
+    assert raw_get(client, BIG, **{"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]})[0].status_code == 304
+    # The identity ETag does not validate the gzip copy
+    assert raw_get(client, BIG, **{"Accept-Encoding": "gzip",
+                                   "If-None-Match": plain.headers["etag"]})[0].status_code == 200
+
+
+def test_small_json_is_not_compressed(client):
+    r, body = raw_get(client, SMALL, **{"Accept-Encoding": "gzip"})
+    assert len(body) < MIN_SIZE
+    assert "content-encoding" not in r.headers
+    assert r.headers["etag"] == make_etag(body)
+
+
+def test_threshold_is_inclusive(client, monkeypatch):
+    size = len(raw_get(client, SMALL, **{"Accept-Encoding": "identity"})[1])
+    monkeypatch.setattr(api, "response_cache", ResponseCache(api.RESPONSE_CACHE_BYTES))
+    monkeypatch.setattr(api, "MIN_SIZE", size + 1)
+    assert "content-encoding" not in raw_get(client, SMALL, **{"Accept-Encoding": "gzip"})[0].headers
+    monkeypatch.setattr(api, "MIN_SIZE", size)
+    assert raw_get(client, SMALL, **{"Accept-Encoding": "gzip"})[0].headers["content-encoding"] == "gzip"
+
+
+def test_brotli_when_installed(client):
+    if compression.brotli is None:
+        pytest.skip("brotli is not installed")
+    plain_body = raw_get(client, BIG, **{"Accept-Encoding": "identity"})[1]
+    r, body = raw_get(client, BIG, **{"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    assert compression.brotli.decompress(body) == plain_body
+
+
+# ---------------------------- Static pages ----------------------------
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    (tmp_path / "index.html").write_text("<html>" + "professor " * 500 + "</html>", encoding="utf-8")
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "tiny.css").write_text("body{margin:0}", encoding="utf-8")
+    (tmp_path / "logo.png").write_bytes(bytes(range(256)) * 10)
+    static = StaticAssets(str(tmp_path))
+    monkeypatch.setattr(api, "static_assets", static)
+    return static
+
+
+def test_static_files_are_precompressed_once(assets):
+    assert set(assets.files) == {"index.html", "css/tiny.css", "logo.png"}
+    media_type, variants = assets.files["index.html"]
+    assert media_type == "text/html" and set(variants) == {None, *compression.ENCODINGS}
+    assert set(assets.files["css/tiny.css"][1]) == {None}  # under MIN_SIZE
+    assert set(assets.files["logo.png"][1]) == {None}  # already compressed formats are left alone
+
+
+@pytest.mark.parametrize("path, url", [("index.html", "/"), ("css/tiny.css", "/static/css/tiny.css"),
+                                       ("logo.png", "/static/logo.png")])
+@pytest.mark.parametrize("accept", ["identity", "gzip"])
+def test_static_etag_and_304(client, assets, path, url, accept):
+    r, body = raw_get(client, url, **{"Accept-Encoding": accept})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == f"public, max-age={STATIC_MAX_AGE}"
+    assert assets.files[path][1][r.headers.get("content-encoding")] == (r.headers["etag"], body)
+
+    revalidated, empty = raw_get(client, url, **{"Accept-Encoding": accept, "If-None-Match": r.headers["etag"]})
+    assert revalidated.status_code == 304 and empty == b""
+    assert revalidated.headers["etag"] == r.headers["etag"]
+    assert raw_get(client, url, **{"Accept-Encoding": accept, "If-None-Match": '"stale"'})[0].status_code == 200
+
+
+def test_static_head_and_missing(client, assets):
+    head = client.head("/static/index.html", headers={"Accept-Encoding": "identity"})
+    assert head.status_code == 200 and head.headers["etag"] == assets.files["index.html"][1][None][0]
+    assert client.get("/static/missing.html").status_code == 404
@@ -0,0 +1,75 @@
+"""Keyset cursors of /professors?sort=: encoding, and walking the API with them."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from DeAnza_AllProfessors import iter_export_rows, teacher_row
+from professor_store import ProfessorStore, decode_cursor, encode_cursor, filters_digest
+
+from conftest import make_teacher
+
+
+@pytest.fixture
+def client(monkeypatch):
+    rows = iter_export_rows(dict(teacher_row(make_teacher(n)), reviews=[]) for n in range(60))
+    monkeypatch.setattr(api, "store", ProfessorStore(rows))
+    return TestClient(api.app)
+
+
+def test_cursor_round_trip():
+    key = (0, -4.5, "last7 first7", 7)
+    filters = filters_digest("Mathematics", 3, None)
+    assert decode_cursor(encode_cursor("-rating", key, filters)) == ("-rating", key, filters)
+    assert decode_cursor(encode_cursor("name", ("lee ana", 3))) == ("name", ("lee ana", 3), "")
+
+
+@pytest.mark.parametrize("cursor", [
+    "zzz",
+    encode_cursor("bogus", (0, 1.0, "a", 1)),
+    encode_cursor("name", (0, 1.0, "a", 1)),  # a numeric key under the name ordering
+    encode_cursor("rating", ("a", 1)),
+])
+def test_decode_rejects_invalid_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_filters_digest_matches_equivalent_filters():
+    assert filters_digest("Mathematics", 3, None) == filters_digest("mathematics", 3.0, None)
+    assert filters_digest("Mathematics", 3, None) != filters_digest("Mathematics", None, 3)
+    assert filters_digest(None, None, None) != filters_digest("", 0, None)
+
+
+def walk(client, **params):
+    names, cursor = [], None
+    while True:
+        body = client.get("/professors", params=dict(params, format="json", cursor=cursor) if cursor
+                          else dict(params, format="json")).json()
+        names += [p["Full_Name"] for p in body["data"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return body["total"], names
+
+
+@pytest.mark.parametrize("params", [
+    {"sort": "-rating", "limit": 7},
+    {"sort": "name", "limit": 10},
+    {"sort": "difficulty", "limit": 4, "department": "physics", "min_rating": 2},
+])
+def test_cursor_walk_matches_page_walk(client, params):
+    total, names = walk(client, **params)
+    full = client.get("/professors", params=dict(params, format="json", limit=100)).json()
+    assert total == full["total"] == len(names)
+    assert names == [p["Full_Name"] for p in full["data"]]
+
+
+def test_cursor_rejected_for_other_filters_or_sort(client):
+    cursor = client.get("/professors", params={"format": "json", "sort": "rating", "limit": 5,
+                                               "department": "English"}).json()["next_cursor"]
+    follow = {"format": "json", "limit": 5, "cursor": cursor}
+    assert client.get("/professors", params=dict(follow, department="english")).status_code == 200
+    for changed in ({"department": "Physics"}, {}, {"department": "English", "min_rating": 3},
+                    {"department": "English", "sort": "name"}):
+        assert client.get("/professors", params=dict(follow, **changed)).status_code == 400
+    assert client.get("/professors", params={"format": "json", "cursor": "zzz"}).status_code == 400
@@ -0,0 +1,106 @@
+"""/export.ndjson and /export.csv: the scraper's file layouts, filters, projection and on-the-fly gzip."""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from DeAnza_AllProfessors import ExportWriter
+from professor_store import ProfessorStore
+
+from conftest import professor_rows
+
+ROWS = professor_rows(120)
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "store", ProfessorStore(ROWS))
+    monkeypatch.setattr(api, "EXPORT_CHUNK", 7)  # many chunks, and a short last one
+    return TestClient(api.app)
+
+
+@pytest.fixture(scope="module")
+def scraper_files(tmp_path_factory):
+    """The .jsonl and .csv files the scraper writes for ROWS."""
+    prefix = str(tmp_path_factory.mktemp("export") / "professors")
+    with ExportWriter(prefix) as w:
+        for row in ROWS:
+            w.write(row)
+    with open(prefix + ".jsonl", "rb") as f, open(prefix + ".csv", "rb") as g:
+        return f.read(), g.read()
+
+
+def test_exports_match_the_scraper_files(client, scraper_files):
+    jsonl, csv_bytes = scraper_files
+    ndjson = client.get("/export.ndjson", headers=IDENTITY)
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert ndjson.headers["content-disposition"] == 'attachment; filename="professors.ndjson"'
+    assert ndjson.content == jsonl
+
+    csv_response = client.get("/export.csv", headers=IDENTITY)
+    assert csv_response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert csv_response.headers["content-disposition"] == 'attachment; filename="professors.csv"'
+    assert csv_response.content == csv_bytes
+
+
+def test_filters_and_projection(client):
+    params = {"department": "mathematics", "min_rating": 3, "max_difficulty": 4, "fields": "Average_Rating,Full_Name"}
+    expected = [{"Full_Name": p["Full_Name"], "Average_Rating": p["Average_Rating"]} for p in ROWS
+                if (p["Department"] or "").lower() == "mathematics" and p["Average_Rating"] and p["Average_Difficulty"]
+                and float(p["Average_Rating"]) >= 3 and float(p["Average_Difficulty"]) <= 4]
+    assert expected
+
+    lines = client.get("/export.ndjson", params=params, headers=IDENTITY).text.splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+    reader = csv.DictReader(io.StringIO(client.get("/export.csv", params=params, headers=IDENTITY).text))
+    assert reader.fieldnames == ["Full_Name", "Average_Rating"]
+    assert list(reader) == expected
+
+
+def test_summary_leaves_out_reviews(client):
+    lines = client.get("/export.ndjson", params={"summary": True}, headers=IDENTITY).text.splitlines()
+    assert len(lines) == len(ROWS)
+    assert all("Latest_Reviews" not in json.loads(line) for line in lines)
+    header = client.get("/export.csv", params={"summary": True}, headers=IDENTITY).text.splitlines()[0]
+    assert "Latest_Reviews" not in header.split(",")
+
+
+def test_no_matches(client):
+    params = {"department": "No Such Department"}
+    assert client.get("/export.ndjson", params=params, headers=IDENTITY).content == b""
+    assert client.get("/export.csv", params=params, headers=IDENTITY).text.splitlines() == [
+        ",".join(api.PROFESSOR_FIELDS)]
+
+
+@pytest.mark.parametrize("path", ["/export.ndjson", "/export.csv"])
+def test_gzip_on_the_fly(client, path):
+    plain = client.get(path, headers=IDENTITY)
+    assert "content-encoding" not in plain.headers
+    with client.stream("GET", path, headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.headers["vary"] == "Accept-Encoding"
+        raw = b"".join(r.iter_raw())
+    assert gzip.decompress(raw) == plain.content
+
+
+def test_brotli_only_client_gets_identity(client):
+    # The streams are only ever gzipped
+    r = client.get("/export.ndjson", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in r.headers
+    assert len(r.text.splitlines()) == len(ROWS)
+
+
+def test_export_reads_one_dataset_even_if_reloaded_meanwhile(monkeypatch):
+    old, new = ProfessorStore(ROWS), ProfessorStore(ROWS[:3])
+    monkeypatch.setattr(api, "EXPORT_CHUNK", 7)
+    chunks = api._export_chunks(old, None, None, None, None)
+    first = next(chunks)
+    monkeypatch.setattr(api, "store", new)  # a reload swaps the store mid-export
+    assert first + [row for rows in chunks for row in rows] == ROWS
@@ -0,0 +1,98 @@
+"""ExportWriter: the three outputs in one pass, replaced only when the whole export was written."""
+
+import csv
+import json
+import os
+
+import pytest
+
+import DeAnza_AllProfessors
+from DeAnza_AllProfessors import EXPORT_FIELDS, ExportWriter, save
+
+from conftest import professor_rows
+
+ROWS = professor_rows(30)
+SUFFIXES = (".json", ".jsonl", ".csv")
+
+
+class Interrupted(Exception):
+    pass
+
+
+def outputs(prefix):
+    """{file name: bytes} of everything next to `prefix`, temporary files included."""
+    directory = os.path.dirname(prefix)
+    result = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "rb") as f:
+            result[name] = f.read()
+    return result
+
+
+def write(prefix, rows):
+    with ExportWriter(prefix) as w:
+        for row in rows:
+            w.write(row)
+
+
+def test_outputs_hold_the_same_rows(tmp_path):
+    prefix = str(tmp_path / "professors")
+    write(prefix, ROWS)
+    assert sorted(outputs(prefix)) == sorted("professors" + suffix for suffix in SUFFIXES)
+    with open(prefix + ".json", encoding="utf-8") as f:
+        assert json.load(f) == ROWS
+    with open(prefix + ".jsonl", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == ROWS
+    with open(prefix + ".csv", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == EXPORT_FIELDS
+        assert [row["Full_Name"] for row in reader] == [p["Full_Name"] for p in ROWS]
+
+    write(prefix, [])
+    with open(prefix + ".json", encoding="utf-8") as f:
+        assert json.load(f) == []
+
+
+@pytest.mark.parametrize("written", [0, 1, 17])
+def test_interrupted_write_keeps_the_previous_outputs(tmp_path, written):
+    prefix = str(tmp_path / "professors")
+    write(prefix, ROWS)
+    before = outputs(prefix)
+
+    with pytest.raises(Interrupted):
+        with ExportWriter(prefix) as w:
+            for row in ROWS[:written]:
+                w.write(dict(row, Department="Changed"))
+            assert all(os.path.exists(prefix + suffix + ".tmp") for suffix in SUFFIXES)
+            raise Interrupted()
+    assert outputs(prefix) == before  # unchanged, and no .tmp files left
+
+
+def test_interrupted_first_export_leaves_nothing(tmp_path):
+    prefix = str(tmp_path / "professors")
+    with pytest.raises(Interrupted):
+        with ExportWriter(prefix) as w:
+            w.write(ROWS[0])
+            raise Interrupted()
+    assert outputs(prefix) == {}
+
+
+def test_save_failing_mid_export_keeps_outputs_and_state(tmp_path, monkeypatch):
+    prefix = str(tmp_path / "professors")
+    raw = [{"id": f"t{n}", "firstName": "First", "lastName": f"Last{n}", "department": "Mathematics",
+            "avgRating": 4, "numRatings": 3, "avgDifficulty": 2, "wouldTakeAgainPercent": 50, "reviews": []}
+           for n in range(5)]
+    save(raw, prefix)
+    before = outputs(prefix)
+    assert "professors.state.json" in before
+
+    def failing_rows(rows):
+        for n, row in enumerate(original(rows)):
+            if n == 3:
+                raise Interrupted()
+            yield row
+    original = DeAnza_AllProfessors.iter_export_rows
+    monkeypatch.setattr(DeAnza_AllProfessors, "iter_export_rows", failing_rows)
+    with pytest.raises(Interrupted):
+        save([dict(t, numRatings=4) for t in raw], prefix)
+    assert outputs(prefix) == before  # the state is only written after the exports
@@ -0,0 +1,88 @@
+"""/professors filtering from the precomputed indexes, against the original list-comprehension filters."""
+
+import itertools
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from professor_store import ProfessorStore
+
+from conftest import professor_rows
+
+ROWS = professor_rows()
+ROWS += [dict(ROWS[k], Full_Name=f"Unrated {k}", Average_Rating="", Average_Difficulty="") for k in range(3)]
+ROWS += [dict(ROWS[5], Full_Name="Rated Only", Average_Difficulty=""),
+         dict(ROWS[6], Full_Name="No Department", Department="")]
+DEPARTMENTS = [None, "Mathematics", "mathematics", "Computer Science", "No Such Department"]
+RATINGS = [None, 0, 1, 2.5, 3.0, 3.05, 4.5, 5]
+DIFFICULTIES = [None, 0, 1.5, 3, 3.33, 5]
+
+
+def _get_float(value):
+    """The original api._get_float."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def old_filter(department=None, min_rating=None, max_difficulty=None):
+    """Positions the original /professors handler kept, in dataset order."""
+    positions = range(len(ROWS))
+    if department:
+        positions = [i for i in positions if (ROWS[i].get("Department") or "").lower() == department.lower()]
+    if min_rating is not None:
+        positions = [i for i in positions
+                     if (rating := _get_float(ROWS[i].get("Average_Rating"))) is not None and rating >= min_rating]
+    if max_difficulty is not None:
+        positions = [i for i in positions
+                     if (difficulty := _get_float(ROWS[i].get("Average_Difficulty"))) is not None
+                     and difficulty <= max_difficulty]
+    return list(positions)
+
+
+class SmallCells(ProfessorStore):
+    RANGE_CELLS = 7  # blocks of ~60 ranks: most thresholds fall inside a block
+
+
+@pytest.fixture(scope="module", params=[ProfessorStore, SmallCells])
+def store(request):
+    return request.param(ROWS)
+
+
+@pytest.mark.parametrize("department", DEPARTMENTS)
+def test_count_query_and_export_match_the_old_filters(store, department):
+    for min_rating, max_difficulty in itertools.product(RATINGS, DIFFICULTIES):
+        expected = old_filter(department, min_rating, max_difficulty)
+        args = (department, min_rating, max_difficulty)
+        assert store.count(*args) == len(expected), args
+        assert store.query(*args) == (len(expected), expected), args
+        assert store.query(*args, 7, 27) == (len(expected), expected[7:27]), args
+        assert [i for chunk in store.export_positions(*args, chunk=16) for i in chunk] == expected, args
+
+
+def test_count_rating_difficulty_at_every_boundary(store):
+    # Thresholds equal to values in the data are where a block's partial scan must include ties
+    ratings = sorted({_get_float(p["Average_Rating"]) for p in ROWS} - {None})
+    difficulties = sorted({_get_float(p["Average_Difficulty"]) for p in ROWS} - {None})
+    rnd = random.Random(3)
+    thresholds = [(r, d) for r in ratings[::3] for d in difficulties[::3]]
+    thresholds += [(round(rnd.uniform(-1, 6), 3), round(rnd.uniform(-1, 6), 3)) for _ in range(200)]
+    for min_rating, max_difficulty in thresholds:
+        assert store._count_rating_difficulty(min_rating, max_difficulty) == \
+            len(old_filter(None, min_rating, max_difficulty)), (min_rating, max_difficulty)
+
+
+def test_professors_endpoint_pages_the_old_result(monkeypatch):
+    monkeypatch.setattr(api, "store", ProfessorStore(ROWS))
+    client = TestClient(api.app)
+    expected = old_filter("Mathematics", 2.5, 4)
+    body = client.get("/professors", params={"department": "MATHEMATICS", "min_rating": 2.5, "max_difficulty": 4,
+                                             "page": 2, "limit": 5, "format": "json"}).json()
+    assert body["total"] == len(expected)
+    assert body["total_pages"] == -(-len(expected) // 5)
+    assert body["data"] == [ROWS[i] for i in expected[5:10]]
@@ -0,0 +1,127 @@
+"""Typo-tolerant name lookup: the deletion index against brute force, ranking and max_distance."""
+
+import functools
+import itertools
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from fuzzy_names import MAX_DISTANCE, FuzzyIndex, allowed_distance, edit_distance, name_keys
+from professor_store import ProfessorStore
+
+from conftest import professor_rows
+
+ROWS = professor_rows()
+NAMES = [p["Full_Name"] for p in ROWS]
+
+
+def osa_distance(a, b):
+    """Optimal string alignment distance, unbounded (the textbook recurrence)."""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i, j in itertools.product(range(1, len(a) + 1), range(1, len(b) + 1)):
+        d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+        if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+            d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+KEYS = [name_keys(name) for name in NAMES]
+
+
+@functools.lru_cache(maxsize=None)
+def closest(word):
+    """Distance from word to the closest key of each name (by position)."""
+    distances = {key: osa_distance(word, key) for key in set(itertools.chain(*KEYS))}
+    return [min((distances[key] for key in keys), default=len(word) + 99) for keys in KEYS]
+
+
+def expected(word, max_distance):
+    """(position, distance) of the names with a key within the allowed distance of a one-word query."""
+    limit = min(max_distance, allowed_distance(word))
+    matches = [(i, distance) for i, distance in enumerate(closest(word)) if distance <= limit]
+    return sorted(matches, key=lambda m: (m[1], m[0]))
+
+
+def typos(word):
+    """A transposition, a deletion, a substitution and two edits of word."""
+    return [word[1] + word[0] + word[2:], word[:2] + word[3:], word[:-1] + "q", "x" + word[1:-1]]
+
+
+LAST_NAMES = sorted({name.split()[-1].lower() for name in NAMES[:40]} | {"smithjones", "garcia", "oneil"})
+QUERIES = sorted({t for word in LAST_NAMES for t in [word] + typos(word)})
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FuzzyIndex.build(NAMES)
+
+
+def test_edit_distance_matches_the_reference():
+    rnd = random.Random(5)
+    for _ in range(2000):
+        a = "".join(rnd.choice("abc") for _ in range(rnd.randint(0, 7)))
+        b = "".join(rnd.choice("abc") for _ in range(rnd.randint(0, 7)))
+        for limit in range(4):
+            assert edit_distance(a, b, limit) == min(osa_distance(a, b), limit + 1)
+
+
+@pytest.mark.parametrize("max_distance", range(MAX_DISTANCE + 1))
+def test_search_matches_brute_force(index, max_distance):
+    for word in QUERIES:
+        if "'" not in word:
+            assert index.search(word, max_distance) == expected(word, max_distance), word
+
+
+def test_every_word_must_match_and_distances_add_up(index):
+    first, last = NAMES[0].lower().split()
+    got = index.search(f"{typos(first)[0]} {typos(last)[0]}")
+    assert (0, 2) in got  # one transposition per word
+    firsts, lasts = dict(expected(typos(first)[0], MAX_DISTANCE)), dict(expected(typos(last)[0], MAX_DISTANCE))
+    assert got == sorted(((i, d + lasts[i]) for i, d in firsts.items() if i in lasts), key=lambda m: (m[1], m[0]))
+
+
+def test_punctuation_and_accents(index):
+    smith_jones = [i for i, name in enumerate(NAMES) if "Smith-Jones" in name]
+    garcia = [i for i, name in enumerate(NAMES) if "García" in name]
+    assert smith_jones and garcia
+    for query in ("smithjones", "Smith-Jnoes", "smtih-jones", "Smith Jones"):
+        assert set(smith_jones) <= {i for i, _ in index.search(query)}, query
+    assert set(garcia) <= {i for i, d in index.search("Garcia") if d == 0}
+
+
+def test_short_words_must_match_exactly(index):
+    assert allowed_distance("li") == 0
+    assert all(d == 0 for _, d in index.search("li"))
+    assert index.search("lx") == []
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "store", ProfessorStore(ROWS))
+    return TestClient(api.app)
+
+
+def test_endpoint_ranks_exact_matches_first(client):
+    last = NAMES[0].split()[-1]
+    typo = typos(last)[0]
+    body = client.get(f"/professors/name/{typo}", params={"fuzzy": True, "format": "json"}).json()
+    assert body["distances"] == sorted(body["distances"])
+    assert len(body["distances"]) == body["count"] == len(body["data"])
+    assert NAMES[0] in [p["Full_Name"] for p in body["data"]]
+
+    body = client.get(f"/professors/name/{last}", params={"fuzzy": True, "format": "json"}).json()
+    exact = [p["Full_Name"] for p in body["data"] if last.lower() in p["Full_Name"].lower()]
+    assert [p["Full_Name"] for p in body["data"]][:len(exact)] == exact
+    assert body["distances"][:len(exact)] == [0] * len(exact)
+
+
+def test_endpoint_max_distance(client):
+    typo = typos(NAMES[0].split()[-1])[0]
+    assert client.get(f"/professors/name/{typo}", params={"fuzzy": True, "max_distance": 0,
+                                                           "format": "json"}).status_code == 404
+    body = client.get(f"/professors/name/{typo}", params={"fuzzy": True, "max_distance": 1, "format": "json"}).json()
+    assert set(body["distances"]) <= {0, 1}
+    assert client.get(f"/professors/name/{typo}", params={"fuzzy": True, "max_distance": MAX_DISTANCE + 1,
+                                                           "format": "json"}).status_code == 422
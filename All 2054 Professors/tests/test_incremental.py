@@ -0,0 +1,91 @@
+"""--incremental: reviews are only fetched again for teachers whose numbers changed or who are new."""
+
+import json
+
+import pytest
+
+from DeAnza_AllProfessors import fetch_all, load_state, reuse_previous_reviews, save_state, state_path
+from rmp_retry import RetryPolicy
+
+from conftest import FakeResponse, FakeSite
+
+NUM_TEACHERS = 40
+
+
+def reviewed_ids(site):
+    return {i for kind, detail in site.requests
+            for i in (detail if kind == "batch" else [detail] if kind == "ratings" else [])}
+
+
+def changed_site(num_teachers=NUM_TEACHERS + 3):
+    """The site on the next run: two teachers got a rating (one also moved average), three are new."""
+    site = FakeSite(num_teachers=num_teachers)
+    site.teachers[4]["numRatings"] += 1
+    site.teachers[9]["numRatings"] += 1
+    site.teachers[9]["avgRating"] += 0.5
+    site.teachers[13]["avgRating"] = 4.9  # same count, different average
+    return site
+
+
+@pytest.mark.parametrize("workers, batch_size", [(1, 1), (2, 3)])
+def test_only_changed_and_new_teachers_are_refetched(tmp_path, clock, workers, batch_size):
+    prefix = str(tmp_path / "professors")
+    first = fetch_all(FakeSite(num_teachers=NUM_TEACHERS), workers=workers, rate=0, batch_size=batch_size)
+    save_state(first, prefix)
+    previous = load_state(prefix)
+    assert set(previous) == {t["id"] for t in first}
+
+    site = changed_site()
+    rows = fetch_all(site, workers=workers, rate=0, batch_size=batch_size, previous=previous)
+    teachers = site.teachers
+    expected = {teachers[i]["id"] for i in (4, 9, 13)} | {t["id"] for t in teachers[NUM_TEACHERS:]}
+    assert reviewed_ids(site) == expected
+    assert rows == fetch_all(changed_site(), workers=workers, rate=0, batch_size=batch_size)
+
+    # Nothing changed since: no ratings request at all
+    save_state(rows, prefix)
+    again = changed_site()
+    assert fetch_all(again, workers=workers, rate=0, batch_size=batch_size, previous=load_state(prefix)) == rows
+    assert reviewed_ids(again) == set()
+
+
+def test_teachers_without_reviews_are_not_saved(tmp_path):
+    prefix = str(tmp_path / "professors")
+    site = FakeSite(num_teachers=10)
+    failed = site.teachers[3]["id"]
+    site.hook = lambda kind, detail: FakeResponse(status_code=503) if detail == failed else None
+    rows = fetch_all(site, workers=2, rate=0, retry=RetryPolicy(max_attempts=2, sleep=lambda s: None))
+    assert "reviews" not in next(t for t in rows if t["id"] == failed)
+
+    save_state(rows, prefix)
+    previous = load_state(prefix)
+    assert failed not in previous and len(previous) == 9
+    with open(state_path(prefix), encoding="utf-8") as f:
+        assert json.load(f)["version"] == 1
+
+    retried = FakeSite(num_teachers=10)
+    fetch_all(retried, workers=2, rate=0, previous=previous)
+    assert reviewed_ids(retried) == {failed}
+
+
+def test_reuse_previous_reviews():
+    previous = {"a": {"numRatings": 3, "avgRating": 4.0, "reviews": [{"comment": "kept"}]},
+                "b": {"numRatings": 3, "avgRating": 4.0, "reviews": []},
+                "gone": {"numRatings": 1, "avgRating": 1.0, "reviews": []}}
+    out = [{"id": "a", "numRatings": 3, "avgRating": 4.0},
+           {"id": "b", "numRatings": 4, "avgRating": 4.0},
+           {"id": "new", "numRatings": 0, "avgRating": 0},
+           {"id": "journal", "numRatings": 2, "avgRating": 2.0, "reviews": [{"comment": "resumed"}]}]
+    to_fetch = reuse_previous_reviews(out, previous)
+    assert [t["id"] for t in to_fetch] == ["b", "new"]
+    assert out[0]["reviews"] == [{"comment": "kept"}]
+    assert out[3]["reviews"] == [{"comment": "resumed"}]  # restored from a journal: left alone
+
+
+@pytest.mark.parametrize("content", [None, "{not json", "[]"])
+def test_missing_or_unreadable_state_means_full_refresh(tmp_path, content):
+    prefix = str(tmp_path / "professors")
+    if content is not None:
+        with open(state_path(prefix), "w", encoding="utf-8") as f:
+            f.write(content)
+    assert load_state(prefix) is None
@@ -0,0 +1,122 @@
+"""Resuming a killed fetch_all run from its journal."""
+
+import json
+import time
+
+import pytest
+
+from DeAnza_AllProfessors import Journal, fetch_all, resume_from
+
+from conftest import FakeSite
+
+NUM_TEACHERS = 50
+
+
+class Killed(BaseException):
+    """The process dying mid-run: not an Exception, so no retry or fallback path catches it."""
+
+
+def run(site, journal=None, resume=None):
+    return fetch_all(site, workers=2, rate=0, batch_size=3, journal=journal, resume=resume)
+
+
+def killed_after(requests: int) -> FakeSite:
+    site = FakeSite(num_teachers=NUM_TEACHERS)
+
+    def hook(kind, detail):
+        if len(site.requests) > requests:
+            raise Killed()
+    site.hook = hook
+    return site
+
+
+def reviewed_ids(site):
+    return {i for kind, detail in site.requests if kind != "search"
+            for i in (detail if kind == "batch" else [detail] if kind == "ratings" else [])}
+
+
+@pytest.mark.parametrize("requests", [2, 4, 8])  # during the listing, as it ends, during the reviews
+def test_resume_after_kill_matches_clean_run(tmp_path, requests):
+    clean = run(FakeSite(num_teachers=NUM_TEACHERS))
+    path = str(tmp_path / "run.journal.jsonl")
+
+    journal = Journal(path)
+    killed = killed_after(requests)
+    with pytest.raises(Killed):
+        run(killed, journal)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type":"reviews","id":"VGVhY2hl')  # torn by the kill
+
+    state = Journal.replay(path)
+    assert state["pages"] >= 1
+    site = FakeSite(num_teachers=NUM_TEACHERS)
+    journal = Journal(path, resume=True)
+    assert run(site, journal, state) == clean
+    journal.close()
+
+    # Nothing the journal recorded is requested again
+    assert site.count("html") == 0
+    searched = [detail[0] for kind, detail in site.requests if kind == "search"]
+    assert not state["has_next"] or searched[0] == state["after"]
+    assert not reviewed_ids(site) & set(state["reviews"])
+    assert len(reviewed_ids(site)) == NUM_TEACHERS - len(state["reviews"])
+
+    # and the resumed records replay too, past the torn line
+    replayed = Journal.replay(path)
+    assert replayed["rows"] == [{k: v for k, v in row.items() if k != "reviews"} for row in clean]
+    assert len(replayed["reviews"]) == NUM_TEACHERS
+
+
+def test_replay_without_pages(tmp_path):
+    path = str(tmp_path / "run.journal.jsonl")
+    assert Journal.replay(path) is None
+    Journal(path).close()
+    assert Journal.replay(path) is None
+
+
+def write_journal(path, *records):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(rec) + "\n" for rec in records)
+
+
+PAGE = {"type": "page", "rows": [{"id": "T1"}], "after": "c1", "has_next": True}
+
+
+def test_journal_records_when_its_run_started(tmp_path):
+    path = str(tmp_path / "run.journal.jsonl")
+    journal = Journal(path)
+    journal.page([{"id": "T1"}], "c1", True)
+    journal.close()
+    assert Journal.replay(path)["started"] == pytest.approx(time.time(), abs=60)
+
+    journal = Journal(path, resume=True)  # a resumed run keeps the original start
+    journal.page([{"id": "T2"}], "c2", False)
+    journal.close()
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["type"] for line in f] == ["start", "page", "page"]
+
+
+@pytest.mark.parametrize("hours_ago, max_age, resumed", [
+    (1, 12, True),
+    (13, 12, False),
+    (24 * 7, 12, False),
+    (24 * 7, 0, True),  # 0: any age
+    (None, 12, False),  # no start record: age unknown
+    (None, 0, True),
+])
+def test_resume_from_starts_over_from_a_stale_journal(tmp_path, capsys, hours_ago, max_age, resumed):
+    path = str(tmp_path / "run.journal.jsonl")
+    start = [] if hours_ago is None else [{"type": "start", "started": time.time() - hours_ago * 3600}]
+    write_journal(path, *start, PAGE)
+    state = resume_from(path, max_age)
+    if resumed:
+        assert state["after"] == "c1" and state["rows"] == [{"id": "T1"}]
+    else:
+        assert state is None
+        assert "starting a fresh run" in capsys.readouterr().out
+
+
+def test_resume_from_without_journal(tmp_path, capsys):
+    assert resume_from(str(tmp_path / "missing.journal.jsonl")) is None
+    assert "No journal" in capsys.readouterr().out
@@ -0,0 +1,188 @@
+"""/metrics: the Prometheus text format, request counters and latencies, handler phases, dataset and cache gauges."""
+
+import json
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
+from professor_store import ProfessorStore
+from response_cache import ResponseCache
+
+from conftest import professor_rows
+
+ROWS = professor_rows(60)
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(?:,|$)')
+
+
+def parse(text):
+    """{(sample name, ((label, value), ...)): value}, checking each sample follows its # TYPE line."""
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+            continue
+        if line.startswith("# HELP "):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        assert re.sub(r"_(bucket|sum|count)$", "", name) in types or name in types, line
+        pairs = tuple(LABEL.findall(labels)) if labels else ()
+        assert ",".join(f'{k}="{v}"' for k, v in pairs) == (labels or ""), line
+        samples[(name, pairs)] = float(value)
+    return samples
+
+
+# ---------------------------- Registry ----------------------------
+def test_counter_and_gauge_render():
+    registry = Registry()
+    requests = registry.register(Counter("app_requests_total", "Requests", ("route",)))
+    registry.register(Gauge("app_rows", "Rows", fn=lambda: 12))
+    registry.register(Gauge("app_by_kind", "By kind", ("kind",), fn=lambda: {("b",): 2, ("a",): 1.5}))
+    requests.inc("/a")
+    requests.inc("/a", amount=2)
+    requests.inc('/quote"back\\slash\nline')
+    assert registry.render() == "\n".join([
+        "# HELP app_requests_total Requests",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{route="/a"} 3',
+        'app_requests_total{route="/quote\\"back\\\\slash\\nline"} 1',
+        "# HELP app_rows Rows",
+        "# TYPE app_rows gauge",
+        "app_rows 12",
+        "# HELP app_by_kind By kind",
+        "# TYPE app_by_kind gauge",
+        'app_by_kind{kind="a"} 1.5',
+        'app_by_kind{kind="b"} 2',
+    ]) + "\n"
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.register(Histogram("app_seconds", "Latency", ("route",), buckets=(1, 0.1)))
+    for value in (0.05, 0.1, 0.5, 5):  # a value equal to a bound falls in that bucket (le)
+        latency.observe(value, "/a")
+    with latency.time("/b"):
+        pass
+    samples = parse(registry.render())
+    assert [samples[("app_seconds_bucket", (("route", "/a"), ("le", le)))] for le in ("0.1", "1", "+Inf")] == [2, 3, 4]
+    assert samples[("app_seconds_count", (("route", "/a"),))] == 4
+    assert samples[("app_seconds_sum", (("route", "/a"),))] == pytest.approx(5.65)
+    assert samples[("app_seconds_count", (("route", "/b"),))] == 1
+    assert registry.render().index('route="/a"') < registry.render().index('route="/b"')
+
+
+# ---------------------------- /metrics ----------------------------
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    data_file = tmp_path / "professors.json"
+    data_file.write_text(json.dumps(ROWS), encoding="utf-8")
+    monkeypatch.setattr(api, "DATA_FILE", str(data_file))
+    monkeypatch.setattr(api, "SNAPSHOT_FILE", str(tmp_path / "professors.snapshot"))
+    monkeypatch.setattr(api, "WRITE_SNAPSHOT", False)
+    monkeypatch.setattr(api, "store", ProfessorStore(ROWS))
+    monkeypatch.setattr(api, "response_cache", ResponseCache(api.RESPONSE_CACHE_BYTES))
+    return TestClient(api.app)
+
+
+def scrape(client):
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    return parse(r.text)
+
+
+def delta(before, after, name, **labels):
+    key = (name, tuple(labels.items()))
+    return after.get(key, 0) - before.get(key, 0)
+
+
+def test_exposition_format(client):
+    r = client.get("/metrics")
+    assert r.headers["content-type"] == CONTENT_TYPE + "; charset=utf-8"
+    names = {line.split(" ")[2] for line in r.text.splitlines() if line.startswith("# TYPE ")}
+    assert names == {metric.name for metric in api.metrics_registry.metrics}
+    parse(r.text)
+
+
+def test_requests_are_counted_by_route_template_and_status(client):
+    before = scrape(client)
+    for name in ("Irregular Rating", "Nobody At All"):
+        client.get("/professors/name/" + name, params={"format": "json"})
+    client.get("/professors/name/Irregular Rating", params={"format": "json"})
+    client.get("/no/such/path")
+    after = scrape(client)
+
+    route = "/professors/name/{name}"
+    assert delta(before, after, "professors_api_requests_total", method="GET", route=route, status="200") == 2
+    assert delta(before, after, "professors_api_requests_total", method="GET", route=route, status="404") == 1
+    assert delta(before, after, "professors_api_requests_total", method="GET", route="unmatched", status="404") == 1
+    assert delta(before, after, "professors_api_request_duration_seconds_count",
+                 method="GET", route=route, status="200") == 2
+    assert delta(before, after, "professors_api_request_duration_seconds_bucket",
+                 method="GET", route=route, status="200", le="+Inf") == 2
+    # The previous scrape is counted once it has been sent
+    assert delta(before, after, "professors_api_requests_total", method="GET", route="/metrics", status="200") == 1
+
+
+@pytest.mark.parametrize("params, phases", [
+    ({}, {"filter": 1, "serialization": 2}),  # rows, then the JSON body
+    ({"sort": "-rating"}, {"pagination": 1, "serialization": 2}),
+])
+def test_phases_are_timed(client, params, phases):
+    before = scrape(client)
+    client.get("/professors", params=dict(params, limit=20, format="json"), headers={"Accept-Encoding": "gzip"})
+    after = scrape(client)
+    phases = dict(phases, compression=1)  # 20 full professors are well over MIN_SIZE
+    for phase in ("filter", "search", "pagination", "serialization", "compression"):
+        assert delta(before, after, "professors_api_phase_duration_seconds_count",
+                     route="/professors", phase=phase) == phases.get(phase, 0), phase
+
+    # A cache hit skips every phase
+    client.get("/professors", params=dict(params, limit=20, format="json"), headers={"Accept-Encoding": "gzip"})
+    again = scrape(client)
+    assert not any(delta(after, again, name, **dict(labels)) for name, labels in again
+                   if name == "professors_api_phase_duration_seconds_count")
+
+
+def test_cache_gauges_follow_the_response_cache(client):
+    for path in ("/stats", "/stats", "/departments", "/stats"):
+        client.get(path, params={"format": "json"}, headers={"Accept-Encoding": "identity"})
+    samples = scrape(client)
+    cache = api.response_cache
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert samples[("professors_api_response_cache_hits_total", ())] == 2
+    assert samples[("professors_api_response_cache_misses_total", ())] == 2
+    assert samples[("professors_api_response_cache_hit_ratio", ())] == 0.5
+    assert samples[("professors_api_response_cache_entries", ())] == len(cache.entries) == 2
+    assert samples[("professors_api_response_cache_bytes", ())] == cache.size > 0
+
+
+def test_dataset_gauges_and_load_outcomes(client, tmp_path, monkeypatch):
+    before = scrape(client)
+    assert before[("professors_api_dataset_professors", ())] == len(ROWS)
+
+    with open(api.DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump(ROWS[:10], f)
+    assert client.post("/reload").status_code == 200
+    loaded = scrape(client)
+    assert loaded[("professors_api_dataset_professors", ())] == 10
+    assert delta(before, loaded, "professors_api_dataset_load_duration_seconds_count", outcome="loaded") == 1
+    assert loaded[("professors_api_dataset_loaded_timestamp_seconds", ())] > \
+        before.get(("professors_api_dataset_loaded_timestamp_seconds", ()), 0)
+
+    monkeypatch.setattr(api, "DATA_FILE", str(tmp_path / "missing.json"))
+    assert client.post("/reload").status_code == 200
+    missing = scrape(client)
+    assert delta(loaded, missing, "professors_api_dataset_load_duration_seconds_count", outcome="missing") == 1
+    assert missing[("professors_api_dataset_professors", ())] == 10  # the previous dataset is kept
+
+    (tmp_path / "broken.json").write_text("[{", encoding="utf-8")
+    monkeypatch.setattr(api, "DATA_FILE", str(tmp_path / "broken.json"))
+    assert client.post("/reload").status_code == 500
+    broken = scrape(client)
+    assert delta(missing, broken, "professors_api_dataset_load_duration_seconds_count", outcome="error") == 1
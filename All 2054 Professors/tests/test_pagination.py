@@ -0,0 +1,91 @@
+"""Adaptive page size and pipelined pagination from computed cursors."""
+
+import base64
+
+import pytest
+
+from DeAnza_AllProfessors import AdaptivePageSize, cursor_offset, fetch_all, offset_cursor
+
+from conftest import FakeSite
+
+
+def test_offset_cursor_round_trip():
+    assert offset_cursor(19) == base64.b64encode(b"arrayconnection:19").decode()
+    assert [cursor_offset(offset_cursor(n)) for n in (0, 7, 12345)] == [0, 7, 12345]
+
+
+@pytest.mark.parametrize("cursor", [None, "", "not base64!", base64.b64encode(b"array:3").decode(),
+                                    base64.b64encode(b"arrayconnection:x").decode()])
+def test_cursor_offset_of_other_cursors(cursor):
+    assert cursor_offset(cursor) is None
+
+
+def test_page_size_doubles_on_fast_full_pages_up_to_maximum():
+    pager = AdaptivePageSize(initial=20, maximum=100)
+    sizes = []
+    for _ in range(4):
+        pager.success(pager.size, pager.size, True, 0.1)
+        sizes.append(pager.size)
+    assert sizes == [40, 80, 100, 100]
+
+
+def test_page_size_halves_on_slow_pages_and_failures_down_to_minimum():
+    pager = AdaptivePageSize(initial=40, minimum=5)
+    pager.success(40, 40, True, 5.0)
+    assert pager.size == 20
+    pager.failure()
+    pager.failure()
+    pager.failure()
+    assert pager.size == 5
+
+
+def test_page_size_keeps_size_between_fast_and_slow():
+    pager = AdaptivePageSize(initial=20)
+    pager.success(20, 20, True, 2.0)
+    assert pager.size == 20
+
+
+def test_short_page_learns_the_server_cap():
+    pager = AdaptivePageSize(initial=20)
+    pager.success(20, 20, True, 0.1)
+    pager.success(40, 25, True, 0.1)
+    assert (pager.size, pager.maximum) == (25, 25)
+    pager.success(25, 25, True, 0.1)
+    assert pager.size == 25
+    pager.success(25, 3, False, 0.1)  # the last page is short because the list ends, not because of a cap
+    assert pager.maximum == 25
+
+
+def names(rows):
+    return [row["lastName"] for row in rows]
+
+
+def searched(site):
+    return [detail for kind, detail in site.requests if kind == "search"]
+
+
+def test_pipelined_listing_fetches_every_teacher_once(clock):
+    site = FakeSite(num_teachers=400)
+    out = fetch_all(site, fetch_reviews=False, workers=4, rate=0)
+    assert names(out) == names(site.teachers)
+    cursors = [after for after, _ in searched(site)]
+    assert len(cursors) == len(set(cursors))  # every computed cursor was right: no page was asked twice
+    assert [first for _, first in searched(site)][:2] == [20, 20]  # the first window, then the size grows
+    assert max(first for _, first in searched(site)) > 20
+
+
+def test_pipelined_listing_learns_the_server_cap(clock):
+    site = FakeSite(num_teachers=400, max_first=15)
+    out = fetch_all(site, fetch_reviews=False, workers=4, rate=0)
+    assert names(out) == names(site.teachers)
+    assert {first for _, first in searched(site)[-5:]} == {15}
+
+
+def test_slow_pages_shrink_the_page_size(clock):
+    def slow(kind, detail):
+        if kind == "search":
+            clock.now += 5
+    site = FakeSite(num_teachers=60, hook=slow)
+    out = fetch_all(site, fetch_reviews=False, workers=1, rate=0)
+    assert names(out) == names(site.teachers)
+    assert [first for _, first in searched(site)][:4] == [20, 10, 5, 5]
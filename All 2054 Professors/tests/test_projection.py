@@ -0,0 +1,43 @@
+"""fields= and summary= on the endpoints that return professors."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from professor_store import PROFESSOR_FIELDS, ProfessorStore
+
+from conftest import professor_rows
+
+ROWS = professor_rows(50)
+ENDPOINTS = ["/professors", "/professors/name/Irregular Rating", "/professors/department/Mathematics",
+             "/search?q=a", "/export.ndjson", "/export.csv"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "store", ProfessorStore(ROWS))
+    return TestClient(api.app)
+
+
+def test_fields_select_and_order_the_columns(client):
+    body = client.get("/professors", params={"fields": " average_rating, Full_Name ,", "format": "json"}).json()
+    assert [list(p) for p in body["data"]] == [["Full_Name", "Average_Rating"]] * len(body["data"])
+    assert body["data"][0] == {"Full_Name": ROWS[0]["Full_Name"], "Average_Rating": ROWS[0]["Average_Rating"]}
+
+
+def test_summary_drops_the_reviews(client):
+    body = client.get("/professors", params={"summary": True, "format": "json"}).json()
+    assert list(body["data"][0]) == [f for f in PROFESSOR_FIELDS if f != "Latest_Reviews"]
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+@pytest.mark.parametrize("fields, problem", [
+    ("", "No fields given"),
+    (" , ,", "No fields given"),
+    ("Nickname", "Unknown field(s): Nickname"),
+    ("Full_Name,Nickname,Age", "Unknown field(s): Nickname, Age"),
+])
+def test_empty_or_unknown_fields_are_rejected(client, endpoint, fields, problem):
+    r = client.get(endpoint, params={"fields": fields, "format": "json"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == f"{problem}. Available: {', '.join(PROFESSOR_FIELDS)}"
@@ -0,0 +1,89 @@
+"""TokenBucket and the concurrent review fetch it limits."""
+
+import pytest
+
+from DeAnza_AllProfessors import TokenBucket, fetch_all, fetch_reviews_concurrent, teacher_row
+
+from conftest import FakeSite
+
+
+def test_token_bucket_paces_to_rate(clock):
+    bucket = TokenBucket(rate=5, burst=1)
+    started = clock.now
+    for _ in range(10):
+        bucket.acquire()
+    assert clock.now - started == pytest.approx(9 / 5)
+
+
+def test_token_bucket_allows_burst_then_paces(clock):
+    bucket = TokenBucket(rate=5, burst=5)
+    started = clock.now
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.now == started  # the burst is free
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.now - started == pytest.approx(5 / 5)
+
+
+def test_token_bucket_refills_while_idle(clock):
+    bucket = TokenBucket(rate=2, burst=4)
+    for _ in range(4):
+        bucket.acquire()
+    clock.now += 10  # idle for longer than it takes to refill; tokens stay capped at burst
+    started = clock.now
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == started
+    bucket.acquire()
+    assert clock.now - started == pytest.approx(1 / 2)
+
+
+def test_token_bucket_without_rate_never_waits(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.slept == []
+
+
+class CountingBucket(TokenBucket):
+    def __init__(self, rate: float = 0, burst: int = 1):
+        super().__init__(rate, burst)
+        self.taken = 0
+
+    def acquire(self) -> None:
+        self.taken += 1
+        super().acquire()
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_fetch_reviews_concurrent_fills_every_teacher(batch_size):
+    site = FakeSite(num_teachers=20)
+    teachers = [teacher_row(t) for t in site.teachers] + [{"id": None, "firstName": "No", "lastName": "Id"}]
+    limiter = CountingBucket()
+    fetch_reviews_concurrent(site, teachers, workers=4, batch_size=batch_size, limiter=limiter)
+
+    for teacher in teachers[:-1]:
+        assert [r["comment"] for r in teacher["reviews"]] == [f"review {k} of {teacher['id']}" for k in range(2)]
+    assert teachers[-1]["reviews"] == []
+    assert len(site.requests) == -(-20 // batch_size)
+    assert limiter.taken == len(site.requests)  # one token per request
+
+
+def test_sequential_reviews_take_tokens_from_the_limiter(clock):
+    site = FakeSite(num_teachers=30, first_page=30)
+    limiter = CountingBucket(rate=5, burst=1)
+    started = clock.now
+    out = fetch_all(site, workers=1, batch_size=1, limiter=limiter)
+
+    assert all(len(teacher["reviews"]) == 2 for teacher in out)
+    assert site.count("ratings") == 30
+    assert limiter.taken == len(site.requests)  # the listing page and every review request
+    assert clock.now - started == pytest.approx((len(site.requests) - 1) / 5)
+    assert 0.5 not in clock.slept  # the limiter paces the loop; no fixed pause on top
+
+
+def test_sequential_reviews_pause_without_a_rate_limit(clock):
+    site = FakeSite(num_teachers=4, first_page=4)
+    fetch_all(site, workers=1, batch_size=1, rate=0)
+    assert clock.slept == [0.5] * 4
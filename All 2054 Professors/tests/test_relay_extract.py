@@ -0,0 +1,54 @@
+"""Relay store extraction from the server-rendered search page."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from DeAnza_AllProfessors import (RELAY_MARKER, balanced_json_after, extract_first_page_teachers_from_html,
+                                  relay_store_after)
+
+STORE = {
+    "VGVhY2hlci0x": {"__typename": "Teacher", "id": "VGVhY2hlci0x", "legacyId": 1, "firstName": "Ana",
+                     "lastName": "Lee", "department": "Math {and} \"Stats\"", "avgRating": 4.5, "numRatings": 10,
+                     "avgDifficulty": 2.0, "wouldTakeAgainPercent": 90},
+    "client:root:pageInfo": {"__typename": "PageInfo", "endCursor": "YXJyYXk=", "hasNextPage": True},
+}
+
+
+def page(store_text: str) -> str:
+    return "<html><script>var x = {\"a\": 1};</script><script>" + RELAY_MARKER + store_text + ";</script></html>"
+
+
+def test_balanced_json_after_skips_braces_and_quotes_in_strings():
+    text = json.dumps(STORE)
+    assert balanced_json_after(RELAY_MARKER, page(text)) == text
+    assert relay_store_after(RELAY_MARKER, page(text)) == STORE
+
+
+def test_extract_first_page():
+    teachers, cursor, has_next = extract_first_page_teachers_from_html(page(json.dumps(STORE)))
+    assert [t["lastName"] for t in teachers] == ["Lee"]
+    assert (cursor, has_next) == ("YXJyYXk=", True)
+
+
+def truncated_page() -> str:
+    """A page cut off inside a string literal with many escapes (the old pattern backtracked exponentially)."""
+    return page('{"VGVhY2hlci0x": {"comment": "' + "ab\\n" * 40)
+
+
+def test_truncated_store_raises():
+    with pytest.raises(ValueError):
+        extract_first_page_teachers_from_html(truncated_page())
+
+
+def test_truncated_store_fails_fast():
+    # In a subprocess, so a regression times out instead of hanging the test run
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); from tests.test_relay_extract import truncated_page; "
+            "from DeAnza_AllProfessors import extract_first_page_teachers_from_html as extract\n"
+            "try:\n    extract(truncated_page())\nexcept ValueError:\n    print('ValueError')")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code, root], capture_output=True, text=True, timeout=10, cwd=root)
+    assert result.stdout.strip() == "ValueError", result.stderr
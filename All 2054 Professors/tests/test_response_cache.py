@@ -0,0 +1,115 @@
+"""The LRU response cache: ETags, 304s, eviction and invalidation when /reload swaps the dataset."""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from professor_store import ProfessorStore
+from response_cache import ENTRY_OVERHEAD, ResponseCache, etag_matches, make_etag
+
+from conftest import professor_rows
+
+ROWS = professor_rows(60)
+READS = ["/professors?page=2&limit=5", "/professors/name/Irregular Rating", "/professors/department/Mathematics",
+         "/search?q=ma", "/stats", "/departments"]
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ("abc", False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+
+
+def test_lru_eviction_by_size():
+    cache = ResponseCache(max_bytes=3 * (10 + ENTRY_OVERHEAD))
+    for key in "abc":
+        cache.put(key, key.encode() * 10)
+    assert cache.get_first("a") == ("a", (make_etag(b"a" * 10), b"a" * 10))  # "a" is now the most recent
+    cache.put("d", b"d" * 10)
+    assert list(cache.entries) == ["c", "a", "d"]  # "b" was the least recently used
+    assert cache.size == 3 * (10 + ENTRY_OVERHEAD)
+
+    cache.put("a", b"A" * 10)  # replacing an entry does not count it twice
+    assert cache.size == 3 * (10 + ENTRY_OVERHEAD)
+    assert cache.put("huge", b"x" * cache.max_bytes)[1] == b"x" * cache.max_bytes
+    assert "huge" not in cache.entries  # larger than the cache: returned, not kept
+
+    assert cache.get_first("missing", "d")[0] == "d"
+    assert cache.get_first("missing") is None
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.clear()
+    assert not cache.entries and cache.size == 0
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    data_file = tmp_path / "professors.json"
+    data_file.write_text(json.dumps(ROWS), encoding="utf-8")
+    monkeypatch.setattr(api, "DATA_FILE", str(data_file))
+    monkeypatch.setattr(api, "SNAPSHOT_FILE", str(tmp_path / "professors.snapshot"))
+    monkeypatch.setattr(api, "WRITE_SNAPSHOT", False)
+    monkeypatch.setattr(api, "store", ProfessorStore(ROWS))
+    monkeypatch.setattr(api, "response_cache", ResponseCache(api.RESPONSE_CACHE_BYTES))
+    return TestClient(api.app)
+
+
+def get(client, path, **headers):
+    # Uncompressed, so the ETag is the hash of the body (a compressed copy has its own ETag)
+    return client.get(path + ("&" if "?" in path else "?") + "format=json",
+                      headers={"Accept-Encoding": "identity", **headers})
+
+
+@pytest.mark.parametrize("path", READS)
+def test_second_read_is_a_hit_with_the_same_etag(client, path):
+    first = get(client, path)
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert (api.response_cache.hits, api.response_cache.misses) == (0, 1)
+
+    second = get(client, path)
+    assert api.response_cache.hits == 1
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"] == make_etag(first.content)
+
+
+@pytest.mark.parametrize("path", READS)
+def test_if_none_match_gets_304(client, path):
+    etag = get(client, path).headers["ETag"]
+    for header in (etag, "W/" + etag, f'"other", {etag}'):
+        r = get(client, path, **{"If-None-Match": header})
+        assert r.status_code == 304 and r.content == b""
+        assert r.headers["ETag"] == etag
+    assert get(client, path, **{"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_parameters_are_part_of_the_key(client):
+    page2 = get(client, "/professors?page=2&limit=5")
+    page3 = get(client, "/professors?page=3&limit=5")
+    assert page2.headers["ETag"] != page3.headers["ETag"]
+    assert get(client, "/professors?limit=5&page=2").headers["ETag"] == page2.headers["ETag"]  # order does not matter
+    assert api.response_cache.hits == 1
+
+
+def test_reload_invalidates_cached_responses(client):
+    path = "/professors/name/Irregular Rating"
+    before = get(client, path)
+    assert api.response_cache.entries
+
+    changed = [dict(p, Department="Renamed") if p["Full_Name"] == "Irregular Rating" else p for p in ROWS]
+    with open(api.DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump(changed, f)
+    assert client.post("/reload").status_code == 200
+    assert not api.response_cache.entries
+
+    after = get(client, path, **{"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200  # the old ETag no longer matches
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.json()["data"][0]["Department"] == "Renamed"
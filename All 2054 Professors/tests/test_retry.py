@@ -0,0 +1,144 @@
+"""Failure classification, Retry-After, the retry policy and the circuit breaker."""
+
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from rmp_retry import CircuitBreaker, RetryError, RetryPolicy, RetryableError, classify, parse_retry_after
+
+from conftest import FakeResponse
+
+
+def http_error(status: int, retry_after: str = None) -> requests.HTTPError:
+    response = FakeResponse(status_code=status, headers={"Retry-After": retry_after} if retry_after else {})
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        return e
+    raise AssertionError(f"{status} did not raise")
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-3") == 0.0
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "Mon, 99 Foo 2024"])
+def test_parse_retry_after_missing_or_garbage(value):
+    assert parse_retry_after(value) is None
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (http_error(429, "7"), (True, 7.0)),
+    (http_error(500), (True, None)),
+    (http_error(404), (False, None)),
+    (http_error(400, "7"), (False, 7.0)),
+    (requests.ConnectionError("reset"), (True, None)),
+    (requests.Timeout("read timeout"), (True, None)),
+    (RetryableError("GraphQL errors"), (True, None)),
+    (ValueError("Expecting value"), (True, None)),  # an HTML challenge page instead of JSON
+    (KeyError("data"), (False, None)),
+])
+def test_classify(exc, expected):
+    assert classify(exc) == expected
+
+
+def test_classify_503_with_http_date():
+    retryable, retry_after = classify(http_error(503, formatdate(time.time() + 60, usegmt=True)))
+    assert retryable and retry_after == pytest.approx(60, abs=2)
+
+
+class Flaky:
+    """Raises the given exceptions in turn, then returns "ok"."""
+
+    def __init__(self, *failures: BaseException):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return "ok"
+
+
+def test_retry_waits_retry_after_then_succeeds():
+    slept = []
+    policy = RetryPolicy(sleep=slept.append)
+    fn = Flaky(http_error(429, "2"), http_error(503, "120"))
+    assert policy.call("graphql:search", fn) == "ok"
+    assert fn.calls == 3
+    assert slept == [2.0, policy.max_delay]  # Retry-After is honoured up to max_delay
+    assert policy.stats["graphql:search"]["retries"] == 2
+
+
+def test_retry_backs_off_with_jitter_without_retry_after():
+    slept = []
+    policy = RetryPolicy(max_attempts=4, base_delay=0.5, sleep=slept.append)
+    fn = Flaky(*[requests.ConnectionError("reset")] * 3)
+    assert policy.call("graphql:search", fn) == "ok"
+    assert len(slept) == 3
+    assert all(0 <= delay <= 0.5 * 2 ** attempt for attempt, delay in enumerate(slept, 1))
+
+
+def test_fatal_errors_are_not_retried():
+    policy = RetryPolicy(sleep=lambda s: pytest.fail("slept before a fatal error"))
+    fn = Flaky(http_error(404))
+    with pytest.raises(RetryError) as info:
+        policy.call("html:ratings", fn)
+    assert info.value.fatal and fn.calls == 1
+
+
+def test_gives_up_after_max_attempts():
+    policy = RetryPolicy(max_attempts=3, sleep=lambda s: None)
+    fn = Flaky(*[http_error(502)] * 5)
+    with pytest.raises(RetryError) as info:
+        policy.call("graphql:search", fn)
+    assert not info.value.fatal and fn.calls == 3
+    assert "3 attempts" in str(info.value)
+
+
+def test_retry_budget_is_shared_by_the_run():
+    policy = RetryPolicy(budget=2, sleep=lambda s: None)
+    assert policy.call("a", Flaky(http_error(429))) == "ok"
+    with pytest.raises(RetryError) as info:
+        policy.call("b", Flaky(*[http_error(429)] * 5))
+    assert info.value.reason == "retry budget exhausted"
+    assert policy.budget == 0
+
+
+def test_breaker_opens_after_threshold_and_probes_once(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.wait_time() == 0  # still closed
+    breaker.failure()
+    assert breaker.wait_time() == pytest.approx(30) and breaker.trips == 1
+
+    clock.now += 30
+    assert breaker.wait_time() == 0  # half-open: this caller is the probe
+    assert breaker.wait_time() == 1.0  # everyone else keeps waiting
+    breaker.failure()  # the probe failed: open again
+    assert breaker.wait_time() == pytest.approx(30) and breaker.trips == 2
+
+    clock.now += 30
+    assert breaker.wait_time() == 0
+    breaker.success()
+    assert breaker.wait_time() == 0 and breaker.failures == 0
+
+
+def test_policy_waits_out_an_open_breaker(clock):
+    policy = RetryPolicy(max_attempts=5, failure_threshold=2, reset_timeout=10, sleep=clock.sleep)
+    policy.backoff = lambda attempt, retry_after=None: 0.0
+    fn = Flaky(*[requests.ConnectionError("reset")] * 2)
+    assert policy.call("graphql:ratings", fn) == "ok"
+    assert policy.breakers["graphql:ratings"].trips == 1
+    assert clock.slept[-1] == pytest.approx(10)  # the third attempt waited for the breaker to half-open
@@ -0,0 +1,71 @@
+"""/search: name, department and review-comment matching on the memory and snapshot stores."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from professor_snapshot import load_snapshot, write_snapshot
+from professor_store import ProfessorStore, is_regular
+
+from conftest import professor_rows
+
+ROWS = professor_rows()
+QUERIES = ["office hours", "OFFICE", "课程", "s", "ar", "smi", "math", "zzzq", ""]
+
+
+@pytest.fixture(scope="module")
+def memory_store():
+    return ProfessorStore(ROWS)
+
+
+@pytest.fixture(scope="module", params=["memory", "snapshot"])
+def store(request, memory_store, tmp_path_factory):
+    if request.param == "memory":
+        return memory_store
+    path = str(tmp_path_factory.mktemp("snapshot") / "professors.snapshot")
+    write_snapshot(memory_store, path)
+    return load_snapshot(path)
+
+
+def comments(p):
+    return [r["Comment"] for r in p["Latest_Reviews"] if isinstance(r, dict) and isinstance(r.get("Comment"), str)]
+
+
+def expected_reviews(text):
+    # Rows kept verbatim are matched on name and department only
+    return [i for i, p in enumerate(ROWS) if is_regular(p) and any(text.lower() in c.lower() for c in comments(p))]
+
+
+def expected_search(text, reviews=False):
+    in_reviews = set(expected_reviews(text)) if reviews else set()
+    text = text.lower()
+    return [i for i, p in enumerate(ROWS)
+            if text in p["Full_Name"].lower() or text in (p["Department"] or "").lower() or i in in_reviews]
+
+
+@pytest.mark.parametrize("text", QUERIES)
+def test_search_reviews(store, text):
+    assert store.search_reviews(text) == expected_reviews(text)
+
+
+def test_search_reviews_across_scan_steps(memory_store, monkeypatch):
+    monkeypatch.setattr(memory_store, "REVIEW_SCAN_BYTES", 5)  # matches straddle every step boundary
+    for text in ("office hours", "课程", "e"):
+        assert memory_store.search_reviews(text) == expected_reviews(text)
+
+
+@pytest.mark.parametrize("reviews", [False, True])
+@pytest.mark.parametrize("text", QUERIES)
+def test_search_page(store, text, reviews):
+    matches = expected_search(text, reviews)
+    assert store.search_page(text, 0, None, reviews) == (len(matches), matches)
+    assert store.search_page(text, 5, 12, reviews) == (len(matches), matches[5:12])
+
+
+def test_search_endpoint_with_reviews(store, monkeypatch):
+    monkeypatch.setattr(api, "store", store)
+    body = TestClient(api.app).get("/search", params={"q": "office hours", "reviews": True, "limit": 100,
+                                                      "format": "json"}).json()
+    matches = expected_search("office hours", reviews=True)
+    assert body["total"] == len(matches)
+    assert [p["Full_Name"] for p in body["data"]] == [ROWS[i]["Full_Name"] for i in matches[:100]]
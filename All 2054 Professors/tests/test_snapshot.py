@@ -0,0 +1,129 @@
+"""Binary snapshots: the round trip of every index, and the API writing one after a JSON load."""
+
+import json
+import os
+
+import pytest
+
+import api
+from DeAnza_AllProfessors import save
+from professor_snapshot import load_snapshot, write_snapshot
+from professor_store import ProfessorStore, SORT_OPTIONS
+
+from conftest import professor_rows
+from synthetic import raw_rows
+
+ROWS = professor_rows()
+FILTERS = [(None, None, None), ("Mathematics", None, None), (None, 4.0, None), (None, None, 2.5),
+           ("Mathematics", 3.0, 3.5), (None, 2.0, 4.0), ("No Such Department", None, None)]
+
+
+@pytest.fixture(scope="module")
+def stores(tmp_path_factory):
+    memory = ProfessorStore(ROWS)
+    path = str(tmp_path_factory.mktemp("snapshot") / "professors.snapshot")
+    write_snapshot(memory, path)
+    return memory, load_snapshot(path)
+
+
+def test_round_trip_rows_and_summaries(stores):
+    memory, snapshot = stores
+    assert len(snapshot) == len(memory) == len(ROWS)
+    everyone = list(range(len(ROWS)))
+    assert snapshot.rows(everyone) == memory.rows(everyone) == ROWS
+    fields = ["Full_Name", "Average_Rating"]
+    assert snapshot.rows(everyone[::7], fields) == memory.rows(everyone[::7], fields)
+    # Stored as JSON, so compared as the API serializes them (tuples come back as lists)
+    assert json.dumps(snapshot.stats) == json.dumps(memory.stats)
+    assert json.dumps(snapshot.departments) == json.dumps(memory.departments)
+
+
+@pytest.mark.parametrize("department, min_rating, max_difficulty", FILTERS)
+def test_round_trip_filters_and_sorts(stores, department, min_rating, max_difficulty):
+    memory, snapshot = stores
+    assert snapshot.count(department, min_rating, max_difficulty) == memory.count(department, min_rating, max_difficulty)
+    assert snapshot.query(department, min_rating, max_difficulty, 3, 40) == memory.query(department, min_rating, max_difficulty, 3, 40)
+    assert list(snapshot.export_positions(department, min_rating, max_difficulty, chunk=50)) == \
+        list(memory.export_positions(department, min_rating, max_difficulty, chunk=50))
+    for sort in SORT_OPTIONS:
+        page = memory.sorted_page(sort, 25, 10, None, department, min_rating, max_difficulty)
+        assert snapshot.sorted_page(sort, 25, 10, None, department, min_rating, max_difficulty) == page
+        if page[1]:
+            after = memory.sort_key(sort, page[1][-1])
+            assert snapshot.sort_key(sort, page[1][-1]) == after
+            assert snapshot.sorted_page(sort, 25, 0, after, department, min_rating, max_difficulty) == \
+                memory.sorted_page(sort, 25, 0, after, department, min_rating, max_difficulty)
+
+
+@pytest.mark.parametrize("text", ["smi", "Mathematics", "a", "zzzq", "Irregular Rating"])
+def test_round_trip_name_searches(stores, text):
+    memory, snapshot = stores
+    assert snapshot.search_page(text, 0, 30) == memory.search_page(text, 0, 30)
+    assert snapshot.fuzzy_search_names(text) == memory.fuzzy_search_names(text)
+    assert snapshot.find_by_name(text) == memory.find_by_name(text)
+    assert snapshot.department_page(text, 0, 30) == memory.department_page(text, 0, 30)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "not.snapshot"
+    path.write_bytes(b"{}" * 10)
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
+
+
+# ---------------------------- Written by the API ----------------------------
+@pytest.fixture
+def data_files(tmp_path, monkeypatch):
+    data_file = str(tmp_path / "professors.json")
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(ROWS, f)
+    monkeypatch.setattr(api, "DATA_FILE", data_file)
+    monkeypatch.setattr(api, "SNAPSHOT_FILE", str(tmp_path / "professors.snapshot"))
+    monkeypatch.setattr(api, "store", api.store)
+    monkeypatch.setattr(api, "snapshot_writer", None)
+    return data_file, api.SNAPSHOT_FILE
+
+
+def load(capsys) -> str:
+    """api.load_data(), waiting for its snapshot write; returns what it printed."""
+    api.load_data()
+    if api.snapshot_writer is not None:
+        api.snapshot_writer.join()
+    return capsys.readouterr().out
+
+
+def test_api_writes_the_snapshot_after_a_json_load(data_files, capsys):
+    data_file, snapshot_file = data_files
+    assert f"from {data_file}" in load(capsys)
+    assert os.path.getmtime(snapshot_file) == os.path.getmtime(data_file)  # dated like its source
+
+    assert f"from {snapshot_file}" in load(capsys)
+    assert api.store.rows(range(len(ROWS))) == ROWS
+    assert not os.path.exists(snapshot_file + ".tmp")
+
+
+def test_newer_export_is_read_from_json_and_snapshotted_again(data_files, capsys):
+    data_file, snapshot_file = data_files
+    load(capsys)
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(ROWS[:10], f)
+    mtime = os.path.getmtime(snapshot_file) + 5
+    os.utime(data_file, (mtime, mtime))
+
+    assert f"Loaded 10 professors from {data_file}" in load(capsys)
+    assert os.path.getmtime(snapshot_file) == mtime
+    assert f"Loaded 10 professors from {snapshot_file}" in load(capsys)
+
+
+def test_snapshot_writing_can_be_turned_off(data_files, capsys, monkeypatch):
+    monkeypatch.setattr(api, "WRITE_SNAPSHOT", False)
+    load(capsys)
+    assert api.snapshot_writer is None
+    assert not os.path.exists(data_files[1])
+
+
+def test_scraper_save_leaves_the_snapshot_to_the_api(tmp_path, capsys):
+    prefix = str(tmp_path / "out")
+    save(list(raw_rows(20)), prefix)
+    assert os.path.exists(prefix + ".json")
+    assert not any(name.endswith(".snapshot") for name in os.listdir(tmp_path))
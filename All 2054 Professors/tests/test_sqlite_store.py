@@ -0,0 +1,137 @@
+"""The SQLite backend answers every read endpoint byte for byte like the in-memory store."""
+
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import sqlite_store
+from professor_store import SORT_OPTIONS, ProfessorStore
+from response_cache import ResponseCache
+from sqlite_store import SQLiteStore, import_export
+
+from conftest import professor_rows
+
+ROWS = professor_rows(300)
+ROWS += [
+    dict(ROWS[6], Full_Name="No Count", Num_Ratings=None),
+    dict(ROWS[7], Full_Name="Float Count", Average_Difficulty=3, Num_Ratings=2.5),
+    dict(ROWS[8], Full_Name="Null Department", Department=None),
+    dict(ROWS[9], Full_Name="Empty Department", Department=""),
+    dict(ROWS[10], Full_Name='Quote "Name" O\'Neil'),
+]
+NAMES = [p["Full_Name"] for p in ROWS]
+DEPARTMENTS = sorted({p["Department"] for p in ROWS if p["Department"]})
+
+
+def requests(seed: int = 1, count: int = 250):
+    """(path, params) covering every read endpoint with random parameters."""
+    rnd = random.Random(seed)
+    words = ["great", "the", "a", "ng", "en", "xyz", "Lecture", "math", "e", '"', 'o"n', "课程", "office hours"]
+    out = [("/stats", {}), ("/departments", {}), ("/professors/name/Quote", {}), ("/search", {"q": '"name"'}),
+           ("/professors/department/MATHEMATICS", {"page": 2}), ("/professors/name/Null Department", {})]
+    for _ in range(count):
+        k = rnd.random()
+        if k < 0.35:
+            p = {"page": rnd.randint(1, 4), "limit": rnd.choice([1, 7, 20, 100])}
+            if rnd.random() < .5:
+                p["department"] = rnd.choice(DEPARTMENTS).upper()
+            if rnd.random() < .5:
+                p["min_rating"] = rnd.choice([0, 1, 2.5, 3, 4.5, 5])
+            if rnd.random() < .5:
+                p["max_difficulty"] = rnd.choice([0, 1, 2.5, 3, 4.5, 5])
+            if rnd.random() < .6:
+                p["sort"] = rnd.choice(SORT_OPTIONS)
+            if rnd.random() < .3:
+                p["summary"] = True
+            if rnd.random() < .2:
+                p["fields"] = "full_name,Num_Ratings"
+            out.append(("/professors", p))
+        elif k < 0.6:
+            q = rnd.choice(words + [n[1:5] for n in rnd.sample(NAMES, 3)] + [d[2:6] for d in rnd.sample(DEPARTMENTS, 2)])
+            out.append(("/search", {"q": q, "page": rnd.randint(1, 3), "reviews": rnd.random() < .5}))
+        elif k < 0.75:
+            name = rnd.choice(NAMES)
+            if rnd.random() < .5:
+                out.append(("/professors/name/" + name[:rnd.randint(1, 8)], {}))
+            else:
+                typo = list(name)
+                typo[rnd.randrange(len(typo))] = "x"
+                out.append(("/professors/name/" + "".join(typo)[rnd.randint(0, 4):],
+                            {"fuzzy": True, "max_distance": rnd.randint(0, 2), "summary": True}))
+        elif k < 0.85:
+            out.append(("/professors/reviews", {"name": rnd.choice(NAMES).upper()}))
+        else:
+            out.append(("/professors/department/" + rnd.choice(DEPARTMENTS).lower(),
+                        {"page": rnd.randint(1, 4), "limit": 10}))
+    return out
+
+
+@pytest.fixture(scope="module", params=["fts", "scan"])
+def stores(request, tmp_path_factory):
+    directory = tmp_path_factory.mktemp("sqlite")
+    src, db = str(directory / "professors.jsonl"), str(directory / "professors.db")
+    with open(src, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(p, ensure_ascii=False) + "\n" for p in ROWS)
+    with pytest.MonkeyPatch.context() as mp:
+        if request.param == "scan":  # an SQLite without FTS5: searches scan the table
+            mp.setattr(sqlite_store, "_create_fts", lambda conn: False)
+        assert import_export(src, db) == len(ROWS)
+    database = SQLiteStore(db)
+    if request.param == "fts" and not database.fts:
+        pytest.skip("this SQLite has no FTS5 trigram tokenizer")
+    yield ProfessorStore(ROWS), database
+    database.conn.close()
+
+
+@pytest.fixture
+def get(stores, monkeypatch):
+    """get(store, path, params): the response of the API serving `store`, uncached."""
+    monkeypatch.setattr(api, "response_cache", ResponseCache(0))
+    client = TestClient(api.app)
+
+    def get(store, path, params):
+        monkeypatch.setattr(api, "store", store)
+        return client.get(path, params=dict(params, format="json"))
+    return get
+
+
+def test_every_read_endpoint_matches(stores, get):
+    memory, database = stores
+    mismatches = []
+    for path, params in requests():
+        expected, got = get(memory, path, params), get(database, path, params)
+        if (got.status_code, got.content) != (expected.status_code, expected.content):
+            mismatches.append((path, params, expected.status_code, got.status_code))
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("sort", SORT_OPTIONS)
+def test_cursor_walks_match(stores, get, sort):
+    memory, database = stores
+    for filters in ({}, {"min_rating": 3}, {"department": DEPARTMENTS[0]}):
+        params = dict(filters, sort=sort, limit=37)
+        cursors = {memory: None, database: None}
+        while True:
+            pages = {}
+            for store, cursor in cursors.items():
+                pages[store] = get(store, "/professors", dict(params, **({"cursor": cursor} if cursor else {}))).json()
+            assert pages[database] == pages[memory]
+            cursors = {store: page["next_cursor"] for store, page in pages.items()}
+            if not cursors[memory]:
+                break
+
+
+@pytest.mark.parametrize("path", ["/export.ndjson", "/export.csv"])
+@pytest.mark.parametrize("params", [{}, {"department": "Mathematics", "min_rating": 3}, {"summary": True}])
+def test_exports_match(stores, get, path, params):
+    memory, database = stores
+    assert get(database, path, params).content == get(memory, path, params).content
+
+
+def test_summaries_match(stores):
+    memory, database = stores
+    assert json.dumps(database.stats) == json.dumps(memory.stats)
+    assert json.dumps(database.departments) == json.dumps(memory.departments)
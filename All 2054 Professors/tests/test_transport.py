@@ -0,0 +1,68 @@
+"""The two scraper sessions behave the same against a real (local) HTTP server."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rmp_transport import Http2Session, PooledSession
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/ShowRatings.jsp"):
+            self.send_response(301)
+            self.send_header("Location", "/professor/" + self.path.rpartition("=")[2])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.reply(200, f"page {self.path}".encode())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.reply(200, json.dumps({"echo": json.loads(body)}).encode(), "application/json")
+
+    def reply(self, status, body, content_type="text/html"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def http2_session(headers):
+    pytest.importorskip("h2")
+    return Http2Session(headers)
+
+
+@pytest.fixture(params=[PooledSession, http2_session], ids=["requests", "httpx"])
+def session(request):
+    s = request.param({"user-agent": "test"})
+    yield s
+    s.close()
+
+
+def test_redirects_are_followed(server, session):
+    r = session.get(f"{server}/ShowRatings.jsp?tid=42")
+    r.raise_for_status()
+    assert r.status_code == 200
+    assert r.text == "page /professor/42"
+
+
+def test_post_round_trip_and_stats(server, session):
+    r = session.post(f"{server}/graphql", data=b'{"operationName":"Q","variables":{}}')
+    r.raise_for_status()
+    assert r.json() == {"echo": {"operationName": "Q", "variables": {}}}
+    assert session.stats.requests == 1
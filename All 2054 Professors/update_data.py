@@ -17,8 +17,10 @@ def update_professor_data():
     
     try:
         # 运行数据抓取脚本
+        # --resume: 如果上一次运行中断（超时/被杀），从检查点日志继续，而不是从头开始；
+        # 日志超过 --resume-max-age（默认 12 小时）则视为过期，重新开始
         result = subprocess.run(
-            [sys.executable, "DeAnza_AllProfessors.py"],
+            [sys.executable, "DeAnza_AllProfessors.py", "--resume"],
             capture_output=True,
             text=True,
             timeout=3600  # 1小时超时